@@ -0,0 +1,386 @@
+import os
+import json
+import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .ingestao import FORMATO_DATA, COLUNAS_CATEGORICAS, tipar_colunas
+
+# Armazenamento particionado por mês dos dados acumulados.
+#
+# Estrutura em disco:
+#   dados_acumulados_{usuario}/
+#       manifesto.json
+#       ano_mes=2025-03/parte-<id>.parquet
+#       ano_mes=2025-03/indice_chaves_v2.npy   (hashes das tarefas já gravadas)
+#       ano_mes=2025-04/parte-<id>.parquet
+#
+# Cada upload grava apenas arquivos novos nas partições dos meses que ele toca e
+# atualiza o manifesto, sem reescrever o histórico.
+
+COLUNA_DATA_CONCLUSAO = 'DATA DE CONCLUSÃO DA TAREFA'
+PARTICAO_SEM_DATA = 'sem_data'
+
+# Arquivos são gravados ordenados pela data de conclusão, em grupos de linhas pequenos o
+# bastante para que as estatísticas de cada grupo permitam pular os que estão fora do período
+LINHAS_POR_GRUPO = 20_000
+MAX_LEITURAS_PARALELAS = 8
+
+# Colunas que identificam uma tarefa para a deduplicação na entrada
+COLUNAS_CHAVE_TAREFA = ['NÚMERO DO PROTOCOLO', 'TAREFA', COLUNA_DATA_CONCLUSAO]
+
+# Índice de chaves por partição. O nome muda junto com a forma do hash: índices gravados com
+# a forma anterior (protocolo '123.0' em blocos com células vazias) são reconstruídos dos arquivos
+# e o arquivo antigo é apagado
+ARQUIVO_INDICE = 'indice_chaves_v2.npy'
+ARQUIVO_INDICE_ANTIGO = 'indice_chaves.npy'
+
+
+def diretorio_dataset(usuario):
+    return f'dados_acumulados_{usuario}'
+
+
+def arquivo_legado(usuario):
+    return f'dados_acumulados_{usuario}.parquet'
+
+
+def _caminho_manifesto(usuario):
+    return os.path.join(diretorio_dataset(usuario), 'manifesto.json')
+
+
+def _caminho_particao(usuario, chave):
+    return os.path.join(diretorio_dataset(usuario), f'ano_mes={chave}')
+
+
+def _gravar_json_atomico(caminho, dados):
+    # Grava em arquivo temporário e troca de uma vez, para nunca deixar um manifesto pela metade
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def ler_manifesto(usuario):
+    caminho = _caminho_manifesto(usuario)
+    if not os.path.exists(caminho):
+        return {'versao': 0, 'particoes': {}}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def chave_particao(datas):
+    """Converte uma série de datas de conclusão na chave de partição 'AAAA-MM'."""
+    datas = pd.to_datetime(datas, format=FORMATO_DATA, errors='coerce')
+    return datas.dt.strftime('%Y-%m').fillna(PARTICAO_SEM_DATA)
+
+
+def _texto_da_chave(serie):
+    """
+    Texto de uma coluna de chave. Números inteiros guardados como float (123.0, como fica um
+    protocolo numa coluna com células vazias) viram '123', igual ao da coluna inteira.
+    """
+    if pd.api.types.is_float_dtype(serie.dtype):
+        valores = serie.to_numpy(dtype='float64')
+        inteiros = np.isfinite(valores) & (np.mod(valores, 1) == 0)
+        texto = serie.astype(str).to_numpy(dtype=object)
+        texto[inteiros] = valores[inteiros].astype('int64').astype(str)
+        return pd.Series(texto, index=serie.index).str.strip()
+    if serie.dtype == object:
+        serie = serie.map(lambda valor: int(valor) if isinstance(valor, float) and valor.is_integer() else valor)
+    return serie.astype(str).str.strip()
+
+
+def hash_chave_tarefa(df):
+    """
+    Calcula um hash uint64 por linha sobre protocolo + tarefa + data de conclusão,
+    que identifica a mesma tarefa vinda de exportações sobrepostas. O protocolo e a tarefa
+    entram como texto normalizado (_texto_da_chave), para que o tipo com que cada bloco da
+    planilha foi lido não mude o hash.
+    """
+    chave = pd.DataFrame(index=df.index)
+    for coluna in COLUNAS_CHAVE_TAREFA:
+        if coluna not in df.columns:
+            chave[coluna] = ''
+        elif coluna == COLUNA_DATA_CONCLUSAO:
+            datas = pd.to_datetime(df[coluna], format=FORMATO_DATA, errors='coerce')
+            chave[coluna] = datas.to_numpy(dtype='datetime64[ns]').view('i8')
+        else:
+            chave[coluna] = _texto_da_chave(df[coluna])
+    return pd.util.hash_pandas_object(chave, index=False).to_numpy()
+
+
+def _caminho_indice(usuario, chave):
+    return os.path.join(_caminho_particao(usuario, chave), ARQUIVO_INDICE)
+
+
+def _carregar_indice(usuario, chave, manifesto):
+    """
+    Lê o índice de chaves já gravadas em uma partição (array ordenado de uint64).
+    Partições gravadas antes do índice existir (ou com o índice na forma antiga) têm o
+    índice reconstruído a partir apenas das colunas de chave dos seus próprios arquivos;
+    o índice reconstruído é gravado e o arquivo da forma antiga, apagado.
+    """
+    caminho = _caminho_indice(usuario, chave)
+    if os.path.exists(caminho):
+        return np.load(caminho)
+
+    partes = manifesto['particoes'].get(chave, [])
+    if not partes:
+        return np.empty(0, dtype=np.uint64)
+
+    pasta = _caminho_particao(usuario, chave)
+    hashes = []
+    for parte in partes:
+        arquivo = os.path.join(pasta, parte['arquivo'])
+        colunas = pq.read_schema(arquivo).names
+        df_chaves = pd.read_parquet(arquivo, columns=[c for c in COLUNAS_CHAVE_TAREFA if c in colunas])
+        hashes.append(hash_chave_tarefa(df_chaves))
+    indice = np.unique(np.concatenate(hashes))
+
+    _gravar_indice(usuario, chave, indice)
+    antigo = os.path.join(pasta, ARQUIVO_INDICE_ANTIGO)
+    if os.path.exists(antigo):
+        os.remove(antigo)
+    return indice
+
+
+def _gravar_indice(usuario, chave, indice):
+    caminho = _caminho_indice(usuario, chave)
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'wb') as f:
+        np.save(f, indice)
+    os.replace(temporario, caminho)
+
+
+def anexar_particoes(df, usuario):
+    """
+    Grava as linhas de `df` em arquivos novos, um por mês de conclusão, e registra
+    os arquivos no manifesto. O custo depende só do tamanho de `df`.
+
+    Linhas cuja chave (protocolo + tarefa + data de conclusão) já está no índice da
+    partição, ou repetida dentro do próprio `df`, são descartadas.
+
+    Retorna apenas as linhas efetivamente gravadas.
+    """
+    manifesto = ler_manifesto(usuario)
+    if df.empty:
+        return df
+
+    os.makedirs(diretorio_dataset(usuario), exist_ok=True)
+    chaves = chave_particao(df[COLUNA_DATA_CONCLUSAO])
+    hashes = hash_chave_tarefa(df)
+    gravados = []
+
+    for chave, posicoes in sorted(chaves.groupby(chaves.to_numpy()).indices.items()):
+        hashes_mes = hashes[posicoes]
+        indice = _carregar_indice(usuario, chave, manifesto)
+
+        # Descarta tarefas já conhecidas e repetições dentro do próprio upload
+        novas = ~np.isin(hashes_mes, indice) & ~pd.Series(hashes_mes).duplicated().to_numpy()
+        if not novas.any():
+            continue
+        df_mes = df.iloc[posicoes[novas]].sort_values(COLUNA_DATA_CONCLUSAO, kind='stable')
+        datas = pd.to_datetime(df_mes[COLUNA_DATA_CONCLUSAO], format=FORMATO_DATA, errors='coerce')
+
+        pasta = _caminho_particao(usuario, chave)
+        os.makedirs(pasta, exist_ok=True)
+        nome_arquivo = f'parte-{uuid.uuid4().hex}.parquet'
+        df_mes.to_parquet(os.path.join(pasta, nome_arquivo), index=False, row_group_size=LINHAS_POR_GRUPO)
+        _gravar_indice(usuario, chave, np.union1d(indice, hashes_mes[novas]))
+        manifesto['particoes'].setdefault(chave, []).append({
+            'arquivo': nome_arquivo,
+            'linhas': len(df_mes),
+            'data_min': None if datas.isna().all() else datas.min().isoformat(),
+            'data_max': None if datas.isna().all() else datas.max().isoformat()
+        })
+        gravados.append(df_mes)
+
+    if not gravados:
+        return df.iloc[0:0]
+
+    manifesto['versao'] += 1
+    _gravar_json_atomico(_caminho_manifesto(usuario), manifesto)
+    return pd.concat(gravados)
+
+
+def arquivos_do_dataset(usuario, manifesto=None, periodo=None):
+    """
+    Lista os arquivos do dataset. Com `periodo` (data inicial, data final), descarta as
+    partições de meses fora do intervalo e os arquivos cujas datas (no manifesto) não o tocam.
+    """
+    manifesto = manifesto if manifesto is not None else ler_manifesto(usuario)
+    if periodo is not None:
+        mes_inicial, mes_final = (pd.Timestamp(d).strftime('%Y-%m') for d in periodo)
+        inicio, fim = (pd.Timestamp(d).isoformat() for d in _limites_periodo(periodo))
+
+    arquivos = []
+    for chave in sorted(manifesto['particoes']):
+        if periodo is not None and not (mes_inicial <= chave <= mes_final):
+            continue
+        for parte in manifesto['particoes'][chave]:
+            if periodo is not None and parte.get('data_min') is not None:
+                if parte['data_max'] < inicio or parte['data_min'] >= fim:
+                    continue
+            arquivos.append(os.path.join(_caminho_particao(usuario, chave), parte['arquivo']))
+    return arquivos
+
+
+def intervalo_datas(usuario, manifesto=None):
+    """Menor e maior data de conclusão do dataset, sem ler os dados. Retorna None se estiver vazio."""
+    manifesto = manifesto if manifesto is not None else ler_manifesto(usuario)
+    minimos, maximos = [], []
+    for chave, partes in manifesto['particoes'].items():
+        for parte in partes:
+            if parte.get('data_min') is not None:
+                minimos.append(parte['data_min'])
+                maximos.append(parte['data_max'])
+            elif chave != PARTICAO_SEM_DATA:
+                # Arquivo gravado antes do manifesto guardar datas: usa as estatísticas do parquet
+                limites = _limites_arquivo(os.path.join(_caminho_particao(usuario, chave), parte['arquivo']))
+                if limites is not None:
+                    minimos.append(limites[0].isoformat())
+                    maximos.append(limites[1].isoformat())
+    if not minimos:
+        return None
+    return pd.Timestamp(min(minimos)), pd.Timestamp(max(maximos))
+
+
+def _limites_arquivo(arquivo):
+    metadados = pq.ParquetFile(arquivo).metadata
+    nomes = metadados.schema.to_arrow_schema().names
+    if COLUNA_DATA_CONCLUSAO not in nomes:
+        return None
+    indice = nomes.index(COLUNA_DATA_CONCLUSAO)
+    estatisticas = [metadados.row_group(i).column(indice).statistics for i in range(metadados.num_row_groups)]
+    estatisticas = [e for e in estatisticas if e is not None and e.has_min_max]
+    if not estatisticas:
+        return None
+    datas = pd.to_datetime([e.min for e in estatisticas] + [e.max for e in estatisticas], format=FORMATO_DATA, errors='coerce')
+    if datas.isna().all():
+        return None
+    return datas.min(), datas.max()
+
+
+def _limites_periodo(periodo):
+    # Período inclusivo em dias -> intervalo [início, fim + 1 dia) em timestamps
+    inicio, fim = periodo
+    return pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+
+
+def _ler_arquivo(arquivo, colunas=None, periodo=None):
+    # Colunas categóricas são lidas direto do dicionário do parquet, sem materializar strings
+    esquema = pq.read_schema(arquivo)
+    presentes = esquema.names
+    if colunas is not None:
+        presentes = [c for c in colunas if c in presentes]
+    categoricas = [c for c in COLUNAS_CATEGORICAS if c in presentes]
+
+    filtros = None
+    if periodo is not None:
+        if COLUNA_DATA_CONCLUSAO not in esquema.names:
+            return pd.DataFrame(columns=presentes)
+        inicio, fim = _limites_periodo(periodo)
+        if pa.types.is_timestamp(esquema.field(COLUNA_DATA_CONCLUSAO).type):
+            # Os grupos de linhas fora do período são pulados pelas estatísticas mín./máx.
+            filtros = [(COLUNA_DATA_CONCLUSAO, '>=', inicio), (COLUNA_DATA_CONCLUSAO, '<', fim)]
+        else:
+            # Arquivo antigo com datas em texto: lê a coluna de data e filtra depois
+            tabela = pq.read_table(arquivo, columns=list(dict.fromkeys(presentes + [COLUNA_DATA_CONCLUSAO])), read_dictionary=categoricas)
+            df = tabela.to_pandas()
+            datas = pd.to_datetime(df[COLUNA_DATA_CONCLUSAO], format=FORMATO_DATA, errors='coerce')
+            return df.loc[(datas >= inicio) & (datas < fim), presentes].reset_index(drop=True)
+
+    return pq.read_table(arquivo, columns=presentes, read_dictionary=categoricas, filters=filtros).to_pandas()
+
+
+def _concatenar(partes):
+    """Concatena partes preservando as colunas categóricas (unifica as categorias antes)."""
+    for coluna in COLUNAS_CATEGORICAS:
+        presentes = [p for p in partes if coluna in p.columns]
+        if not presentes:
+            continue
+        for p in presentes:
+            if not isinstance(p[coluna].dtype, pd.CategoricalDtype):
+                p[coluna] = p[coluna].astype('category')
+        categorias = pd.Index(np.unique(np.concatenate([p[coluna].cat.categories.astype(str) for p in presentes])))
+        for p in presentes:
+            p[coluna] = p[coluna].cat.set_categories(categorias)
+    return pd.concat(partes, ignore_index=True)
+
+
+def ler_particoes(usuario, colunas=None, manifesto=None, periodo=None):
+    """
+    Lê as partições registradas no manifesto. Retorna None se o dataset estiver vazio.
+    Com `colunas`, lê só essas colunas de cada arquivo (as que não existem são ignoradas).
+    Com `periodo` (data inicial, data final, inclusivas), lê só as linhas concluídas nesse
+    intervalo: partições e arquivos fora dele nem são abertos, e os arquivos restantes
+    são lidos em paralelo.
+    """
+    if periodo is not None and periodo[0] > periodo[1]:
+        return None
+    arquivos = arquivos_do_dataset(usuario, manifesto, periodo)
+    if not arquivos:
+        return None
+    if len(arquivos) == 1:
+        return _concatenar([_ler_arquivo(arquivos[0], colunas, periodo)])
+
+    with ThreadPoolExecutor(max_workers=min(MAX_LEITURAS_PARALELAS, len(arquivos))) as executor:
+        partes = list(executor.map(lambda arquivo: _ler_arquivo(arquivo, colunas, periodo), arquivos))
+    # Partes sem linhas ficam de fora; as que têm linhas mas nenhuma das colunas pedidas (n, 0)
+    # entram, para que as colunas ausentes no arquivo venham nulas nas linhas certas
+    return _concatenar([p for p in partes if len(p)] or partes[:1])
+
+
+def migrar_arquivo_legado(usuario):
+    """
+    Converte o antigo `dados_acumulados_{usuario}.parquet` (arquivo único) para o
+    dataset particionado, já com as colunas tipadas. O arquivo antigo é renomeado para `.migrado`, não apagado.
+    """
+    legado = arquivo_legado(usuario)
+    if not os.path.exists(legado) or ler_manifesto(usuario)['particoes']:
+        return False
+
+    df_legado = tipar_colunas(pd.read_parquet(legado))
+    anexar_particoes(df_legado, usuario)
+    os.replace(legado, f'{legado}.migrado')
+    return True
+
+
+# Registro de ingestões: cada planilha carregada é identificada pelo hash do seu conteúdo,
+# para que o mesmo arquivo enviado de novo (ou mantido pelo uploader entre reruns) não
+# seja processado duas vezes.
+
+def _caminho_registro_ingestoes(usuario):
+    return os.path.join(diretorio_dataset(usuario), 'ingestoes.json')
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def ler_registro_ingestoes(usuario):
+    caminho = _caminho_registro_ingestoes(usuario)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def consultar_ingestao(usuario, hash_arquivo):
+    """Retorna o registro da ingestão anterior desse conteúdo, ou None se ele nunca foi carregado."""
+    return ler_registro_ingestoes(usuario).get(hash_arquivo)
+
+
+def registrar_ingestao(usuario, hash_arquivo, nome_arquivo, linhas):
+    registro = ler_registro_ingestoes(usuario)
+    registro[hash_arquivo] = {
+        'arquivo': nome_arquivo,
+        'linhas': int(linhas),
+        'carregado_em': datetime.now().isoformat(timespec='seconds')
+    }
+    os.makedirs(diretorio_dataset(usuario), exist_ok=True)
+    _gravar_json_atomico(_caminho_registro_ingestoes(usuario), registro)
@@ -2,44 +2,328 @@ import pandas as pd
 import os
 import plotly.express as px
 import math
+import threading
+import numpy as np
 import streamlit as st
 from io import BytesIO
 from datetime import timedelta
+from .armazenamento import anexar_particoes, ler_manifesto, ler_particoes, migrar_arquivo_legado
+from .ingestao import normalizar_tmo, tipar_colunas, compactar_colunas, ordem_por_conclusao, posicoes_periodo, recortar_periodo
+from .filas import atributo_fila
+from .cubo import COLUNAS_CUBO, COLUNA_ACIMA_1H, MEDIDAS_CUBO, montar_cubo, como_cubo, eh_cubo, filtrar_cubo, consultar_cubo, consultar_periodos, top_n_por_grupo, montar_recordes, tempo_total, dias_como_datas, montar_rollup_mensal, como_rollup_mensal, tmo_mensal
+from .formatacao import formatar_hms, formatar_min_s, formatar_m_ss, formatar_minutos
+from .ocioso import COLUNAS_OCIOSO, COLUNA_OCIOSO, atualizar_ocioso, ler_ocioso, ocioso_por_dia
+
+# Colunas de um dataset vazio (antes do primeiro upload)
+COLUNAS_BASE = [
+    'NÚMERO DO PROTOCOLO',
+    'USUÁRIO QUE CONCLUIU A TAREFA',
+    'SITUAÇÃO DA TAREFA',
+    'TEMPO MÉDIO OPERACIONAL',
+    'DATA DE CONCLUSÃO DA TAREFA',
+    'FINALIZAÇÃO',
+    'Justificativa'  # Inclui a coluna de justificativa ao criar um novo DataFrame
+]
+
+# Colunas calculadas por compactar_colunas, e a coluna de origem de cada uma
+COLUNAS_DERIVADAS = {'DIA': 'DATA DE CONCLUSÃO DA TAREFA', 'TMO_SEG': 'TEMPO MÉDIO OPERACIONAL'}
+
+
+# Cache de colunas compartilhado por todas as sessões do processo, por usuário (dataset).
+# Cada entrada vale para uma versão do dataset: a `versao` do manifesto, que o save_data
+# incrementa a cada upload. As colunas são as do histórico completo, ordenadas pela conclusão,
+# e os arrays delas ficam somente leitura: cada chamada recebe um DataFrame novo que apenas
+# referencia os mesmos arrays, e uma alteração no lugar levanta erro em vez de mudar os dados
+# que as outras sessões enxergam.
+_CACHE_DATASETS = {}
+_TRAVA_CACHE = threading.Lock()
+
+# Quantos recortes por período (rollups, recordes, visões de analista) ficam em cache por usuário
+MAX_RECORTES_EM_CACHE = 8
+
+
+def _dataset_em_cache(usuario, versao):
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is None or dataset['versao'] != versao:
+            # Versão nova (ou primeiro acesso): descarta tudo que foi lido da versão anterior
+            trava = dataset['trava'] if dataset is not None else threading.Lock()
+            dataset = {'versao': versao, 'colunas': {}, 'ausentes': set(), 'completo': False, 'trava': trava}
+            _CACHE_DATASETS[usuario] = dataset
+        return dataset
+
+
+def _somente_leitura(serie):
+    """Marca como somente leitura os arrays numpy de `serie` (valores, códigos das categorias, máscara de nulos)."""
+    valores = serie.array
+    for atributo in ('_ndarray', '_codes', '_data', '_mask'):
+        array = getattr(valores, atributo, None)
+        if isinstance(array, np.ndarray):
+            array.setflags(write=False)
+    return serie
+
+
+def _ler_historico(usuario, colunas, manifesto):
+    """
+    Lê `colunas` (None = todas) do histórico completo, já tipadas, compactadas e ordenadas pela
+    conclusão, como um dicionário de colunas somente leitura; None se não houver dados.
+    """
+    try:
+        df_lido = ler_particoes(usuario, colunas=colunas, manifesto=manifesto)
+    except (ValueError, OSError):
+        return None
+    if df_lido is None:
+        return None
+    # Os dados são gravados já tipados; só partições antigas ainda precisam de conversão
+    df_lido = compactar_colunas(tipar_colunas(df_lido))
+    df_lido = df_lido.take(ordem_por_conclusao(df_lido)).reset_index(drop=True)
+    return {coluna: _somente_leitura(df_lido[coluna]) for coluna in df_lido.columns}
 
-def load_data(usuario):
-    parquet_file = f'dados_acumulados_{usuario}.parquet'  # Caminho do arquivo Parquetaa
-    
+def load_data(usuario, colunas=None, periodo=None):
+    """
+    Carrega o dataset do usuário já tipado e compactado.
+
+    `colunas` limita a leitura às colunas que a visão usa e `periodo` (data inicial, data final)
+    às tarefas concluídas no intervalo. As colunas lidas ficam no cache do processo por versão
+    do dataset, compartilhadas entre as sessões: trocar de visão só relê quando falta alguma
+    coluna e só um upload força nova leitura.
+
+    As linhas vêm ordenadas pela data de conclusão, então um `periodo` (e qualquer recorte
+    posterior com recortar_periodo) é uma fatia do histórico localizada por busca binária.
+    O DataFrame devolvido compartilha os arrays do cache e não pode ser alterado no lugar.
+    """
     try:
-        if os.path.exists(parquet_file):
-            df_total = pd.read_parquet(parquet_file)
-            
-            # Verifica se a coluna 'Justificativa' existe, caso contrário, adiciona ela
-            if 'Justificativa' not in df_total.columns:
-                df_total['Justificativa'] = ""  # Adiciona a coluna com valores vazios
+        # Converte o arquivo único antigo para o dataset particionado, se ainda existir
+        migrar_arquivo_legado(usuario)
+        manifesto = ler_manifesto(usuario)
+    except (ValueError, OSError):
+        manifesto = {'versao': 0, 'particoes': {}}
+
+    dataset = _dataset_em_cache(usuario, manifesto['versao'])
+
+    # Uma sessão lê as colunas que faltam enquanto as outras do mesmo usuário esperam e reaproveitam
+    with dataset['trava']:
+        em_cache = dataset['colunas']
+        if colunas is None:
+            faltam = not dataset['completo']
         else:
-            raise FileNotFoundError
-    
-    except (FileNotFoundError, ValueError, OSError):
-        # Cria um DataFrame vazio com a coluna 'Justificativa' e salva um novo arquivo
-        df_total = pd.DataFrame(columns=[
-            'NÚMERO DO PROTOCOLO', 
-            'USUÁRIO QUE CONCLUIU A TAREFA', 
-            'SITUAÇÃO DA TAREFA', 
-            'TEMPO MÉDIO OPERACIONAL', 
-            'DATA DE CONCLUSÃO DA TAREFA', 
-            'FINALIZAÇÃO',
-            'Justificativa'  # Inclui a coluna de justificativa ao criar um novo DataFrame
-        ])
-        df_total.to_parquet(parquet_file, index=False)
-    
+            faltam = any(c not in em_cache and c not in dataset['ausentes'] for c in colunas)
+
+        if faltam:
+            # As colunas já em cache são relidas junto com as novas, para que todas venham da
+            # mesma leitura e na mesma ordem de linhas; a data de conclusão define essa ordem
+            leitura = None if colunas is None else list(dict.fromkeys(
+                [c for c in em_cache if c not in COLUNAS_DERIVADAS] + list(colunas) + ['DATA DE CONCLUSÃO DA TAREFA']
+            ))
+            lidas = _ler_historico(usuario, leitura, manifesto)
+            if lidas is not None:
+                dataset['colunas'] = em_cache = lidas
+                dataset['ausentes'] = set(leitura or []) - set(lidas)
+                dataset['completo'] = leitura is None
+        em_cache = dict(em_cache)
+
+    if em_cache and periodo is not None:
+        periodo = tuple(pd.Timestamp(d).date() for d in periodo)
+        posicoes = posicoes_periodo(em_cache['DATA DE CONCLUSÃO DA TAREFA'], *periodo)
+        em_cache = {coluna: serie.iloc[posicoes] for coluna, serie in em_cache.items()}
+
+    if not em_cache:
+        # Dataset vazio: cria um DataFrame vazio com a coluna 'Justificativa' (e as colunas pedidas)
+        colunas_vazias = COLUNAS_BASE if colunas is None else list(dict.fromkeys(list(colunas) + COLUNAS_BASE))
+        df_total = compactar_colunas(tipar_colunas(pd.DataFrame(columns=colunas_vazias)))
+    else:
+        selecionadas = list(em_cache) if colunas is None else [c for c in colunas if c in em_cache] + [
+            derivada for derivada, origem in COLUNAS_DERIVADAS.items() if origem in colunas and derivada in em_cache
+        ]
+        # copy=False: o DataFrame da sessão compartilha os arrays do cache, sem duplicar memória (e,
+        # montado dos arrays, recebe um índice 0..n-1 mesmo quando é uma fatia do histórico)
+        df_total = pd.DataFrame({coluna: em_cache[coluna].array for coluna in selecionadas}, copy=False)
+
+    # Verifica se a coluna 'Justificativa' existe, caso contrário, adiciona ela
+    if 'Justificativa' not in df_total.columns and (colunas is None or 'Justificativa' in colunas):
+        df_total['Justificativa'] = ""  # Adiciona a coluna com valores vazios
+
     return df_total
 
-def save_data(df, usuario):
-    import os
-    parquet_file = f'dados_acumulados_{usuario}.parquet'
+def obter_cubo(usuario):
+    """
+    Cubo de TMO (montar_cubo) de todo o dataset do usuário, montado uma vez por versão do
+    dataset e guardado junto das colunas no cache do processo. Os recortes por período e
+    por analista saem dele com filtrar_cubo/consultar_cubo, sem voltar às tarefas.
+    """
+    # A versão é lida antes das tarefas: se um upload acontecer no meio, o cubo é remontado na próxima chamada
+    versao = ler_manifesto(usuario)['versao']
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao and 'cubo' in dataset:
+            return dataset['cubo']
+
+    cubo = montar_cubo(load_data(usuario, COLUNAS_CUBO))
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao:
+            dataset['cubo'] = cubo
+    return cubo
+
+def obter_rollup_mensal(usuario, periodo=None):
+    """
+    Rollup mês × analista × finalização (cubo.montar_rollup_mensal) do dataset do usuário,
+    somado a partir do cubo uma vez por versão do dataset e período e guardado no cache do
+    processo. Com `periodo`, só entram os dias de conclusão dentro do intervalo.
+    """
+    if periodo is not None:
+        periodo = tuple(pd.Timestamp(d).date() for d in periodo)
+    versao = ler_manifesto(usuario)['versao']
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao and periodo in dataset.get('rollups_mensais', {}):
+            return dataset['rollups_mensais'][periodo]
+
+    cubo = obter_cubo(usuario)
+    rollup = montar_rollup_mensal(cubo if periodo is None else filtrar_cubo(cubo, periodo=periodo))
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao:
+            rollups = dataset.setdefault('rollups_mensais', {})
+            if len(rollups) >= MAX_RECORTES_EM_CACHE:
+                rollups.pop(next(iter(rollups)))
+            rollups[periodo] = rollup
+    return rollup
+
+# Produção diária (cadastros + atualizações) que conta como dia na meta nos recordes pessoais
+META_DIARIA_PRODUCAO = 20
+
+def obter_recordes(usuario, periodo=None):
+    """
+    Recordes pessoais de todos os analistas (cubo.montar_recordes), montados a partir do cubo
+    uma vez por versão do dataset e período e guardados no cache do processo, para que a página
+    de cada analista seja só uma consulta. Com `periodo`, só entram os dias dentro do intervalo.
+    """
+    if periodo is not None:
+        periodo = tuple(pd.Timestamp(d).date() for d in periodo)
+    versao = ler_manifesto(usuario)['versao']
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao and periodo in dataset.get('recordes', {}):
+            return dataset['recordes'][periodo]
+
+    cubo = obter_cubo(usuario)
+    recordes = montar_recordes(cubo if periodo is None else filtrar_cubo(cubo, periodo=periodo), META_DIARIA_PRODUCAO)
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao:
+            todos = dataset.setdefault('recordes', {})
+            if len(todos) >= MAX_RECORTES_EM_CACHE:
+                todos.pop(next(iter(todos)))
+            todos[periodo] = recordes
+    return recordes
+
+def recorde_do_analista(recordes, analista):
+    """Linha do analista na tabela de recordes; um analista ausente recebe os recordes nulos."""
+    recorde = recordes.reindex([analista]).iloc[0]
+    if pd.isna(recorde['SEQUENCIA_META']):
+        recorde['SEQUENCIA_META'] = 0
+    return recorde
+
+def obter_ocioso(usuario):
+    """
+    Tabela de tempo ocioso por (analista, dia) do usuário (ocioso.ler_ocioso), mantida pelo
+    save_data e guardada no cache do processo por versão do dataset, como o cubo.
+    """
+    versao = ler_manifesto(usuario)['versao']
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao and 'ocioso' in dataset:
+            return dataset['ocioso']
+
+    tabela = ler_ocioso(usuario)
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao:
+            dataset['ocioso'] = tabela
+    return tabela
+
+def obter_visao_analista(usuario, analista, colunas, periodo):
+    """
+    Pacote de visões de um analista para as Métricas Individuais, no período:
+        - 'tarefas': tarefas do analista (load_data com `colunas` e `periodo`)
+        - 'cubo': recorte do cubo do analista no período
+        - 'metricas': a tupla de calcular_metrica_analista sobre esse cubo
+        - 'recordes': a linha do analista em obter_recordes para o período
+        - 'melhor_tmo_por_dia' e 'melhor_dia_cadastro': os destaques de cadastro, tirados dos recordes
+        - 'ocioso' e 'ocioso_periodo': a tabela de ocioso do analista, inteira e no período
+
+    As posições das linhas de cada analista (groupby().indices) são calculadas uma vez por
+    versão do dataset, período e colunas; o pacote de cada analista é montado no primeiro
+    acesso e fica no cache do processo, então trocar de analista custa só as linhas dele.
+    Os DataFrames do pacote são compartilhados entre as sessões e não devem ser alterados.
+    """
+    periodo = tuple(pd.Timestamp(d).date() for d in periodo)
+    chave = (periodo, tuple(colunas))
+    versao = ler_manifesto(usuario)['versao']
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        entrada = None
+        if dataset is not None and dataset['versao'] == versao:
+            entrada = dataset.get('visoes_analista', {}).get(chave)
+            if entrada is not None and analista in entrada['visoes']:
+                return entrada['visoes'][analista]
+
+    # O índice guarda o DataFrame de onde as posições saíram, para que elas sempre valham para ele
+    if entrada is None:
+        df_total = load_data(usuario, colunas, periodo=periodo)
+        entrada = {
+            'tarefas': df_total,
+            'indices': df_total.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True).indices,
+            'visoes': {},
+        }
+    posicoes = entrada['indices'].get(analista, np.array([], dtype='int64'))
+    tarefas = entrada['tarefas'].take(posicoes)
+
+    cubo = filtrar_cubo(obter_cubo(usuario), periodo=periodo, filtros={'USUÁRIO QUE CONCLUIU A TAREFA': [analista]})
+    df_ocioso = obter_ocioso(usuario)
+    ocioso = df_ocioso[df_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == analista]
+    recorde = recorde_do_analista(obter_recordes(usuario, periodo), analista)
+    visao = {
+        'tarefas': tarefas,
+        'cubo': cubo,
+        'metricas': calcular_metrica_analista(cubo),
+        'recordes': recorde,
+        'melhor_tmo_por_dia': _melhor_tmo_do_recorde(recorde),
+        'melhor_dia_cadastro': _melhor_dia_cadastro_do_recorde(recorde),
+        'ocioso': ocioso,
+        'ocioso_periodo': recortar_periodo(ocioso, *periodo, coluna='DIA'),
+    }
+
+    with _TRAVA_CACHE:
+        dataset = _CACHE_DATASETS.get(usuario)
+        if dataset is not None and dataset['versao'] == versao:
+            visoes = dataset.setdefault('visoes_analista', {})
+            if chave not in visoes:
+                if len(visoes) >= MAX_RECORTES_EM_CACHE:
+                    visoes.pop(next(iter(visoes)))
+                visoes[chave] = entrada
+            visoes[chave]['visoes'][analista] = visao
+    return visao
+
+def salvar_log_ajustes(df_ajustes, usuario):
+    """Salva log: se houver ajustes → CSV detalhado | senão → mensagem simples"""
     log_file = f'log_ajustes_tmo_{usuario}.csv'
-    ajustes = []
+    if not df_ajustes.empty:
+        df_ajustes.to_csv(log_file, index=False)
+    else:
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.write("Nenhum ajuste de TMO foi necessário.\n")
 
+
+def save_data(df, usuario, ajustes=None):
+    """
+    Normaliza as linhas de uma nova planilha e as anexa ao dataset particionado do usuário.
+    Recebe apenas as linhas novas; o histórico já gravado não é relido nem reescrito.
+
+    Na leitura em blocos, passe uma lista em `ajustes`: os ajustes de TMO de cada bloco
+    são acumulados nela e o log é salvo uma vez no fim, com `salvar_log_ajustes`.
+    """
     # Remove colunas desnecessárias
     df = df.loc[:, ~(df.columns.str.upper().str.strip().isin(['ID NIP', 'M.O.', 'Nº LB (JV - CÍVEL)', 'Nº LB (AMIL - CÍVEL)', 'Nº LB (JV TRABALHISTA)']))]
 
@@ -54,69 +338,35 @@ def save_data(df, usuario):
             (df['USUÁRIO QUE CONCLUIU A TAREFA'].str.lower() != 'robohub_amil')
         ]
 
-    # 🔄 Padronizações de TMO
+    # Datas e TMO são convertidos aqui, uma única vez, e gravados já tipados
+    df = tipar_colunas(df)
+
+    # 🔄 Padronizações de TMO (máscaras vetorizadas, uma passada)
+    df_ajustes = pd.DataFrame()
     if 'TEMPO MÉDIO OPERACIONAL' in df.columns and 'FINALIZAÇÃO' in df.columns:
-        df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-
-        for i, row in df.iterrows():
-            tmo = row['TEMPO MÉDIO OPERACIONAL']
-            finalizacao = row['FINALIZAÇÃO']
-            protocolo = row.get('NÚMERO DO PROTOCOLO', 'N/A')
-            novo_tmo = tmo
-
-            if finalizacao == 'CADASTRADO' and pd.notnull(tmo) and tmo < pd.Timedelta(minutes=19):
-                novo_tmo = pd.Timedelta(minutes=20)
-            elif finalizacao == 'ATUALIZADO':
-                if pd.notnull(tmo) and tmo < pd.Timedelta(minutes=3):
-                    novo_tmo = pd.Timedelta(minutes=3)
-                elif pd.notnull(tmo) and tmo > pd.Timedelta(minutes=15):
-                    novo_tmo = pd.Timedelta(minutes=15)
-
-            if pd.notnull(tmo) and tmo > pd.Timedelta(hours=2):
-                novo_tmo = pd.Timedelta(hours=2)
-
-            if pd.notnull(tmo) and novo_tmo != tmo:
-                ajustes.append({
-                    'NÚMERO DO PROTOCOLO': protocolo,
-                    'FINALIZAÇÃO': finalizacao,
-                    'TMO ORIGINAL': tmo,
-                    'TMO AJUSTADO': novo_tmo
-                })
-                df.at[i, 'TEMPO MÉDIO OPERACIONAL'] = novo_tmo
-
-    # Salva o DataFrame atualizado
-    df.to_parquet(parquet_file, index=False)
-
-    # Salva log: se houver ajustes → CSV detalhado | senão → mensagem simples
-    if ajustes:
-        df_ajustes = pd.DataFrame(ajustes)
-        df_ajustes.to_csv(log_file, index=False)
-    else:
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write("Nenhum ajuste de TMO foi necessário.\n")
+        df, df_ajustes = normalizar_tmo(df)
 
-    return df
+    # Anexa as novas linhas às partições mensais, descartando tarefas já conhecidas
+    df = anexar_particoes(df, usuario)
 
-def calcular_tmo_por_dia(df):
-    df['Dia'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA']).dt.date
-    df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizada', 'Cancelada'])].copy()
-    
-    # Agrupando por dia
-    df_tmo = df_finalizados.groupby('Dia').agg(
-        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', 'sum'),  # Soma total do tempo
-        Total_Finalizados_Cancelados=('SITUAÇÃO DA TAREFA', 'count')  # Total de tarefas finalizadas ou canceladas
-    ).reset_index()
+    # Só os ajustes das linhas efetivamente gravadas vão para o log
+    df_ajustes = df_ajustes[df_ajustes.index.isin(df.index)].reset_index(drop=True)
 
-    # Calcula o TMO (Tempo Médio Operacional)
-    df_tmo['TMO'] = df_tmo['Tempo_Total'] / df_tmo['Total_Finalizados_Cancelados']
-    
-    # Formata o tempo médio no formato HH:MM:SS
-    df_tmo['TMO'] = df_tmo['TMO'].apply(format_timedelta)
-    return df_tmo[['Dia', 'TMO']]
+    # Recalcula o tempo ocioso só dos analistas e dias que as linhas novas tocam
+    if not df.empty:
+        atualizar_ocioso(usuario, df)
+
+    if ajustes is not None:
+        if not df_ajustes.empty:
+            ajustes.append(df_ajustes)
+    else:
+        salvar_log_ajustes(df_ajustes, usuario)
+
+    return df
 
 def calcular_tmo_por_dia_geral(df):
     # Certifica-se de que a coluna de data está no formato correto
-    df['Dia'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA']).dt.date
+    df['Dia'] = df['DATA DE CONCLUSÃO DA TAREFA'].dt.date
 
     # Filtra tarefas finalizadas ou canceladas, pois estas são relevantes para o cálculo do TMO
     df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizado', 'Cancelada'])].copy()
@@ -132,155 +382,206 @@ def calcular_tmo_por_dia_geral(df):
     
     # Remove valores nulos e formata o tempo médio para o gráfico
     df_tmo['TMO'] = df_tmo['TMO'].fillna(pd.Timedelta(seconds=0))  # Preenche com zero se houver NaN
-    df_tmo['TMO_Formatado'] = df_tmo['TMO'].apply(format_timedelta)  # Formata para exibição
+    df_tmo['TMO_Formatado'] = formatar_min_s(df_tmo['TMO'])  # Formata para exibição
     
     return df_tmo[['Dia', 'TMO', 'TMO_Formatado']]
 
 def calcular_produtividade_diaria(df):
-    # Garante que a coluna 'Próximo' esteja em formato de data
-    df['Dia'] = df['DATA DE CONCLUSÃO DA TAREFA'].dt.date
-
-    # Agrupa e soma os status para calcular a produtividade
-    df_produtividade = df.groupby('Dia').agg(
-        Finalizado=('FINALIZAÇÃO', 'count'),
-    ).reset_index()
+    # Tarefas com finalização por dia, somadas a partir do cubo (ou do cubo das tarefas recebidas)
+    contagens = consultar_cubo(como_cubo(df), por=['DIA', 'FINALIZAÇÃO'])
+    contagens = contagens.dropna(subset=['DIA'])
+    dias = np.sort(contagens['DIA'].unique().to_numpy(dtype='int64'))
+    finalizado = contagens[contagens['FINALIZAÇÃO'].notna()].groupby('DIA')['LINHAS'].sum()
+
+    df_produtividade = pd.DataFrame({
+        'Dia': dias_como_datas(pd.Series(dias)),
+        'Finalizado': finalizado.reindex(dias, fill_value=0).to_numpy(dtype='int64'),
+    })
 
     # Calcula a produtividade total
     df_produtividade['Produtividade'] = + df_produtividade['Finalizado'] 
     return df_produtividade
 
 def calcular_produtividade_diaria_cadastro(df):
-    # Garante que a coluna 'Próximo' esteja em formato de data
-    df['Dia'] = df['DATA DE CONCLUSÃO DA TAREFA'].dt.date
-
-    # Agrupa e soma os status para calcular a produtividade
-    df_produtividade_cadastro = df.groupby('Dia').agg(
-        Finalizado=('FINALIZAÇÃO', lambda x: x[x == 'CADASTRADO'].count()),
-        Atualizado=('FINALIZAÇÃO', lambda x: x[x == 'ATUALIZADO'].count())
-    ).reset_index()
+    # Cadastros e atualizações por dia, lidos do cubo
+    contagens = consultar_cubo(como_cubo(df), por=['DIA', 'FINALIZAÇÃO'])
+    contagens = contagens.dropna(subset=['DIA'])
+    dias = np.sort(contagens['DIA'].unique().to_numpy(dtype='int64'))
+    por_finalizacao = contagens.pivot_table(
+        index='DIA', columns='FINALIZAÇÃO', values='LINHAS', aggfunc='sum', observed=True
+    ).reindex(index=dias, columns=['CADASTRADO', 'ATUALIZADO']).fillna(0).astype('int64')
+
+    df_produtividade_cadastro = pd.DataFrame({
+        'Dia': dias_como_datas(pd.Series(dias)),
+        'Finalizado': por_finalizacao['CADASTRADO'].to_numpy(),
+        'Atualizado': por_finalizacao['ATUALIZADO'].to_numpy(),
+    })
 
     # Calcula a produtividade total
     df_produtividade_cadastro['Produtividade'] = + df_produtividade_cadastro['Finalizado'] + df_produtividade_cadastro['Atualizado']
     return df_produtividade_cadastro
 
-def convert_to_timedelta_for_calculations(df):
-    df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-    return df
-
-def convert_to_datetime_for_calculations(df):
-    df['DATA DE CONCLUSÃO DA TAREFA'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-    return df
-        
-def format_timedelta(td):
-    if pd.isnull(td):
-        return "0 min"
-    total_seconds = int(td.total_seconds())
-    minutes, seconds = divmod(total_seconds, 60)
-    return f"{minutes} min {seconds}s"
-
-def format_timedelta_grafico_tmo(td):
-    if pd.isnull(td):
-        return "00:00:00"
-    total_seconds = int(td.total_seconds())
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-# Função para calcular o TMO por analista
-def calcular_tmo_por_dia(df):
-    df['Dia'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA']).dt.date
-    df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizada', 'Cancelada'])].copy()
-    
-    # Agrupando por dia
-    df_tmo = df_finalizados.groupby('Dia').agg(
-        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', 'sum'),  # Soma total do tempo
-        Total_Finalizados_Cancelados=('SITUAÇÃO DA TAREFA', 'count')  # Total de tarefas finalizadas ou canceladas
-    ).reset_index()
-
-    # Calcula o TMO (Tempo Médio Operacional)
-    df_tmo['TMO'] = df_tmo['Tempo_Total'] / df_tmo['Total_Finalizados_Cancelados']
-    
-    # Formata o tempo médio no formato HH:MM:SS
-    df_tmo['TMO'] = df_tmo['TMO'].apply(format_timedelta)
-    return df_tmo[['Dia', 'TMO']]
-
 def calcular_tmo_por_dia_cadastro(df):
-    df['Dia'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA']).dt.date
-    df_finalizados_cadastro = df[df['FINALIZAÇÃO'] == 'CADASTRADO'].copy()
-    
-    # Agrupando por dia
-    df_tmo_cadastro = df_finalizados_cadastro.groupby('Dia').agg(
-        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', 'sum'),  # Soma total do tempo
-        Total_Finalizados_Cancelados=('FINALIZAÇÃO', 'count')  # Total de tarefas finalizadas ou canceladas
-    ).reset_index()
+    # Soma e quantidade de cadastros por dia, lidas do cubo
+    df_tmo_cadastro = consultar_cubo(como_cubo(df), por=['DIA'], filtros={'FINALIZAÇÃO': ['CADASTRADO']})
+    df_tmo_cadastro = df_tmo_cadastro.dropna(subset=['DIA']).sort_values('DIA')
+
+    # Calcula o TMO (Tempo Médio Operacional) sobre o total de cadastros do dia
+    tmo = pd.to_timedelta(df_tmo_cadastro['SOMA_NS'], unit='ns') / df_tmo_cadastro['LINHAS']
 
-    # Calcula o TMO (Tempo Médio Operacional)
-    df_tmo_cadastro['TMO'] = df_tmo_cadastro['Tempo_Total'] / df_tmo_cadastro['Total_Finalizados_Cancelados']
-    
     # Formata o tempo médio no formato HH:MM:SS
-    df_tmo_cadastro['TMO'] = df_tmo_cadastro['TMO'].apply(format_timedelta)
-    return df_tmo_cadastro[['Dia', 'TMO']]
+    return pd.DataFrame({
+        'Dia': dias_como_datas(df_tmo_cadastro['DIA']).to_numpy(),
+        'TMO': formatar_min_s(tmo).to_numpy(),
+    })
 
 # Função para calcular o TMO por analista
+def calcular_tmo_por_analista(df):
+    """
+    Soma, contagem e TMO de cada analista em cada finalização, em uma única agregação: as
+    tarefas viram um cubo analista × finalização (montar_cubo) e o TMO sai de consultar_cubo.
+    Analistas nulos ficam de fora; filtros de situação ou de fila devem ser aplicados antes.
+    """
+    dimensoes = ['USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO']
+    tmo = consultar_cubo(montar_cubo(df, dimensoes=dimensoes), por=dimensoes)
+    return tmo[tmo['USUÁRIO QUE CONCLUIU A TAREFA'].notna()].reset_index(drop=True)
+
 def calcular_tmo(df):
     # Verifica se a coluna 'SITUAÇÃO DA TAREFA' existe no DataFrame
     if 'SITUAÇÃO DA TAREFA' not in df.columns:
         raise KeyError("A coluna 'SITUAÇÃO DA TAREFA' não foi encontrada no DataFrame.")
 
     # Filtra as tarefas finalizadas ou canceladas
-    df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizada', 'Cancelada'])].copy()
+    df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizada', 'Cancelada'])]
 
-    # Verifica se a coluna 'TEMPO MÉDIO OPERACIONAL' existe e converte para minutos
+    # Verifica se a coluna 'TEMPO MÉDIO OPERACIONAL' existe
     if 'TEMPO MÉDIO OPERACIONAL' not in df_finalizados.columns:
         raise KeyError("A coluna 'TEMPO MÉDIO OPERACIONAL' não foi encontrada no DataFrame.")
-    df_finalizados['TEMPO_MÉDIO_MINUTOS'] = df_finalizados['TEMPO MÉDIO OPERACIONAL'].dt.total_seconds() / 60
 
     # Verifica se a coluna 'FILA' existe antes de aplicar o filtro
     if 'FILA' in df_finalizados.columns:
         # Remove protocolos da fila "DÚVIDA" com mais de 1 hora de tempo médio
-        df_finalizados = df_finalizados[~((df_finalizados['FILA'] == 'DÚVIDA') & (df_finalizados['TEMPO_MÉDIO_MINUTOS'] > 60))]
-
-    # Agrupando por analista
-    df_tmo_analista = df_finalizados.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', lambda x: x[df_finalizados['FINALIZAÇÃO'] == 'CADASTRADO'].sum()),  # Soma total do tempo das tarefas com finalização CADASTRADO
-        Total_Tarefas=('FINALIZAÇÃO', lambda x: x[x == 'CADASTRADO'].count())  # Total de tarefas finalizadas ou canceladas por analista
-    ).reset_index()
-
-    # Calcula o TMO (Tempo Médio Operacional) como média
-    df_tmo_analista['TMO'] = df_tmo_analista['Tempo_Total'] / df_tmo_analista['Total_Tarefas']
+        df_finalizados = df_finalizados[~((df_finalizados['FILA'] == 'DÚVIDA') & (df_finalizados['TEMPO MÉDIO OPERACIONAL'] > pd.Timedelta(hours=1)))]
+
+    # Soma e total de tarefas CADASTRADO por analista; analistas sem cadastro ficam com TMO nulo
+    tmo = calcular_tmo_por_analista(df_finalizados)
+    analistas = tmo['USUÁRIO QUE CONCLUIU A TAREFA'].unique().sort_values()
+    cadastrados = tmo[tmo['FINALIZAÇÃO'] == 'CADASTRADO'].set_index('USUÁRIO QUE CONCLUIU A TAREFA')
+    tempo_total_ns = cadastrados['SOMA_NS'].reindex(analistas)
+    total_tarefas = cadastrados['LINHAS'].reindex(analistas)
+
+    # Calcula o TMO (Tempo Médio Operacional) como média sobre todas as tarefas CADASTRADO
+    df_tmo_analista = pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical(analistas),
+        'TMO': pd.to_timedelta((tempo_total_ns / total_tarefas.where(total_tarefas > 0)).to_numpy(), unit='ns'),
+    })
 
     # Formata o tempo médio no formato de minutos e segundos
-    df_tmo_analista['TMO_Formatado'] = df_tmo_analista['TMO'].apply(format_timedelta_grafico_tmo)
+    df_tmo_analista['TMO_Formatado'] = formatar_hms(df_tmo_analista['TMO'])
 
     return df_tmo_analista[['USUÁRIO QUE CONCLUIU A TAREFA', 'TMO_Formatado', 'TMO']]
 
-# Função para calcular o ranking dinâmico
-def calcular_ranking(df_total, selected_users):
-    # Filtra o DataFrame com os usuários selecionados
-    df_filtered = df_total[df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)]
-
-    # Agrupa e conta por tipo de finalização
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Finalizado=('FINALIZAÇÃO', lambda x: (x == 'CADASTRADO').sum()),
-        Distribuido=('FINALIZAÇÃO', lambda x: (x == 'REALIZADO').sum()),
-        Atualizado=('FINALIZAÇÃO', lambda x: (x == 'ATUALIZADO').sum())
-    ).reset_index()
-
-    # Total
-    df_ranking['Total'] = df_ranking['Finalizado'] + df_ranking['Distribuido'] + df_ranking['Atualizado']
+# Especificações dos rankings da Visão Geral:
+#   - finalizacoes: finalizações consideradas (None = todas)
+#   - fila: (coluna da taxonomia de filas, valor) que a fila precisa ter (None = sem filtro)
+#   - metricas: coluna do ranking -> finalização contada nela; o Total é a soma dessas colunas
+#   - tmo: acrescenta a coluna 'TMO Médio' das tarefas contadas
+ESPECIFICACOES_RANKING = {
+    'geral': {
+        'finalizacoes': None,
+        'metricas': {'Finalizado': 'CADASTRADO', 'Distribuido': 'REALIZADO', 'Atualizado': 'ATUALIZADO'},
+        'tmo': False,
+    },
+    'cadastro_judicial': {
+        'finalizacoes': ['CADASTRADO'],
+        'fila': ('RANKING_CADASTRO', 'cadastro_judicial'),
+        'metricas': {'Cadastros': 'CADASTRADO'},
+        'tmo': True,
+    },
+    'atualizacao': {
+        'finalizacoes': ['ATUALIZADO'],
+        'metricas': {'Atualizados': 'ATUALIZADO'},
+        'tmo': True,
+    },
+    'cadastro_pre': {
+        'finalizacoes': ['CADASTRADO'],
+        'fila': ('RANKING_CADASTRO', 'cadastro_pre'),
+        'metricas': {'Cadastros': 'CADASTRADO'},
+        'tmo': True,
+    },
+    'cadastro_oficios': {
+        'finalizacoes': ['CADASTRADO'],
+        'fila': ('RANKING_CADASTRO', 'cadastro_oficios'),
+        'metricas': {'Cadastros': 'CADASTRADO'},
+        'tmo': True,
+    },
+    'cadastro_orgaos': {
+        'finalizacoes': ['CADASTRADO'],
+        'fila': ('RANKING_CADASTRO', 'cadastro_orgaos'),
+        'metricas': {'Cadastros': 'CADASTRADO'},
+        'tmo': True,
+    },
+    'auditoria': {
+        'finalizacoes': ['AUDITADO'],
+        'fila': ('AUDITORIA', True),
+        'metricas': {'Cadastros': 'AUDITADO'},
+        'tmo': True,
+    },
+    'distribuicao': {
+        'finalizacoes': ['REALIZADO'],
+        'fila': ('DISTRIBUICAO', True),
+        'metricas': {'Distribuidos': 'REALIZADO'},
+        'tmo': True,
+    },
+}
+
+def base_rankings(df_total):
+    """
+    Agregado analista × fila × finalização que alimenta todos os rankings, calculado em um
+    único agrupamento sobre os códigos das categóricas. Aceita tarefas ou um cubo; o resultado
+    também é um cubo e pode ser passado direto para as funções calcular_ranking_*.
+    """
+    dimensoes = ['USUÁRIO QUE CONCLUIU A TAREFA', 'FILA', 'FINALIZAÇÃO']
+    return consultar_cubo(como_cubo(df_total, dimensoes), por=dimensoes)
 
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista'
-    }, inplace=True)
+def montar_ranking(df_total, nome, selected_users):
+    """
+    Monta o ranking `nome` (chave de ESPECIFICACOES_RANKING) dos analistas selecionados,
+    ordenado pelo Total e com a coluna Posição. Devolve o DataFrame sem estilo.
+    """
+    especificacao = ESPECIFICACOES_RANKING[nome]
+    filtros = {'USUÁRIO QUE CONCLUIU A TAREFA': selected_users}
+    if especificacao['finalizacoes'] is not None:
+        filtros['FINALIZAÇÃO'] = especificacao['finalizacoes']
+    cubo = filtrar_cubo(como_cubo(df_total), filtros=filtros)
+    if especificacao.get('fila') is not None:
+        atributo, valor = especificacao['fila']
+        cubo = cubo[atributo_fila(cubo['FILA'], atributo) == valor]
+
+    # Contagem por analista e finalização; analistas sem nenhuma das finalizações ficam com zero
+    por_finalizacao = cubo.groupby(['USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO'], observed=True, dropna=False)['LINHAS'].sum()
+    por_analista = cubo.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True)[MEDIDAS_CUBO].sum()
+    contagens = por_finalizacao.unstack('FINALIZAÇÃO').reindex(index=por_analista.index)
+
+    df_ranking = pd.DataFrame({'Analista': por_analista.index})
+    for coluna, finalizacao in especificacao['metricas'].items():
+        if finalizacao in contagens.columns:
+            df_ranking[coluna] = contagens[finalizacao].fillna(0).astype('int64').to_numpy()
+        else:
+            df_ranking[coluna] = 0
+    if especificacao['tmo']:
+        tmo = pd.to_timedelta(por_analista['SOMA_NS'] / por_analista['CONTAGEM'].where(por_analista['CONTAGEM'] > 0), unit='ns')
+        df_ranking['TMO Médio'] = formatar_hms(tmo).to_numpy()
+    df_ranking['Total'] = df_ranking[list(especificacao['metricas'])].sum(axis=1)
 
-    # Ordena pelo total
+    # Ordena pelo total e adiciona a coluna Posição como coluna real (não índice)
     df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona coluna de posição (como coluna real)
     df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
+    return df_ranking
 
-    # Define tamanho dos quartis
+def estilizar_ranking(df_ranking, centralizar=False):
+    """Colore as linhas do ranking por quartil de posição e formata as contagens."""
+    # Define o tamanho dos quartis
     num_analistas = len(df_ranking)
     quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
 
@@ -296,561 +597,113 @@ def calcular_ranking(df_total, selected_users):
             color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
         return ['background-color: {}'.format(color)] * len(row)
 
-    # Aplica estilos com alinhamento central opcional
+    colunas_contagem = [c for c in df_ranking.columns if c not in ('Posição', 'Analista', 'TMO Médio')]
     styled_df_ranking = df_ranking.style \
         .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Finalizado': '{:.0f}',
-            'Distribuido': '{:.0f}',
-            'Atualizado': '{:.0f}',
-            'Total': '{:.0f}'
-        }) \
-        .set_table_styles([
+        .format({coluna: '{:.0f}' for coluna in colunas_contagem})
+
+    # Alinhamento central opcional
+    if centralizar:
+        styled_df_ranking = styled_df_ranking.set_table_styles([
             {'selector': 'th', 'props': [('text-align', 'center')]},
             {'selector': 'td', 'props': [('text-align', 'center')]},
             {'selector': 'th.col0', 'props': [('width', '80px')]},
             {'selector': 'td.col0', 'props': [('width', '80px')]}
         ])
-
     return styled_df_ranking
 
-def calcular_ranking_atualizacao(df_total, selected_users):
-    # Filtra apenas os cadastros válidos (excluindo filas irrelevantes)
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'ATUALIZADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Atualizados=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Atualizados']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Estiliza com formatação
-    styled_df_ranking_cadastro = df_ranking.style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
+# Função para calcular o ranking dinâmico
+def calcular_ranking(df_total, selected_users):
+    return estilizar_ranking(montar_ranking(df_total, 'geral', selected_users), centralizar=True)
 
-    return styled_df_ranking_cadastro
+def calcular_ranking_atualizacao(df_total, selected_users):
+    return estilizar_ranking(montar_ranking(df_total, 'atualizacao', selected_users))
 
 def calcular_ranking_cadastro_judicial(df_total, selected_users):
-    # Filtra apenas os cadastros válidos (excluindo filas irrelevantes)
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'CADASTRADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (~df_total['FILA'].isin([
-            'OFICIOS',
-            'PRE CADASTRO E DIJUR',
-            'PRE CADASTRO E DIJUR - JV',
-            'CADASTRO DE ÓRGÃOS E OFÍCIOS',
-            'CADASTRO ANS (AUTO DE INFRAÇÃO)'
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Cadastros=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Cadastros']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Estiliza com formatação
-    styled_df_ranking_atualizacao = df_ranking.style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_atualizacao
+    return estilizar_ranking(montar_ranking(df_total, 'cadastro_judicial', selected_users))
 
 def calcular_ranking_cadastro_pre(df_total, selected_users):
-    # Filtra apenas cadastros nas filas específicas
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'CADASTRADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (df_total['FILA'].isin([
-            'PRE CADASTRO E DIJUR',
-            'PRE CADASTRO E DIJUR - JV'
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Cadastros=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Cadastros']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Aplica estilos
-    styled_df_ranking_pre_cadastro = df_ranking.reset_index(drop=True) \
-        .style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_pre_cadastro
+    return estilizar_ranking(montar_ranking(df_total, 'cadastro_pre', selected_users))
 
 def calcular_ranking_cadastro_oficios(df_total, selected_users):
-    # Filtra apenas cadastros nas filas específicas
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'CADASTRADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (df_total['FILA'].isin([
-            'OFICIOS',
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Cadastros=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Cadastros']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Aplica estilos
-    styled_df_ranking_cadastro_oficios = df_ranking.reset_index(drop=True) \
-        .style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_cadastro_oficios
+    return estilizar_ranking(montar_ranking(df_total, 'cadastro_oficios', selected_users))
 
 def calcular_ranking_cadastro_orgaos(df_total, selected_users):
-    # Filtra apenas cadastros nas filas específicas
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'CADASTRADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (df_total['FILA'].isin([
-            'CADASTRO DE ÓRGÃOS E OFÍCIOS',
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Cadastros=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Cadastros']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Aplica estilos
-    styled_df_ranking_cadastro_orgaos = df_ranking.reset_index(drop=True) \
-        .style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_cadastro_orgaos
+    return estilizar_ranking(montar_ranking(df_total, 'cadastro_orgaos', selected_users))
 
 def calcular_ranking_auditoria(df_total, selected_users):
-    # Filtra apenas cadastros nas filas específicas
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'AUDITADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (df_total['FILA'].isin([
-            'AUDITORIA - CADASTRO',
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Cadastros=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
-
-    df_ranking['Total'] = df_ranking['Cadastros']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
-
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Aplica estilos
-    styled_df_ranking_auditoria = df_ranking.reset_index(drop=True) \
-        .style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_auditoria
+    return estilizar_ranking(montar_ranking(df_total, 'auditoria', selected_users))
 
 def calcular_ranking_distribuicao(df_total, selected_users):
-    # Filtra apenas cadastros nas filas específicas
-    df_filtered = df_total[
-        (df_total['FINALIZAÇÃO'] == 'REALIZADO') &
-        (df_total['USUÁRIO QUE CONCLUIU A TAREFA'].isin(selected_users)) &
-        (df_total['FILA'].isin([
-            'DISTRIBUIÇÃO - AMIL + JV', 
-            'DISTRIBUIÇÃO - JV CÍVEL', 
-            'DISTRIBUIÇÃO - PRÉ CADASTRO', 
-            'DISTRIBUIÇÃO - PRÉ CADASTRO - JV', 
-            'DISTRIBUICAO'
-        ]))
-    ]
-
-    # Agrupa por usuário: conta cadastros e calcula TMO médio
-    df_ranking = df_filtered.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
-        Distribuidos=('FINALIZAÇÃO', 'count'),
-        TMO_Médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
-    ).reset_index()
+    return estilizar_ranking(montar_ranking(df_total, 'distribuicao', selected_users))
 
-    df_ranking['Total'] = df_ranking['Distribuidos']
-
-    # Renomeia a coluna de usuário
-    df_ranking.rename(columns={
-        'USUÁRIO QUE CONCLUIU A TAREFA': 'Analista',
-        'TMO_Médio': 'TMO Médio'
-    }, inplace=True)
-
-    # Ordena pelo total
-    df_ranking = df_ranking.sort_values(by='Total', ascending=False).reset_index(drop=True)
+# Destaques por fila: terceirizados (_ter) e o usuário de administração não entram
+USUARIOS_FORA_DOS_DESTAQUES = ['viniciusgimenes_amil']
+FINALIZACOES_DESTAQUE = ['CADASTRADO', 'ATUALIZADO']
+POSICOES_POR_FILA = 3
+VOLUME_MINIMO_POR_FILA = 10
 
-    # Adiciona a coluna Posição como coluna real (não índice)
-    df_ranking.insert(0, 'Posição', range(1, len(df_ranking) + 1))
-
-    # Define o tamanho dos quartis
-    num_analistas = len(df_ranking)
-    quartil_size = 4 if num_analistas > 12 else math.ceil(num_analistas / 4)
-
-    # Estilização por quartis
-    def apply_dynamic_quartile_styles(row):
-        if row['Posição'] <= quartil_size:
-            color = 'rgba(135, 206, 250, 0.4)'  # Azul
-        elif row['Posição'] <= 2 * quartil_size:
-            color = 'rgba(144, 238, 144, 0.4)'  # Verde
-        elif row['Posição'] <= 3 * quartil_size:
-            color = 'rgba(255, 255, 102, 0.4)'  # Amarelo
-        else:
-            color = 'rgba(255, 99, 132, 0.4)'   # Vermelho
-        return ['background-color: {}'.format(color)] * len(row)
-
-    # Formatação do TMO
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    df_ranking['TMO Médio'] = df_ranking['TMO Médio'].apply(format_timedelta)
-
-    # Aplica estilos
-    styled_df_ranking_distribuidos = df_ranking.reset_index(drop=True) \
-        .style \
-        .apply(apply_dynamic_quartile_styles, axis=1) \
-        .format({
-            'Cadastros': '{:.0f}',
-            'Total': '{:.0f}',
-            'TMO Médio': '{}'
-        })
-
-    return styled_df_ranking_distribuidos
-
-def obter_melhor_analista_por_fila(df):
-    df = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])].copy()
-    df = df[~df['USUÁRIO QUE CONCLUIU A TAREFA'].str.contains('_ter', na=False)]
-    df = df[df['USUÁRIO QUE CONCLUIU A TAREFA'] != 'viniciusgimenes_amil']
-    df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-    agrupado = df.groupby(['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA'])
-    resultado = agrupado.agg(
-        TMO=('TEMPO MÉDIO OPERACIONAL', 'mean'),
-        Quantidade=('TEMPO MÉDIO OPERACIONAL', 'count')
-    ).reset_index()
+def _analistas_por_fila(df):
+    """
+    Cadastros e atualizações somados por (fila, analista), a partir das tarefas ou do cubo,
+    já sem terceirizados, sem o usuário de administração e sem fila ou analista nulos.
+    """
+    cubo = como_cubo(df, dimensoes=['USUÁRIO QUE CONCLUIU A TAREFA', 'FILA', 'FINALIZAÇÃO'])
+    resultado = consultar_cubo(
+        cubo, por=['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA'], filtros={'FINALIZAÇÃO': FINALIZACOES_DESTAQUE}
+    )
+    usuario = resultado['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str)
+    validos = (
+        resultado['FILA'].notna() & resultado['USUÁRIO QUE CONCLUIU A TAREFA'].notna()
+        & ~usuario.str.contains('_ter', regex=False) & ~usuario.isin(USUARIOS_FORA_DOS_DESTAQUES)
+    )
+    return resultado[validos]
 
-    melhores = resultado.loc[resultado.groupby('FILA')['TMO'].idxmin()].reset_index(drop=True)
-    melhores['TMO'] = melhores['TMO'].apply(lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}")
+def obter_melhor_analista_por_fila(df, n=POSICOES_POR_FILA, volume_minimo=VOLUME_MINIMO_POR_FILA):
+    """
+    Os `n` analistas de menor TMO em cada fila (cadastros e atualizações), entre os que têm ao
+    menos `volume_minimo` tarefas com TMO na fila. Empatados dividem a posição.
+    Aceita as tarefas ou um recorte do cubo.
+    """
+    colunas = ['FILA', 'POSIÇÃO', 'USUÁRIO QUE CONCLUIU A TAREFA', 'TMO', 'Quantidade']
+    colunas_necessarias = {'FINALIZAÇÃO', 'USUÁRIO QUE CONCLUIU A TAREFA', 'FILA'} | (set() if eh_cubo(df) else {'TEMPO MÉDIO OPERACIONAL'})
+    if not colunas_necessarias.issubset(df.columns):
+        return pd.DataFrame(columns=colunas)
+
+    resultado = _analistas_por_fila(df).rename(columns={'CONTAGEM': 'Quantidade'})
+    melhores = top_n_por_grupo(
+        resultado, 'FILA', 'TMO', n=n, ascendente=True,
+        minimo=volume_minimo, coluna_volume='Quantidade', desempate='USUÁRIO QUE CONCLUIU A TAREFA'
+    )[colunas]
+    melhores['TMO'] = formatar_hms(melhores['TMO'])
     return melhores
 
-def obter_maior_quantidade_por_fila(df):
+def obter_maior_quantidade_por_fila(df, n=POSICOES_POR_FILA):
+    """
+    Os `n` analistas com mais cadastros e atualizações em cada fila. Empatados dividem a posição.
+    Aceita as tarefas ou um recorte do cubo.
+    """
+    colunas = ['FILA', 'POSIÇÃO', 'USUÁRIO QUE CONCLUIU A TAREFA', 'Quantidade']
     colunas_necessarias = {'FINALIZAÇÃO', 'USUÁRIO QUE CONCLUIU A TAREFA', 'FILA'}
     if not colunas_necessarias.issubset(df.columns):
-        return pd.DataFrame(columns=['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'Quantidade'])
-
-    df = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])].copy()
-    df = df[~df['USUÁRIO QUE CONCLUIU A TAREFA'].str.contains("_ter|viniciusgimenes_amil", na=False)]
-
-    if df.empty:
-        return pd.DataFrame(columns=['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'Quantidade'])
+        return pd.DataFrame(columns=colunas)
 
-    resultado = df.groupby(['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA']).size().reset_index(name='Quantidade')
-    maiores = resultado.loc[resultado.groupby('FILA')['Quantidade'].idxmax()].reset_index(drop=True)
-    return maiores
+    resultado = _analistas_por_fila(df).rename(columns={'LINHAS': 'Quantidade'})
+    return top_n_por_grupo(
+        resultado, 'FILA', 'Quantidade', n=n, ascendente=False, desempate='USUÁRIO QUE CONCLUIU A TAREFA'
+    )[colunas]
 
-def exibir_maior_quantidade_por_fila(df):
+def exibir_maior_quantidade_por_fila(df, n=POSICOES_POR_FILA):
     st.subheader("Melhor Analista por Fila (Quantidade)")
-    maiores = obter_maior_quantidade_por_fila(df)
+    maiores = obter_maior_quantidade_por_fila(df, n=n)
     if maiores.empty:
         st.info("Ainda não há dados para exibir o analista com maior quantidade por fila.")
     else:
         st.dataframe(maiores, hide_index=True, use_container_width=True)
 
-def obter_melhor_analista_por_fila(df):
-    colunas_necessarias = {'FINALIZAÇÃO', 'USUÁRIO QUE CONCLUIU A TAREFA', 'FILA', 'TEMPO MÉDIO OPERACIONAL'}
-    if not colunas_necessarias.issubset(df.columns):
-        return pd.DataFrame(columns=['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'TMO', 'Quantidade'])
-
-    df = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])].copy()
-    df = df[~df['USUÁRIO QUE CONCLUIU A TAREFA'].str.contains('_ter', na=False)]
-    df = df[df['USUÁRIO QUE CONCLUIU A TAREFA'] != 'viniciusgimenes_amil']
-    df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-
-    if df.empty:
-        return pd.DataFrame(columns=['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'TMO', 'Quantidade'])
-
-    agrupado = df.groupby(['FILA', 'USUÁRIO QUE CONCLUIU A TAREFA'])
-    resultado = agrupado.agg(
-        TMO=('TEMPO MÉDIO OPERACIONAL', 'mean'),
-        Quantidade=('TEMPO MÉDIO OPERACIONAL', 'count')
-    ).reset_index()
-
-    melhores = resultado.loc[resultado.groupby('FILA')['TMO'].idxmin()].reset_index(drop=True)
-    melhores['TMO'] = melhores['TMO'].apply(lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}")
-    return melhores
-
-def exibir_melhor_analista_por_fila(df):
+def exibir_melhor_analista_por_fila(df, n=POSICOES_POR_FILA, volume_minimo=VOLUME_MINIMO_POR_FILA):
     st.subheader("Melhor Analista por Fila (TMO)")
-    melhores = obter_melhor_analista_por_fila(df)
+    melhores = obter_melhor_analista_por_fila(df, n=n, volume_minimo=volume_minimo)
     if melhores.empty:
         st.info("Ainda não há dados para exibir o melhor analista por fila.")
     else:
@@ -866,7 +719,7 @@ def calcular_cadastro_atualizacao_por_modulo(df):
     df = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])].copy()
 
     # Agrupa e conta
-    df_resultado = df.groupby(['MÓDULO LB', 'FINALIZAÇÃO']).size().unstack(fill_value=0).reset_index()
+    df_resultado = df.groupby(['MÓDULO LB', 'FINALIZAÇÃO'], observed=True).size().unstack(fill_value=0).reset_index()
     df_resultado.columns.name = None  # remove nome do índice de coluna
     return df_resultado
 
@@ -889,31 +742,28 @@ def calcular_metrica_analista(df_analista):
     # Verifica se as colunas necessárias estão presentes no DataFrame
     colunas_necessarias = ['FILA', 'FINALIZAÇÃO', 'TEMPO MÉDIO OPERACIONAL', 'DATA DE CONCLUSÃO DA TAREFA']
     for coluna in colunas_necessarias:
-        if coluna not in df_analista.columns:
+        if coluna not in df_analista.columns and not eh_cubo(df_analista):
             st.warning(f"A coluna '{coluna}' não está disponível nos dados. Verifique o arquivo carregado.")
             return None, None, None, None, None, None, None  # Atualizado para retornar sete valores
 
-    # Excluir os registros com "FILA" como "Desconhecida"
-    df_analista_filtrado = df_analista[df_analista['FILA'] != "Desconhecida"]
-
-    # Filtrar os registros com status "CADASTRADO", "ATUALIZADO" e "REALIZADO"
-    df_filtrados = df_analista_filtrado[df_analista_filtrado['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'])]
-
-    # Converter "TEMPO MÉDIO OPERACIONAL" para minutos
-    df_filtrados['TEMPO_MÉDIO_MINUTOS'] = df_filtrados['TEMPO MÉDIO OPERACIONAL'].dt.total_seconds() / 60
+    # Células do cubo do analista, sem a FILA "Desconhecida" e só com CADASTRADO, ATUALIZADO e REALIZADO
+    cubo = filtrar_cubo(
+        como_cubo(df_analista),
+        filtros={'FINALIZAÇÃO': ['CADASTRADO', 'ATUALIZADO', 'REALIZADO']},
+        excluir={'FILA': ['Desconhecida']}
+    )
 
     # Excluir registros da fila "DÚVIDA" com tempo médio superior a 1 hora
-    df_filtrados = df_filtrados[~((df_filtrados['FILA'] == 'DÚVIDA') & (df_filtrados['TEMPO_MÉDIO_MINUTOS'] > 60))]
-
-    # Calcula totais conforme os filtros de status
-    total_finalizados = len(df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'CADASTRADO'])
-    total_realizados = len(df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'REALIZADO'])
-    total_atualizado = len(df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'ATUALIZADO'])
+    cubo = cubo[~((cubo['FILA'] == 'DÚVIDA') & cubo[COLUNA_ACIMA_1H])]
 
-    # Calcula o tempo total para cada tipo de tarefa
-    tempo_total_cadastrado = df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'CADASTRADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-    tempo_total_atualizado = df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'ATUALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-    tempo_total_realizado = df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'REALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum()
+    # Totais e tempo total por tipo de tarefa
+    por_finalizacao = consultar_cubo(cubo, por=['FINALIZAÇÃO']).set_index('FINALIZAÇÃO')
+    total_finalizados, total_atualizado, total_realizados = (
+        int(por_finalizacao['LINHAS'].get(finalizacao, 0)) for finalizacao in ['CADASTRADO', 'ATUALIZADO', 'REALIZADO']
+    )
+    tempo_total_cadastrado, tempo_total_atualizado, tempo_total_realizado = (
+        tempo_total(por_finalizacao['SOMA_NS'].get(finalizacao, 0)) for finalizacao in ['CADASTRADO', 'ATUALIZADO', 'REALIZADO']
+    )
 
     # Calcula o tempo médio para cada tipo de tarefa
     tmo_cadastrado = tempo_total_cadastrado / total_finalizados if total_finalizados > 0 else pd.Timedelta(0)
@@ -925,57 +775,22 @@ def calcular_metrica_analista(df_analista):
     tempo_medio_analista = tempo_total_analista / total_tarefas if total_tarefas > 0 else pd.Timedelta(0)
 
     # Calcular a média de cadastros por dias trabalhados
-    dias_trabalhados = df_filtrados[df_filtrados['FINALIZAÇÃO'] == 'CADASTRADO']['DATA DE CONCLUSÃO DA TAREFA'].dt.date.nunique()
+    dias_trabalhados = cubo.loc[cubo['FINALIZAÇÃO'] == 'CADASTRADO', 'DIA'].nunique()
     media_cadastros_por_dia = int(total_finalizados / dias_trabalhados) if dias_trabalhados > 0 else 0
 
     return total_finalizados, total_atualizado, tempo_medio_analista, tmo_cadastrado, tmo_atualizado, total_realizados, media_cadastros_por_dia, dias_trabalhados
 
 def calcular_tempo_ocioso_por_analista(df):
-    try:
-        df['DATA DE INÍCIO DA TAREFA'] = pd.to_datetime(
-            df['DATA DE INÍCIO DA TAREFA'], format='%d/%m/%Y %H:%M:%S', errors='coerce'
-        )
-        df['DATA DE CONCLUSÃO DA TAREFA'] = pd.to_datetime(
-            df['DATA DE CONCLUSÃO DA TAREFA'], format='%d/%m/%Y %H:%M:%S', errors='coerce'
-        )
-
-        df = df.dropna(subset=['DATA DE INÍCIO DA TAREFA', 'DATA DE CONCLUSÃO DA TAREFA']).reset_index(drop=True)
-        df = df.sort_values(by=['USUÁRIO QUE CONCLUIU A TAREFA', 'DATA DE INÍCIO DA TAREFA']).reset_index(drop=True)
-        df['PRÓXIMA_TAREFA'] = df.groupby(['USUÁRIO QUE CONCLUIU A TAREFA'])['DATA DE INÍCIO DA TAREFA'].shift(-1)
-        df['TEMPO OCIOSO'] = df['PRÓXIMA_TAREFA'] - df['DATA DE CONCLUSÃO DA TAREFA']
-        df['TEMPO OCIOSO'] = df['TEMPO OCIOSO'].apply(
-            lambda x: x if pd.notnull(x) and pd.Timedelta(0) < x <= pd.Timedelta(hours=1) else pd.Timedelta(0)
-        )
-
-        df_soma_ocioso = df.groupby(['USUÁRIO QUE CONCLUIU A TAREFA', df['DATA DE CONCLUSÃO DA TAREFA'].dt.date])['TEMPO OCIOSO'].sum().reset_index()
-        df_soma_ocioso = df_soma_ocioso.rename(columns={
-            'DATA DE CONCLUSÃO DA TAREFA': 'Data',
-            'TEMPO OCIOSO': 'Tempo Ocioso'
-        })
-
-        # 👉 Formatação para visualização
-        df_soma_ocioso['Tempo Ocioso Formatado'] = df_soma_ocioso['Tempo Ocioso'].astype(str).str.split("days").str[-1].str.strip()
-
-        # 👉 Calculando média por analista (em minutos)
-        df_soma_ocioso['Tempo Ocioso em Minutos'] = df_soma_ocioso['Tempo Ocioso'].dt.total_seconds() / 60
-        media_ociosa_por_analista = df_soma_ocioso.groupby('USUÁRIO QUE CONCLUIU A TAREFA')['Tempo Ocioso em Minutos'].mean().reset_index()
-        media_ociosa_por_analista = media_ociosa_por_analista.rename(columns={'Tempo Ocioso em Minutos': 'Média (min)'})
-
-        return df_soma_ocioso[['USUÁRIO QUE CONCLUIU A TAREFA', 'Data', 'Tempo Ocioso Formatado']]
-
-    except Exception as e:
-        return pd.DataFrame({'Erro': [f'Erro: {str(e)}']})
-
-def format_timedelta_hms(td):
-    """ Formata um timedelta para HH:MM:SS """
-    if pd.isnull(td):
-        return "00:00:00"
-    total_seconds = int(td.total_seconds())
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
+    """
+    Tempo ocioso por analista e dia de conclusão, em minutos (coluna 'Tempo Ocioso em Minutos').
+    O cálculo (blocos de tarefas sobrepostas, intervalos de até 1h) fica em ocioso.ocioso_por_dia;
+    a formatação para exibição é feita por quem mostra o valor.
+    """
+    if not set(COLUNAS_OCIOSO).issubset(df.columns):
+        return pd.DataFrame(columns=['USUÁRIO QUE CONCLUIU A TAREFA', 'Data', COLUNA_OCIOSO])
+    return ocioso_por_dia(df)[['USUÁRIO QUE CONCLUIU A TAREFA', 'Data', COLUNA_OCIOSO]]
 
-def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custom_colors, st):
+def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custom_colors, st, df_ocioso=None):
     """
     Gera e exibe um gráfico de barras com o Tempo Ocioso diário para um analista específico.
 
@@ -984,13 +799,13 @@ def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custo
         - analista_selecionado: Nome do analista selecionado.
         - custom_colors: Lista de cores personalizadas para o gráfico.
         - st: Referência para o módulo Streamlit (necessário para exibir os resultados).
+        - df_ocioso: Tabela de ocioso por analista e dia já calculada (obter_ocioso); se
+          omitida, o ocioso é calculado a partir de df_analista.
     """
 
-    # Calcular o tempo ocioso diário por analista
-    df_ocioso = calcular_tempo_ocioso_por_analista(df_analista)
-
-    # Converter a coluna 'Tempo Ocioso' para timedelta para cálculos
-    df_ocioso['Tempo Ocioso'] = pd.to_timedelta(df_ocioso['Tempo Ocioso Formatado'], errors='coerce')
+    # Tempo ocioso diário por analista, da tabela materializada ou calculado na hora
+    if df_ocioso is None:
+        df_ocioso = ocioso_por_dia(df_analista)
 
     # Filtrar apenas o analista selecionado
     df_ocioso = df_ocioso[df_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == analista_selecionado]
@@ -1008,17 +823,14 @@ def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custo
         format="DD MMM YYYY"  # Formato: Dia Mês Ano (Exemplo: 01 Jan 2025)
     )
 
-    # Filtrar os dados com base no período selecionado
-    df_ocioso = df_ocioso[
-        (df_ocioso['Data'] >= periodo_selecionado[0]) &
-        (df_ocioso['Data'] <= periodo_selecionado[1])
-    ]
-
-    # Formatar a coluna 'Tempo Ocioso' para exibição no gráfico como HH:MM:SS
-    df_ocioso['Tempo Ocioso Formatado'] = df_ocioso['Tempo Ocioso'].apply(format_timedelta_hms)
+    # Filtrar os dados com base no período selecionado (pela chave inteira de dia, já ordenada)
+    df_ocioso = recortar_periodo(df_ocioso, periodo_selecionado[0], periodo_selecionado[1], coluna='DIA').copy()
 
     # Converter tempo ocioso para total de segundos (para exibição correta no gráfico)
-    df_ocioso['Tempo Ocioso Segundos'] = df_ocioso['Tempo Ocioso'].dt.total_seconds()
+    df_ocioso['Tempo Ocioso Segundos'] = df_ocioso[COLUNA_OCIOSO] * 60
+
+    # Formatar o tempo ocioso para exibição no gráfico como HH:MM:SS
+    df_ocioso['Tempo Ocioso Formatado'] = formatar_hms(df_ocioso['Tempo Ocioso Segundos'])
 
     # Criar o gráfico de barras
     fig_ocioso = px.bar(
@@ -1040,7 +852,7 @@ def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custo
         yaxis=dict(
             title='Tempo Ocioso (HH:MM:SS)',
             tickvals=[i * 3600 for i in range(0, int(df_ocioso['Tempo Ocioso Segundos'].max() // 3600) + 1)],
-            ticktext=[format_timedelta_hms(pd.Timedelta(seconds=i * 3600)) for i in range(0, int(df_ocioso['Tempo Ocioso Segundos'].max() // 3600) + 1)]
+            ticktext=list(formatar_hms(np.arange(0, int(df_ocioso['Tempo Ocioso Segundos'].max() // 3600) + 1) * 3600))
         ),
         bargap=0.2  # Espaçamento entre as barras
     )
@@ -1055,11 +867,21 @@ def exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custo
     # Exibir o gráfico na dashboard
     st.plotly_chart(fig_ocioso, use_container_width=True)
 
+def calcular_tmo_equipe(df_total):
+    """
+    TMO médio da equipe em cada finalização (Series indexada pela finalização), somando as
+    somas e contagens por analista de calcular_tmo_por_analista.
+    """
+    tmo = calcular_tmo_por_analista(df_total)
+    por_finalizacao = tmo.groupby('FINALIZAÇÃO', observed=True)[['SOMA_NS', 'CONTAGEM']].sum()
+    media_ns = por_finalizacao['SOMA_NS'] / por_finalizacao['CONTAGEM'].where(por_finalizacao['CONTAGEM'] > 0)
+    return pd.Series(pd.to_timedelta(media_ns.to_numpy(), unit='ns'), index=por_finalizacao.index.astype(object))
+
 def calcular_tmo_equipe_cadastro(df_total):
-    return df_total[df_total['FINALIZAÇÃO'].isin(['CADASTRADO'])]['TEMPO MÉDIO OPERACIONAL'].mean()
+    return calcular_tmo_equipe(df_total).get('CADASTRADO', pd.NaT)
 
 def calcular_tmo_equipe_atualizado(df_total):
-    return df_total[df_total['FINALIZAÇÃO'].isin(['ATUALIZADO'])]['TEMPO MÉDIO OPERACIONAL'].mean()
+    return calcular_tmo_equipe(df_total).get('ATUALIZADO', pd.NaT)
 
 def calcular_filas_analista(df_analista):
     if 'Carteira' in df_analista.columns:
@@ -1077,7 +899,7 @@ def calcular_filas_analista(df_analista):
         ).reset_index()
 
         # Converte o TMO médio para minutos e segundos
-        carteiras_analista['TMO_médio'] = carteiras_analista['TMO_médio'].apply(format_timedelta)
+        carteiras_analista['TMO_médio'] = formatar_min_s(carteiras_analista['TMO_médio'])
 
         # Renomeia as colunas para exibição
         carteiras_analista = carteiras_analista.rename(
@@ -1093,11 +915,13 @@ def calcular_filas_analista(df_analista):
 
 
 def calcular_tmo_por_dia(df_analista):
-    # Filtrar apenas as tarefas com finalização "CADASTRADO"
-    df_analista = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO']
-    df_analista['Dia'] = df_analista['DATA DE CONCLUSÃO DA TAREFA'].dt.date
-    tmo_por_dia = df_analista.groupby('Dia').agg(TMO=('TEMPO MÉDIO OPERACIONAL', 'mean')).reset_index()
-    return tmo_por_dia
+    # TMO médio diário das tarefas com finalização "CADASTRADO", lido do cubo
+    tmo_por_dia = consultar_cubo(como_cubo(df_analista), por=['DIA'], filtros={'FINALIZAÇÃO': ['CADASTRADO']})
+    tmo_por_dia = tmo_por_dia.dropna(subset=['DIA']).sort_values('DIA')
+    return pd.DataFrame({
+        'Dia': dias_como_datas(tmo_por_dia['DIA']).to_numpy(),
+        'TMO': tmo_por_dia['TMO'].to_numpy(),
+    })
 
 def calcular_carteiras_analista(df_analista):
     if 'Carteira' in df_analista.columns:
@@ -1144,7 +968,7 @@ def get_points_of_attention(df):
     pontos_de_atencao = pontos_de_atencao.rename(columns={'Tempo de Análise': 'TEMPO'})
 
     # Converte a coluna 'TEMPO' para formato de minutos
-    pontos_de_atencao['TEMPO'] = pontos_de_atencao['TEMPO'].apply(lambda x: f"{int(x.total_seconds() // 60)}:{int(x.total_seconds() % 60):02d}")
+    pontos_de_atencao['TEMPO'] = formatar_m_ss(pontos_de_atencao['TEMPO'])
 
     # Remove qualquer protocolo com valores vazios ou NaN
     pontos_de_atencao = pontos_de_atencao.dropna(subset=['Protocolo'])
@@ -1157,104 +981,75 @@ def get_points_of_attention(df):
 
     return pontos_de_atencao
 
-def calcular_tmo_por_carteira(df):
+def calcular_tmo_por_carteira(df, cubo=None):
+    """
+    Quantidades e TMOs por fila (Cadastro, Atualização, Distribuição, Auditoria e Fora do Escopo) das
+    tarefas `df`. Os TMOs e as quantidades de tarefas saem de um único pivô de contagem/soma do TMO por
+    (FILA, FINALIZAÇÃO), tirado de `cubo` (o cubo das mesmas tarefas, se já estiver montado) ou de `df`;
+    a quantidade Fora do Escopo conta protocolos e por isso vem das tarefas.
+    Tarefas sem TMO não entram em nenhuma coluna.
+    """
     required_columns = {'FILA', 'TEMPO MÉDIO OPERACIONAL', 'FINALIZAÇÃO', 'NÚMERO DO PROTOCOLO'}
     if not required_columns.issubset(df.columns):
         return "As colunas necessárias não foram encontradas no DataFrame."
 
-    df = df.dropna(subset=['TEMPO MÉDIO OPERACIONAL'])
-
     if not pd.api.types.is_timedelta64_dtype(df['TEMPO MÉDIO OPERACIONAL']):
         return "A coluna 'TEMPO MÉDIO OPERACIONAL' contém valores que não são do tipo timedelta."
 
-    df_unique = df.drop_duplicates(subset=['NÚMERO DO PROTOCOLO'])
-
-    df_tmo = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO']) & (df['FILA'] != 'Distribuição')]
-
-    tmo_por_carteira = df_tmo.groupby('FILA').agg(
-        Quantidade=('FILA', 'size'),
-        Cadastrado=('FINALIZAÇÃO', lambda x: (x == 'CADASTRADO').sum()),
-        Atualizado=('FINALIZAÇÃO', lambda x: (x == 'ATUALIZADO').sum()),
-    ).reset_index()
-
-    df_cadastro = df[df['FINALIZAÇÃO'] == 'CADASTRADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-    df_cadastro.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Cadastro'}, inplace=True)
-
-    df_atualizacao = df[df['FINALIZAÇÃO'] == 'ATUALIZADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-    df_atualizacao.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Atualização'}, inplace=True)
-
-    filas_distribuicao = [
-        'DISTRIBUIÇÃO - AMIL + JV', 
-        'DISTRIBUIÇÃO - JV CÍVEL', 
-        'DISTRIBUIÇÃO - PRÉ CADASTRO', 
-        'DISTRIBUIÇÃO - PRÉ CADASTRO - JV', 
-        'DISTRIBUICAO'
-    ]
-    
-    df_distribuicao = df[df['FILA'].isin(filas_distribuicao) & (df['FINALIZAÇÃO'] == 'REALIZADO')]
-
-    if not df_distribuicao.empty:
-        tmo_distribuicao = df_distribuicao.groupby('FILA').agg(
-            Quantidade=('FILA', 'size'),
-            TMO_Distribuicao=('TEMPO MÉDIO OPERACIONAL', 'mean')
-        ).reset_index()
-        tmo_distribuicao.rename(columns={'TMO_Distribuicao': 'TMO Cadastro'}, inplace=True)
-        tmo_distribuicao['TMO Atualização'] = None
-    else:
-        tmo_distribuicao = pd.DataFrame(columns=['FILA', 'Quantidade', 'TMO Cadastro', 'TMO Atualização'])
-
-    tmo_por_carteira = tmo_por_carteira.merge(df_cadastro, on='FILA', how='left')
-    tmo_por_carteira = tmo_por_carteira.merge(df_atualizacao, on='FILA', how='left')
-    tmo_por_carteira = pd.concat([tmo_por_carteira, tmo_distribuicao], ignore_index=True)
-
-    # --- NOVO BLOCO: AUDITORIA - CADASTRO ---
-    df_auditoria = df[(df['FILA'] == 'AUDITORIA - CADASTRO') & (df['FINALIZAÇÃO'] == 'AUDITADO')]
-
-    if not df_auditoria.empty:
-        tmo_auditoria = df_auditoria.groupby('FILA').agg(
-            Quantidade=('FILA', 'size'),
-            TMO_Cadastro=('TEMPO MÉDIO OPERACIONAL', 'mean')
-        ).reset_index()
-        tmo_auditoria.rename(columns={'TMO_Cadastro': 'TMO Cadastro'}, inplace=True)
-        tmo_auditoria['TMO Atualização'] = None
-        tmo_por_carteira = pd.concat([tmo_por_carteira, tmo_auditoria], ignore_index=True)
-
-    # Calcular 'Fora do Escopo'
-    fora_do_escopo_contagem = df_unique.groupby('FILA').apply(
-        lambda x: x.shape[0] - (x['FINALIZAÇÃO'] == 'CADASTRADO').sum() - (x['FINALIZAÇÃO'] == 'ATUALIZADO').sum()
-    ).reset_index(name='Fora do Escopo')
-    tmo_por_carteira = tmo_por_carteira.merge(fora_do_escopo_contagem, on='FILA', how='left')
-
-    # Calcular TMO Fora do Escopo
-    finais_excluidas = ['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'BAIXA EM LOTE']
-    df_fora_escopo = df[~df['FINALIZAÇÃO'].isin(finais_excluidas)]
-    tmo_fora_escopo = df_fora_escopo.groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-    tmo_fora_escopo.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Fora do Escopo'}, inplace=True)
-    tmo_por_carteira = tmo_por_carteira.merge(tmo_fora_escopo, on='FILA', how='left')
-
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    tmo_por_carteira['TMO Cadastro'] = tmo_por_carteira['TMO Cadastro'].apply(format_timedelta)
-    tmo_por_carteira['TMO Atualização'] = tmo_por_carteira['TMO Atualização'].apply(format_timedelta)
-    tmo_por_carteira['TMO Fora do Escopo'] = tmo_por_carteira['TMO Fora do Escopo'].apply(format_timedelta)
-
-    tmo_por_carteira = tmo_por_carteira[['FILA', 'Quantidade', 'Cadastrado', 'Atualizado', 'Fora do Escopo', 'TMO Cadastro', 'TMO Atualização', 'TMO Fora do Escopo']]
-
-    return tmo_por_carteira
-
-    def format_timedelta(td):
-        if pd.isna(td):
-            return "00:00:00"
-        total_seconds = int(td.total_seconds())
-        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
-
-    tmo_por_carteira['TMO Cadastro'] = tmo_por_carteira['TMO Cadastro'].apply(format_timedelta)
-    tmo_por_carteira['TMO Atualização'] = tmo_por_carteira['TMO Atualização'].apply(format_timedelta)
-    tmo_por_carteira['TMO Fora do Escopo'] = tmo_por_carteira['TMO Fora do Escopo'].apply(format_timedelta)
+    # Pivô (FILA, FINALIZAÇÃO) com a quantidade de tarefas com TMO e a soma do TMO
+    pivo = consultar_cubo(como_cubo(df if cubo is None else cubo, ['FILA', 'FINALIZAÇÃO']), por=['FILA', 'FINALIZAÇÃO'])
+    pivo = pivo[pivo['FILA'].notna() & (pivo['CONTAGEM'] > 0)]
+    fila = pivo['FILA']
+    finalizacao = pivo['FINALIZAÇÃO']
+
+    def por_fila(mascara):
+        return pivo[mascara].groupby('FILA', observed=True)[['CONTAGEM', 'SOMA_NS']].sum()
+
+    def media(agregado, filas):
+        agregado = agregado.reindex(filas)
+        return pd.to_timedelta(agregado['SOMA_NS'] / agregado['CONTAGEM'], unit='ns')
+
+    cadastrado = por_fila(finalizacao == 'CADASTRADO')
+    atualizado = por_fila(finalizacao == 'ATUALIZADO')
+    fora_do_escopo = por_fila(~finalizacao.isin(['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'BAIXA EM LOTE']))
+
+    # Filas de cadastro/atualização
+    principal = por_fila(finalizacao.isin(['CADASTRADO', 'ATUALIZADO']) & (fila != 'Distribuição'))
+    blocos = [pd.DataFrame({
+        'FILA': principal.index,
+        'Quantidade': principal['CONTAGEM'].to_numpy(),
+        'Cadastrado': cadastrado['CONTAGEM'].reindex(principal.index, fill_value=0).to_numpy(),
+        'Atualizado': atualizado['CONTAGEM'].reindex(principal.index, fill_value=0).to_numpy(),
+        'TMO Cadastro': media(cadastrado, principal.index).to_numpy(),
+        'TMO Atualização': media(atualizado, principal.index).to_numpy(),
+    })]
+
+    # Distribuição e Auditoria entram como linhas extras, com o TMO da finalização na coluna de Cadastro
+    for mascara in [
+        atributo_fila(fila, 'DISTRIBUICAO') & (finalizacao == 'REALIZADO').to_numpy(),
+        atributo_fila(fila, 'AUDITORIA') & (finalizacao == 'AUDITADO').to_numpy(),
+    ]:
+        extra = por_fila(mascara)
+        if not extra.empty:
+            blocos.append(pd.DataFrame({
+                'FILA': extra.index,
+                'Quantidade': extra['CONTAGEM'].to_numpy(),
+                'TMO Cadastro': media(extra, extra.index).to_numpy(),
+            }))
+
+    tmo_por_carteira = pd.concat(blocos, ignore_index=True) if len(blocos) > 1 else blocos[0]
+    filas = pd.Index(tmo_por_carteira['FILA'])
+
+    # Fora do Escopo: protocolos cuja primeira tarefa com TMO (na ordem das linhas, a de conclusão
+    # no load_data) não é CADASTRADO nem ATUALIZADO; um protocolo com várias tarefas conta uma vez
+    primeiras = df.loc[df['TEMPO MÉDIO OPERACIONAL'].notna().to_numpy(), ['NÚMERO DO PROTOCOLO', 'FILA', 'FINALIZAÇÃO']]
+    primeiras = primeiras.drop_duplicates(subset=['NÚMERO DO PROTOCOLO'])
+    protocolos = primeiras.loc[~primeiras['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO']).to_numpy(), 'FILA'].value_counts()
+    tmo_por_carteira['Fora do Escopo'] = protocolos.reindex(filas, fill_value=0).to_numpy()
+    tmo_por_carteira['TMO Fora do Escopo'] = media(fora_do_escopo, filas).to_numpy()
+
+    for coluna in ['TMO Cadastro', 'TMO Atualização', 'TMO Fora do Escopo']:
+        tmo_por_carteira[coluna] = formatar_hms(tmo_por_carteira[coluna])
 
     tmo_por_carteira = tmo_por_carteira[['FILA', 'Quantidade', 'Cadastrado', 'Atualizado', 'Fora do Escopo', 'TMO Cadastro', 'TMO Atualização', 'TMO Fora do Escopo']]
 
@@ -1262,26 +1057,20 @@ def calcular_tmo_por_carteira(df):
 
 def calcular_producao_agrupada(df):
     required_columns = {'FILA', 'FINALIZAÇÃO', 'NÚMERO DO PROTOCOLO'}
-    if not required_columns.issubset(df.columns):
+    if not eh_cubo(df) and not required_columns.issubset(df.columns):
         return "As colunas necessárias ('FILA', 'FINALIZAÇÃO', 'NÚMERO DO PROTOCOLO') não foram encontradas no DataFrame."
 
-    df_unique = df.drop_duplicates(subset=['NÚMERO DO PROTOCOLO'])
-
-    grupos = {
-        'CAPTURA ANTECIPADA': [' CADASTRO ROBÔ', 'INCIDENTE PROCESSUAL', 'CADASTRO ANS'],
-        'SHAREPOINT': ['CADASTRO SHAREPOINT', 'ATUALIZAÇÃO - SHAREPOINT'],
-        'CITAÇÃO ELETRÔNICA': ['CADASTRO CITAÇÃO ELETRÔNICA', 'ATUALIZAÇÃO CITAÇÃO ELETRÔNICA'],
-        'E-MAIL': ['CADASTRO E-MAIL', 'OFICIOS E-MAIL', 'CADASTRO DE ÓRGÃOS E OFÍCIOS'],
-        'PRE CADASTRO E DIJUR': ['PRE CADASTRO E DIJUR']
-    }
-
-    df['GRUPO'] = df['FILA'].map(lambda x: next((k for k, v in grupos.items() if x in v), 'OUTROS'))
+    # Contagem por (FILA, FINALIZAÇÃO) e grupo de cada fila pela taxonomia (uma classificação por fila)
+    contagens = consultar_cubo(como_cubo(df, ['FILA', 'FINALIZAÇÃO']), por=['FILA', 'FINALIZAÇÃO'])
+    finalizacao = contagens['FINALIZAÇÃO']
+    contagens = pd.DataFrame({
+        'GRUPO': atributo_fila(contagens['FILA'], 'GRUPO'),
+        'Cadastrado': contagens['LINHAS'].where(finalizacao == 'CADASTRADO', 0),
+        'Atualizado': contagens['LINHAS'].where(finalizacao == 'ATUALIZADO', 0),
+        'Fora_do_Escopo': contagens['LINHAS'].where(~finalizacao.isin(['CADASTRADO', 'ATUALIZADO']), 0),
+    })
 
-    df_agrupado = df.groupby('GRUPO').agg(
-        Cadastrado=('FINALIZAÇÃO', lambda x: (x == 'CADASTRADO').sum()),
-        Atualizado=('FINALIZAÇÃO', lambda x: (x == 'ATUALIZADO').sum()),
-        Fora_do_Escopo=('FINALIZAÇÃO', lambda x: ((x != 'CADASTRADO') & (x != 'ATUALIZADO')).sum())
-    ).reset_index()
+    df_agrupado = contagens.groupby('GRUPO')[['Cadastrado', 'Atualizado', 'Fora_do_Escopo']].sum().reset_index()
 
     return df_agrupado
 
@@ -1306,7 +1095,7 @@ def calcular_producao_email_detalhada(df):
     ).reset_index()
 
     # Agrupando os demais (OFICIOS E-MAIL e CADASTRO DE ÓRGÃOS E OFÍCIOS) por FILA
-    df_outros_email_agrupado = df_outros_email.groupby('FILA').agg(
+    df_outros_email_agrupado = df_outros_email.groupby('FILA', observed=True).agg(
         Quantidade=('FILA', 'size'),
         Cadastrado=('FINALIZAÇÃO', lambda x: (x == 'CADASTRADO').sum()),
         Atualizado=('FINALIZAÇÃO', lambda x: (x == 'ATUALIZADO').sum()),
@@ -1332,28 +1121,22 @@ def calcular_e_exibir_tmo_cadastro_atualizacao_por_fila(df_analista, format_time
         # Filtros por finalização
         # ------------------------------
         cadastro_ou_atualizacao = df_analista[df_analista['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])]
-        auditoria = df_analista[(df_analista['FILA'] == 'AUDITORIA - CADASTRO') & (df_analista['FINALIZAÇÃO'] == 'AUDITADO')]
-        distribuicao = df_analista[df_analista['FILA'].isin([
-            'DISTRIBUIÇÃO - AMIL + JV',
-            'DISTRIBUIÇÃO - JV CÍVEL',
-            'DISTRIBUIÇÃO - PRÉ CADASTRO',
-            'DISTRIBUIÇÃO - PRÉ CADASTRO - JV',
-            'DISTRIBUICAO'
-        ]) & (df_analista['FINALIZAÇÃO'] == 'REALIZADO')]
+        auditoria = df_analista[atributo_fila(df_analista['FILA'], 'AUDITORIA') & (df_analista['FINALIZAÇÃO'] == 'AUDITADO')]
+        distribuicao = df_analista[atributo_fila(df_analista['FILA'], 'DISTRIBUICAO') & (df_analista['FINALIZAÇÃO'] == 'REALIZADO')]
 
         # ------------------------------
         # CADASTRADO / ATUALIZADO
         # ------------------------------
-        df_quantidade = cadastro_ou_atualizacao.groupby('FILA').size().reset_index(name='Quantidade')
-        df_tmo_cadastro = cadastro_ou_atualizacao[cadastro_ou_atualizacao['FINALIZAÇÃO'] == 'CADASTRADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-        df_tmo_atualizacao = cadastro_ou_atualizacao[cadastro_ou_atualizacao['FINALIZAÇÃO'] == 'ATUALIZADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+        df_quantidade = cadastro_ou_atualizacao.groupby('FILA', observed=True).size().reset_index(name='Quantidade')
+        df_tmo_cadastro = cadastro_ou_atualizacao[cadastro_ou_atualizacao['FINALIZAÇÃO'] == 'CADASTRADO'].groupby('FILA', observed=True)['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+        df_tmo_atualizacao = cadastro_ou_atualizacao[cadastro_ou_atualizacao['FINALIZAÇÃO'] == 'ATUALIZADO'].groupby('FILA', observed=True)['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
         df_tmo_cadastro.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Cadastro'}, inplace=True)
         df_tmo_atualizacao.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Atualização'}, inplace=True)
 
         # ------------------------------
         # AUDITORIA
         # ------------------------------
-        df_auditoria = auditoria.groupby('FILA').agg(
+        df_auditoria = auditoria.groupby('FILA', observed=True).agg(
             Quantidade=('FILA', 'size'),
             TMO_Auditoria=('TEMPO MÉDIO OPERACIONAL', 'mean')
         ).reset_index()
@@ -1362,7 +1145,7 @@ def calcular_e_exibir_tmo_cadastro_atualizacao_por_fila(df_analista, format_time
         # ------------------------------
         # DISTRIBUIÇÃO
         # ------------------------------
-        df_distribuicao = distribuicao.groupby('FILA').agg(
+        df_distribuicao = distribuicao.groupby('FILA', observed=True).agg(
             Quantidade=('FILA', 'size'),
             TMO_Distribuicao=('TEMPO MÉDIO OPERACIONAL', 'mean')
         ).reset_index()
@@ -1376,14 +1159,16 @@ def calcular_e_exibir_tmo_cadastro_atualizacao_por_fila(df_analista, format_time
 
         df_resultado = pd.concat([df_resultado, df_auditoria, df_distribuicao], ignore_index=True)
 
-        df_resultado.fillna(pd.Timedelta(seconds=0), inplace=True)
+        # Só as colunas de TMO recebem zero (a FILA é categórica e não aceita um Timedelta)
+        colunas_tmo = [c for c in ['TMO Cadastro', 'TMO Atualização', 'TMO Auditoria', 'TMO Distribuição'] if c in df_resultado.columns]
+        df_resultado[colunas_tmo] = df_resultado[colunas_tmo].fillna(pd.Timedelta(seconds=0))
 
         # ------------------------------
         # Formatar tempos
         # ------------------------------
         for col in ['TMO Cadastro', 'TMO Atualização', 'TMO Auditoria', 'TMO Distribuição']:
             if col in df_resultado.columns:
-                df_resultado[col] = df_resultado[col].apply(format_timedelta_hms)
+                df_resultado[col] = format_timedelta_hms(df_resultado[col])
 
         # Renomeia coluna Fila
         df_resultado.rename(columns={'FILA': 'Fila'}, inplace=True)
@@ -1418,7 +1203,7 @@ def calcular_e_exibir_tmo_por_fila(df_analista, analista_selecionado, format_tim
     Parâmetros:
         - df_analista: DataFrame contendo os dados de análise.
         - analista_selecionado: Nome do analista selecionado.
-        - format_timedelta: Função para formatar a duração do TMO em minutos e segundos.
+        - format_timedelta: Função que formata a coluna de TMO em minutos e segundos (ex.: formatar_min_s).
         - st: Referência para o módulo Streamlit (necessário para exibir os resultados).
     """
     if 'FILA' in df_analista.columns:
@@ -1426,13 +1211,13 @@ def calcular_e_exibir_tmo_por_fila(df_analista, analista_selecionado, format_tim
         filas_finalizadas_analista = df_analista[df_analista['SITUAÇÃO DA TAREFA'] == 'Finalizada']
         
         # Agrupa por 'FILA' e calcula a quantidade e o TMO médio para cada fila
-        carteiras_analista = filas_finalizadas_analista.groupby('FILA').agg(
+        carteiras_analista = filas_finalizadas_analista.groupby('FILA', observed=True).agg(
             Quantidade=('FILA', 'size'),
             TMO_médio=('TEMPO MÉDIO OPERACIONAL', 'mean')
         ).reset_index()
 
         # Converte o TMO médio para minutos e segundos
-        carteiras_analista['TMO_médio'] = carteiras_analista['TMO_médio'].apply(format_timedelta)
+        carteiras_analista['TMO_médio'] = format_timedelta(carteiras_analista['TMO_médio'])
 
         # Renomeia as colunas
         carteiras_analista = carteiras_analista.rename(columns={
@@ -1454,93 +1239,41 @@ def calcular_e_exibir_tmo_por_fila(df_analista, analista_selecionado, format_tim
         styled_df = styled_df.set_table_styles([dict(selector='th', props=[('text-align', 'left')])])
         st.dataframe(styled_df, hide_index=True, use_container_width=True)
 
-def calcular_tmo_por_mes(df):
-    # Converter coluna de tempo para timedelta se necessário
-    if df['TEMPO MÉDIO OPERACIONAL'].dtype != 'timedelta64[ns]':
-        df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-
-    # Converter coluna de data corretamente
-    df['DATA DE CONCLUSÃO DA TAREFA'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA'], errors='coerce')
-
-    # Remover registros sem data válida
-    df = df[df['DATA DE CONCLUSÃO DA TAREFA'].notna()]
-
-    # Extrair AnoMes no formato de período (ano-mês)
-    df['AnoMes'] = df['DATA DE CONCLUSÃO DA TAREFA'].dt.to_period('M')
+# Tipos de TMO das visões mensais e as finalizações somadas em cada um
+TIPOS_TMO_MES = {
+    'TMO_Geral': ['CADASTRADO', 'ATUALIZADO', 'REALIZADO'],
+    'TMO_Cadastro': ['CADASTRADO'],
+    'TMO_Atualizacao': ['ATUALIZADO'],
+    'TMO_Auditoria': ['AUDITADO'],
+}
 
-    # Filtrar protocolos finalizados
-    df_finalizados = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'])]
-
-    # Agrupar e calcular somatório e média
-    df_tmo_mes = df_finalizados.groupby('AnoMes').agg(
-        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', 'sum'),
-        Total_Protocolos=('TEMPO MÉDIO OPERACIONAL', 'count')
-    ).reset_index()
-
-    # Calcular TMO médio em minutos
-    df_tmo_mes['TMO'] = (df_tmo_mes['Tempo_Total'] / pd.Timedelta(minutes=1)) / df_tmo_mes['Total_Protocolos']
+def calcular_tmo_por_mes(df):
+    """
+    TMO médio, em minutos, por mês das tarefas CADASTRADO, ATUALIZADO e REALIZADO.
+    `df` pode ser o rollup mensal (obter_rollup_mensal), um cubo ou as tarefas.
+    """
+    tmo = tmo_mensal(como_rollup_mensal(df), {'TMO': TIPOS_TMO_MES['TMO_Geral']})
+    tmo = tmo[tmo['TMO_LINHAS'] > 0]
 
     # Formatar AnoMes como "Abril de 2024"
-    df_tmo_mes['AnoMes'] = df_tmo_mes['AnoMes'].dt.to_timestamp().dt.strftime('%B de %Y').str.capitalize()
-
-    return df_tmo_mes[['AnoMes', 'TMO']]
-
-# Função de formatação
-def format_timedelta_mes(minutes):
-    """Formata um valor em minutos (float) como 'Xh Ym Zs' se acima de 60 minutos, caso contrário, 'X min Ys'."""
-    if minutes >= 60:
-        hours = int(minutes // 60)
-        minutes_remainder = int(minutes % 60)
-        seconds = (minutes - hours * 60 - minutes_remainder) * 60
-        seconds_int = round(seconds)
-        return f"{hours}h {minutes_remainder}m {seconds_int}s"
-    else:
-        minutes_int = int(minutes)
-        seconds = (minutes - minutes_int) * 60
-        seconds_int = round(seconds)
-        return f"{minutes_int} min {seconds_int}s"
+    return pd.DataFrame({
+        'AnoMes': tmo.index.to_timestamp().strftime('%B de %Y').str.capitalize(),
+        'TMO': (tmo['TMO'] / pd.Timedelta(minutes=1)).to_numpy(),
+    })
 
 def exibir_tmo_por_mes(df):
     """
     Exibe um gráfico de barras agrupadas do TMO mensal (Geral, Cadastro, Atualização, Auditoria).
+    `df` pode ser o rollup mensal (obter_rollup_mensal), um cubo ou as tarefas.
     """
-    df = df.copy()
-
-    # Converter para timedelta se necessário
-    if not pd.api.types.is_timedelta64_dtype(df['TEMPO MÉDIO OPERACIONAL']):
-        df['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-
-    # Adicionar coluna AnoMes
-    df['AnoMes'] = pd.to_datetime(df['DATA DE CONCLUSÃO DA TAREFA'], errors='coerce').dt.to_period('M').astype(str)
-
-    # Separar por tipo
-    df_geral = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'])]
-    df_cadastro = df[df['FINALIZAÇÃO'] == 'CADASTRADO']
-    df_atualizacao = df[df['FINALIZAÇÃO'] == 'ATUALIZADO']
-    df_auditoria = df[df['FINALIZAÇÃO'] == 'AUDITADO']
-
-    def calcular_tmo(df_base, nome_col):
-        df_base = df_base.copy()
-        if df_base.empty:
-            return pd.DataFrame(columns=['AnoMes', nome_col])
-        agrupado = df_base.groupby('AnoMes')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-        agrupado.columns = ['AnoMes', nome_col]
-        return agrupado
-
-    df_tmo_geral = calcular_tmo(df_geral, 'TMO_Geral')
-    df_tmo_cadastro = calcular_tmo(df_cadastro, 'TMO_Cadastro')
-    df_tmo_atualizacao = calcular_tmo(df_atualizacao, 'TMO_Atualizacao')
-    df_tmo_auditoria = calcular_tmo(df_auditoria, 'TMO_Auditoria')
-
-    df_tmo_final = df_tmo_geral.merge(df_tmo_cadastro, on='AnoMes', how='left')
-    df_tmo_final = df_tmo_final.merge(df_tmo_atualizacao, on='AnoMes', how='left')
-    df_tmo_final = df_tmo_final.merge(df_tmo_auditoria, on='AnoMes', how='left')
+    # TMO de cada tipo nos meses com tarefas do TMO Geral
+    tmo = tmo_mensal(como_rollup_mensal(df), TIPOS_TMO_MES)
+    tmo = tmo[tmo['TMO_Geral_LINHAS'] > 0]
+    df_tmo_final = pd.DataFrame({'AnoMes': tmo.index.astype(str), **{col: tmo[col].to_numpy() for col in TIPOS_TMO_MES}})
 
     # Formatar tempos
-    for col in ['TMO_Geral', 'TMO_Cadastro', 'TMO_Atualizacao', 'TMO_Auditoria']:
-        df_tmo_final[col + '_Formatado'] = df_tmo_final[col].apply(
-            lambda td: f"{int(td.total_seconds() // 3600):02}:{int((td.total_seconds() % 3600) // 60):02}:{int(td.total_seconds() % 60):02}" if pd.notnull(td) else "00:00:00"
-        )
+    for col in TIPOS_TMO_MES:
+        df_tmo_final[col + '_Formatado'] = formatar_hms(df_tmo_final[col])
 
     # Filtro de meses
     meses_disponiveis = df_tmo_final['AnoMes'].unique()
@@ -1559,13 +1292,6 @@ def exibir_tmo_por_mes(df):
         value_name='Tempo Médio Operacional'
     )
 
-    format_dict = df_tmo_filtrado.set_index('AnoMes')[
-        ['TMO_Geral_Formatado', 'TMO_Cadastro_Formatado', 'TMO_Atualizacao_Formatado', 'TMO_Auditoria_Formatado']
-    ].stack().reset_index()
-    format_dict.columns = ['AnoMes', 'Tipo de TMO', 'Tempo Formatado']
-    format_dict['Tipo de TMO'] = format_dict['Tipo de TMO'].str.replace('_Formatado', '')
-    format_map = format_dict.set_index(['AnoMes', 'Tipo de TMO'])['Tempo Formatado'].to_dict()
-
     cores = {
         'TMO_Geral': '#ff6a1c',
         'TMO_Cadastro': '#d1491c',
@@ -1580,10 +1306,13 @@ def exibir_tmo_por_mes(df):
         'TMO_Auditoria': 'Auditoria'
     }
 
-    df_long['Texto_Rotulo'] = df_long.apply(
-        lambda row: f"{labels_legenda[row['Tipo de TMO']]} - {format_map.get((row['AnoMes'], row['Tipo de TMO']), '')}",
-        axis=1
-    )
+    # Os textos formatados, derretidos na mesma ordem de df_long, viram o rótulo de cada barra
+    textos = df_tmo_filtrado.melt(
+        id_vars=['AnoMes'],
+        value_vars=['TMO_Geral_Formatado', 'TMO_Cadastro_Formatado', 'TMO_Atualizacao_Formatado', 'TMO_Auditoria_Formatado'],
+        value_name='Tempo Formatado'
+    )['Tempo Formatado'].to_numpy()
+    df_long['Texto_Rotulo'] = df_long['Tipo de TMO'].map(labels_legenda) + ' - ' + textos
 
     fig = px.bar(
         df_long,
@@ -1615,7 +1344,7 @@ def exibir_dataframe_tmo_formatado(df):
         return None
     
     # Adicionar a coluna "Tempo Médio Operacional" com base no TMO calculado
-    df_tmo_mes['Tempo Médio Operacional'] = df_tmo_mes['TMO'].apply(format_timedelta_mes)
+    df_tmo_mes['Tempo Médio Operacional'] = formatar_minutos(df_tmo_mes['TMO'])
     df_tmo_mes['Mês'] = df_tmo_mes['AnoMes']
     
     # Selecionar as colunas para exibição
@@ -1653,43 +1382,39 @@ def export_dataframe(df):
     else:
         st.warning("Selecione pelo menos uma coluna para exportar.")
         
+def _melhor_tmo_do_recorde(recorde):
+    if pd.isna(recorde['MELHOR_TMO']):
+        return None, None
+    return recorde['MELHOR_DIA_TMO'], recorde['MELHOR_TMO']
+
+def _melhor_dia_cadastro_do_recorde(recorde):
+    if pd.isna(recorde['CADASTROS_MELHOR_DIA']):
+        return None, 0
+    return recorde['MELHOR_DIA_CADASTROS'], int(recorde['CADASTROS_MELHOR_DIA'])
+
 def calcular_melhor_tmo_por_dia(df_analista):
     """
     Calcula o melhor TMO de cadastro por dia para o analista.
 
     Parâmetros:
-        - df_analista: DataFrame filtrado para o analista.
+        - df_analista: DataFrame filtrado para o analista (ou recorte do cubo).
 
     Retorna:
-        - O dia com o melhor TMO de cadastro e o valor do TMO.
+        - O dia com o melhor TMO de cadastro e o valor do TMO, ou (None, None) sem cadastros.
     """
-    # Filtrar apenas as finalizações do tipo 'CADASTRADO'
-    df_cadastro = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO']
-
-    # Calcula o TMO por dia para o tipo 'CADASTRADO'
-    df_tmo_por_dia = calcular_tmo_por_dia(df_cadastro)
-
-    # Identifica o dia com o menor TMO
-    if not df_tmo_por_dia.empty:
-        melhor_dia = df_tmo_por_dia.loc[df_tmo_por_dia['TMO'].idxmin()]
-        return melhor_dia['Dia'], melhor_dia['TMO']
-
-    # Retorna None caso não haja dados para 'CADASTRADO'
-    return None, None
+    recordes = montar_recordes(df_analista, META_DIARIA_PRODUCAO)
+    if recordes.empty:
+        return None, None
+    return _melhor_tmo_do_recorde(recordes.iloc[0])
 
 def calcular_melhor_dia_por_cadastro(df_analista):
-    # Agrupa os dados por dia e conta os cadastros
-    if 'FINALIZAÇÃO' in df_analista.columns and 'DATA DE CONCLUSÃO DA TAREFA' in df_analista.columns:
-        df_cadastros_por_dia = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO'].groupby(
-            df_analista['DATA DE CONCLUSÃO DA TAREFA'].dt.date
-        ).size().reset_index(name='Quantidade')
-        
-        # Identifica o dia com maior quantidade de cadastros
-        if not df_cadastros_por_dia.empty:
-            melhor_dia = df_cadastros_por_dia.loc[df_cadastros_por_dia['Quantidade'].idxmax()]
-            return melhor_dia['DATA DE CONCLUSÃO DA TAREFA'], melhor_dia['Quantidade']
-    
-    return None, 0
+    # Dia com mais cadastros do analista, ou (None, 0) sem cadastros
+    if not eh_cubo(df_analista) and not {'FINALIZAÇÃO', 'DATA DE CONCLUSÃO DA TAREFA'}.issubset(df_analista.columns):
+        return None, 0
+    recordes = montar_recordes(df_analista, META_DIARIA_PRODUCAO)
+    if recordes.empty:
+        return None, 0
+    return _melhor_dia_cadastro_do_recorde(recordes.iloc[0])
 
 def exibir_tmo_por_mes_analista(df_analista, analista_selecionado):
     """
@@ -1709,7 +1434,7 @@ def exibir_tmo_por_mes_analista(df_analista, analista_selecionado):
         return None
 
     # Formatar o TMO para exibição
-    df_tmo_mes['TMO_Formatado'] = df_tmo_mes['TMO'].apply(format_timedelta_mes)
+    df_tmo_mes['TMO_Formatado'] = formatar_minutos(df_tmo_mes['TMO'])
 
     # Criar multiselect para os meses disponíveis
     meses_disponiveis = df_tmo_mes['AnoMes'].unique()
@@ -1753,76 +1478,24 @@ def calcular_grafico_tmo_analista_por_mes(df_analista):
     Calcula o TMO Geral, Cadastro, Atualização e Auditoria por mês para um analista específico.
     
     Parâmetro:
-        - df_analista: DataFrame contendo as tarefas do analista.
+        - df_analista: tarefas do analista, ou o recorte do rollup mensal (obter_rollup_mensal) dele.
     
     Retorna:
         - DataFrame com TMO_Geral, TMO_Cadastro, TMO_Atualizacao e TMO_Auditoria por mês.
     """
     if df_analista.empty:
         return pd.DataFrame(columns=['AnoMes', 'TMO_Geral', 'TMO_Cadastro', 'TMO_Atualizacao', 'TMO_Auditoria'])
-    
-    # Garantir tipo timedelta
-    if not pd.api.types.is_timedelta64_dtype(df_analista['TEMPO MÉDIO OPERACIONAL']):
-        df_analista['TEMPO MÉDIO OPERACIONAL'] = pd.to_timedelta(df_analista['TEMPO MÉDIO OPERACIONAL'], errors='coerce')
-
-    df_analista['AnoMes'] = df_analista['DATA DE CONCLUSÃO DA TAREFA'].dt.to_period('M').astype(str)
-
-    # Separar os subconjuntos
-    df_geral = df_analista[df_analista['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'AUDITADO'])]
-    df_cadastro = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO']
-    df_atualizacao = df_analista[df_analista['FINALIZAÇÃO'] == 'ATUALIZADO']
-    df_auditoria = df_analista[df_analista['FINALIZAÇÃO'] == 'AUDITADO']
-
-    # Função de cálculo por mês
-    def calcular_tmo(df, nome_coluna):
-        if df.empty:
-            return pd.DataFrame(columns=['AnoMes', nome_coluna])
-        df_tmo = df.groupby('AnoMes').agg(
-            Tempo_Total=('TEMPO MÉDIO OPERACIONAL', 'sum'),
-            Total_Protocolos=('TEMPO MÉDIO OPERACIONAL', 'count')
-        ).reset_index()
-        df_tmo[nome_coluna] = df_tmo['Tempo_Total'] / df_tmo['Total_Protocolos']
-        return df_tmo[['AnoMes', nome_coluna]]
-
-    # Calcular os TMO por tipo
-    df_tmo_geral = calcular_tmo(df_geral, 'TMO_Geral')
-    df_tmo_cadastro = calcular_tmo(df_cadastro, 'TMO_Cadastro')
-    df_tmo_atualizacao = calcular_tmo(df_atualizacao, 'TMO_Atualizacao')
-    df_tmo_auditoria = calcular_tmo(df_auditoria, 'TMO_Auditoria')
-
-    # Mesclar todos os resultados
-    df_tmo_mes = (
-        df_tmo_geral
-        .merge(df_tmo_cadastro, on='AnoMes', how='left')
-        .merge(df_tmo_atualizacao, on='AnoMes', how='left')
-        .merge(df_tmo_auditoria, on='AnoMes', how='left')
-    )
 
-    # Preencher valores ausentes e formatar a coluna de mês
-    df_tmo_mes.fillna(pd.Timedelta(seconds=0), inplace=True)
-    df_tmo_mes['AnoMes'] = pd.to_datetime(df_tmo_mes['AnoMes'], errors='coerce')
-    df_tmo_mes['AnoMes'] = df_tmo_mes['AnoMes'].dt.strftime('%B de %Y').str.capitalize()
+    # No gráfico do analista, o TMO Geral inclui as auditorias
+    tipos = {**TIPOS_TMO_MES, 'TMO_Geral': TIPOS_TMO_MES['TMO_Geral'] + ['AUDITADO']}
+    tmo = tmo_mensal(como_rollup_mensal(df_analista), tipos)
+    tmo = tmo[tmo['TMO_Geral_LINHAS'] > 0]
 
-    return df_tmo_mes
-
-def format_timedelta_grafico_tmo_analista(td):
-    """Formata um timedelta no formato HH:MM:SS"""
-    if pd.isna(td) or td == pd.Timedelta(seconds=0):
-        return "00:00:00"
-    
-    total_seconds = int(td.total_seconds())
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
-
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
-
-def format_timedelta_hms(timedelta_value):
-    """Formata um timedelta em HH:MM:SS"""
-    total_seconds = int(timedelta_value.total_seconds())
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
+    # Preencher valores ausentes e formatar a coluna de mês
+    return pd.DataFrame({
+        'AnoMes': tmo.index.to_timestamp().strftime('%B de %Y').str.capitalize(),
+        **{col: tmo[col].fillna(pd.Timedelta(seconds=0)).to_numpy() for col in tipos},
+    })
 
 def exibir_grafico_tmo_analista_por_mes(df_analista, analista_selecionado):
     """
@@ -1838,7 +1511,7 @@ def exibir_grafico_tmo_analista_por_mes(df_analista, analista_selecionado):
 
     # Formatar os tempos para HH:MM:SS
     for col in ['TMO_Geral', 'TMO_Cadastro', 'TMO_Atualizacao', 'TMO_Auditoria']:
-        df_tmo_mes[col + '_Formatado'] = df_tmo_mes[col].apply(format_timedelta_hms)
+        df_tmo_mes[col + '_Formatado'] = formatar_hms(df_tmo_mes[col])
 
     # Multiselect para meses
     meses_disponiveis = df_tmo_mes['AnoMes'].unique()
@@ -1862,14 +1535,6 @@ def exibir_grafico_tmo_analista_por_mes(df_analista, analista_selecionado):
         value_name='Tempo Médio Operacional'
     )
 
-    # Mapeamento de tempos formatados
-    format_dict = df_tmo_mes_filtrado.set_index('AnoMes')[
-        ['TMO_Geral_Formatado', 'TMO_Cadastro_Formatado', 'TMO_Atualizacao_Formatado', 'TMO_Auditoria_Formatado']
-    ].stack().reset_index()
-    format_dict.columns = ['AnoMes', 'Tipo de TMO', 'Tempo Formatado']
-    format_dict['Tipo de TMO'] = format_dict['Tipo de TMO'].str.replace('_Formatado', '')
-    format_map = format_dict.set_index(['AnoMes', 'Tipo de TMO'])['Tempo Formatado'].to_dict()
-
     # Cores
     custom_colors = {
         'TMO_Geral': '#ff6a1c',
@@ -1885,10 +1550,13 @@ def exibir_grafico_tmo_analista_por_mes(df_analista, analista_selecionado):
         'TMO_Auditoria': 'Auditoria'
     }
 
-    df_tmo_long['Texto_Rotulo'] = df_tmo_long.apply(
-        lambda row: f"{tipo_tmo_label[row['Tipo de TMO']]} - {format_map.get((row['AnoMes'], row['Tipo de TMO']), '')}",
-        axis=1
-    )
+    # Os textos formatados, derretidos na mesma ordem de df_tmo_long, viram o rótulo de cada barra
+    textos = df_tmo_mes_filtrado.melt(
+        id_vars=['AnoMes'],
+        value_vars=['TMO_Geral_Formatado', 'TMO_Cadastro_Formatado', 'TMO_Atualizacao_Formatado', 'TMO_Auditoria_Formatado'],
+        value_name='Tempo Formatado'
+    )['Tempo Formatado'].to_numpy()
+    df_tmo_long['Texto_Rotulo'] = df_tmo_long['Tipo de TMO'].map(tipo_tmo_label) + ' - ' + textos
 
     # Gráfico
     fig = px.bar(
@@ -1926,11 +1594,8 @@ def exportar_planilha_com_tmo(df, periodo_selecionado, analistas_selecionados, t
     """
     # Filtrar o DataFrame com base no período e analistas selecionados
     data_inicial, data_final = periodo_selecionado
-    df_filtrado = df[
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) &
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final) &
-        (df['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados))
-    ]
+    df_filtrado = recortar_periodo(df, data_inicial, data_final)
+    df_filtrado = df_filtrado[df_filtrado['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados)]
 
     # Calcular o TMO e a quantidade por analista
     analistas = []
@@ -1974,9 +1639,7 @@ def exportar_planilha_com_tmo(df, periodo_selecionado, analistas_selecionados, t
     df_resumo['Período Final'] = data_final
 
     # Formatar o TMO como HH:MM:SS
-    df_resumo['TMO'] = df_resumo['TMO'].apply(
-        lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}"
-    )
+    df_resumo['TMO'] = formatar_hms(df_resumo['TMO'])
 
     # Calcular a média do TMO em segundos
     tmo_segundos = [timedelta(hours=int(t.split(":")[0]), minutes=int(t.split(":")[1]), seconds=int(t.split(":")[2])).total_seconds() for t in df_resumo['TMO']]
@@ -2043,11 +1706,8 @@ def exportar_planilha_com_tmo_completo(df, periodo_selecionado, analistas_seleci
 
     # Filtrar o DataFrame com base no período e analistas selecionados
     data_inicial, data_final = periodo_selecionado
-    df_filtrado = df[
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) &
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final) &
-        (df['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados))
-    ]
+    df_filtrado = recortar_periodo(df, data_inicial, data_final)
+    df_filtrado = df_filtrado[df_filtrado['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados)]
 
     # Criar listas para armazenar os dados por analista
     analistas = []
@@ -2086,14 +1746,8 @@ def exportar_planilha_com_tmo_completo(df, periodo_selecionado, analistas_seleci
     })
 
     # Converter TMO para HH:MM:SS (removendo frações de segundos)
-    def format_tmo(tmo):
-        if pd.notnull(tmo):
-            total_seconds = int(tmo.total_seconds())  # Removendo frações
-            return str(timedelta(seconds=total_seconds))
-        return '00:00:00'
-
-    df_resumo['TMO Cadastro'] = df_resumo['TMO Cadastro'].apply(format_tmo)
-    df_resumo['TMO Atualizado'] = df_resumo['TMO Atualizado'].apply(format_tmo)
+    df_resumo['TMO Cadastro'] = formatar_hms(df_resumo['TMO Cadastro'])
+    df_resumo['TMO Atualizado'] = formatar_hms(df_resumo['TMO Atualizado'])
 
     # Criar um arquivo Excel em memória
     buffer = BytesIO()
@@ -2128,11 +1782,10 @@ def exportar_relatorio_detalhado_por_analista(df, periodo_selecionado, analistas
     data_inicial, data_final = periodo_selecionado
 
     # Filtrar o DataFrame pelo período e analistas selecionados
-    df_filtrado = df[
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) &
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final) &
-        (df['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados)) &
-        (df['FINALIZAÇÃO'] == 'CADASTRADO')  # Apenas tarefas cadastradas
+    df_filtrado = recortar_periodo(df, data_inicial, data_final)
+    df_filtrado = df_filtrado[
+        (df_filtrado['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados)) &
+        (df_filtrado['FINALIZAÇÃO'] == 'CADASTRADO')  # Apenas tarefas cadastradas
     ]
 
     buffer = BytesIO()
@@ -2149,9 +1802,7 @@ def exportar_relatorio_detalhado_por_analista(df, periodo_selecionado, analistas
             df_tmo_por_dia.rename(columns={'DATA DE CONCLUSÃO DA TAREFA': 'Dia'}, inplace=True)
 
             # Formatar TMO como HH:MM:SS
-            df_tmo_por_dia['TMO'] = df_tmo_por_dia['TMO'].apply(
-                lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}"
-            )
+            df_tmo_por_dia['TMO'] = formatar_hms(df_tmo_por_dia['TMO'])
 
             # Adicionar coluna de analista
             df_tmo_por_dia.insert(0, 'Analista', analista)
@@ -2214,9 +1865,10 @@ def calcular_tmo_cadastro(df):
 
 def calcular_tempo_ocioso(df):
     """
-    Calcula o tempo ocioso total por analista.
+    Calcula o tempo ocioso total por analista, em minutos.
     """
-    df_ocioso = df.groupby('USUÁRIO QUE CONCLUIU A TAREFA')['TEMPO OCIOSO'].sum().reset_index()
+    df_ocioso = calcular_tempo_ocioso_por_analista(df)
+    df_ocioso = df_ocioso.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True)[COLUNA_OCIOSO].sum().reset_index()
     return df_ocioso
 
 def gerar_relatorio_tmo_completo(df, periodo_selecionado, analistas_selecionados):
@@ -2227,11 +1879,8 @@ def gerar_relatorio_tmo_completo(df, periodo_selecionado, analistas_selecionados
     data_inicial, data_final = periodo_selecionado
 
     # 🔹 Filtrar os dados pelo período e analistas selecionados
-    df_filtrado = df[
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) &
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final) &
-        (df['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados))
-    ].copy()  # Criar uma cópia para evitar alterações no DataFrame original
+    df_filtrado = recortar_periodo(df, data_inicial, data_final)
+    df_filtrado = df_filtrado[df_filtrado['USUÁRIO QUE CONCLUIU A TAREFA'].isin(analistas_selecionados)].copy()  # Criar uma cópia para evitar alterações no DataFrame original
 
     # 🔹 Calcular o tempo ocioso por analista
     df_tempo_ocioso = calcular_tempo_ocioso_por_analista(df_filtrado)
@@ -2245,8 +1894,8 @@ def gerar_relatorio_tmo_completo(df, periodo_selecionado, analistas_selecionados
             total_cadastros = len(df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO'])
             total_protocolos = len(df_analista)
 
-            # 🔹 Ajuste para acessar a coluna correta do DataFrame `df_tempo_ocioso`
-            tempo_ocioso = df_tempo_ocioso[df_tempo_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == analista]['TEMPO OCIOSO'].sum() if not df_tempo_ocioso.empty else pd.Timedelta(0)
+            # 🔹 Tempo ocioso total do analista no período, em segundos
+            tempo_ocioso = df_tempo_ocioso.loc[df_tempo_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == analista, COLUNA_OCIOSO].sum() * 60
 
             # 🔹 Criar DataFrame com os dados do relatório
             df_resumo = pd.DataFrame({
@@ -2259,9 +1908,8 @@ def gerar_relatorio_tmo_completo(df, periodo_selecionado, analistas_selecionados
             })
 
             # 🔹 Converter TMO e Tempo Ocioso para HH:MM:SS
-            df_resumo['TMO Geral'] = df_resumo['TMO Geral'].apply(lambda x: str(timedelta(seconds=x.total_seconds())) if pd.notnull(x) else '00:00:00')
-            df_resumo['TMO Cadastro'] = df_resumo['TMO Cadastro'].apply(lambda x: str(timedelta(seconds=x.total_seconds())) if pd.notnull(x) else '00:00:00')
-            df_resumo['Tempo Ocioso'] = df_resumo['Tempo Ocioso'].apply(lambda x: str(timedelta(seconds=x.total_seconds())) if pd.notnull(x) else '00:00:00')
+            for coluna in ['TMO Geral', 'TMO Cadastro', 'Tempo Ocioso']:
+                df_resumo[coluna] = formatar_hms(df_resumo[coluna])
 
             # 🔹 Escrever no Excel
             df_resumo.to_excel(writer, index=False, sheet_name=analista[:31])
@@ -2284,61 +1932,86 @@ def gerar_relatorio_tmo_completo(df, periodo_selecionado, analistas_selecionados
 
 import json
 
-def gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depois, data_fim_depois, usuarios_selecionados):
-    df = df[df['USUÁRIO QUE CONCLUIU A TAREFA'].isin(usuarios_selecionados)]
+# Cores das barras de cada período no relatório de comparação, na ordem dos períodos
+CORES_PERIODOS = ['#FF5500', '#330066', '#a3330f', '#ff884d', '#4b0082', '#7f2b0e']
 
-    def filtrar_periodo(df, inicio, fim):
-        return df[(df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= inicio) &
-                  (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= fim)]
+# Finalizações comparadas entre os períodos e o nome de cada uma nas colunas
+FINALIZACOES_COMPARACAO = {'CADASTRADO': 'Cadastro', 'ATUALIZADO': 'Atualização'}
 
-    df_antes = filtrar_periodo(df, data_inicio_antes, data_fim_antes)
-    df_depois = filtrar_periodo(df, data_inicio_depois, data_fim_depois)
+def calcular_comparacao_periodos(df, periodos, usuarios_selecionados, finalizacoes=tuple(FINALIZACOES_COMPARACAO)):
+    """
+    TMO de cada analista em cada finalização e em cada período de `periodos` (lista de
+    (data_inicial, data_final)), somados de uma vez por consultar_periodos. `df` pode ser
+    o cubo ou as tarefas.
 
-    def calcular_tmo_por_tipo(df_periodo, tipo):
-        return df_periodo[df_periodo['FINALIZAÇÃO'] == tipo].groupby('USUÁRIO QUE CONCLUIU A TAREFA')['TEMPO MÉDIO OPERACIONAL'].mean()
+    Retorna um DataFrame indexado pelo analista (os que têm qualquer tarefa em algum dos
+    períodos, em ordem alfabética) com colunas (finalização, posição do período) e TMO 0
+    onde o analista não tem tarefas da finalização no período.
+    """
+    tmo = consultar_periodos(df, periodos, filtros={'USUÁRIO QUE CONCLUIU A TAREFA': usuarios_selecionados})
+    analistas = sorted(tmo['USUÁRIO QUE CONCLUIU A TAREFA'].dropna().astype(str).unique())
+
+    tmo = tmo[tmo['FINALIZAÇÃO'].isin(finalizacoes)]
+    colunas = pd.MultiIndex.from_product([list(finalizacoes), range(len(periodos))], names=['FINALIZAÇÃO', 'PERIODO'])
+    tabela = pd.Series(
+        tmo['TMO'].to_numpy(),
+        index=pd.MultiIndex.from_arrays([
+            tmo['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str), tmo['FINALIZAÇÃO'].astype(str), tmo['PERIODO']
+        ])
+    ).unstack([1, 2])
+    return tabela.reindex(index=analistas, columns=colunas).fillna(pd.Timedelta(0))
+
+def rotulo_periodo(periodo, posicao):
+    # O número do período entra no rótulo para que períodos com as mesmas datas não gerem colunas repetidas
+    return f"Período {posicao + 1}: {periodo[0].strftime('%d/%m')} - {periodo[1].strftime('%d/%m')}"
+
+def exibir_comparacao_periodos(df, periodos, usuarios_selecionados):
+    """Exibe a tabela de comparação de TMO entre os períodos, com os tempos em HH:MM:SS."""
+    tabela = calcular_comparacao_periodos(df, periodos, usuarios_selecionados)
+    if tabela.empty:
+        st.warning("Nenhum dado disponível para os períodos e usuários selecionados.")
+        return None
 
-    def format_tmo(value):
-        if pd.isnull(value) or value == pd.Timedelta(0):
-            return "00:00:00"
-        total_seconds = value.total_seconds()
-        return f"{int(total_seconds // 3600):02}:{int((total_seconds % 3600) // 60):02}:{int(total_seconds % 60):02}"
+    df_comparacao = pd.DataFrame({'Analista': tabela.index})
+    for (finalizacao, posicao), tmo in tabela.items():
+        coluna = f"TMO {FINALIZACOES_COMPARACAO[finalizacao]} ({rotulo_periodo(periodos[posicao], posicao)})"
+        df_comparacao[coluna] = formatar_hms(tmo).to_numpy()
+    st.dataframe(df_comparacao, use_container_width=True, hide_index=True)
+    return df_comparacao
 
-    analistas = sorted(set(df_antes['USUÁRIO QUE CONCLUIU A TAREFA']).union(df_depois['USUÁRIO QUE CONCLUIU A TAREFA']))
+def gerar_relatorio_html(df, periodos, usuarios_selecionados):
+    tabela = calcular_comparacao_periodos(df, periodos, usuarios_selecionados)
+    nomes_analistas = list(tabela.index)
 
-    tabela_html = ""
-    tmo_antes_list = []
-    tmo_depois_list = []
-    tmo_antes_legenda = []
-    tmo_depois_legenda = []
-    nomes_analistas = []
-
-    for analista in analistas:
-        tmo_antes_cadastro = calcular_tmo_por_tipo(df_antes, 'CADASTRADO').get(analista, pd.Timedelta(0))
-        tmo_depois_cadastro = calcular_tmo_por_tipo(df_depois, 'CADASTRADO').get(analista, pd.Timedelta(0))
-        tmo_antes_atualizacao = calcular_tmo_por_tipo(df_antes, 'ATUALIZADO').get(analista, pd.Timedelta(0))
-        tmo_depois_atualizacao = calcular_tmo_por_tipo(df_depois, 'ATUALIZADO').get(analista, pd.Timedelta(0))
+    # Textos HH:MM:SS de todas as células, formatados coluna a coluna
+    textos = pd.DataFrame({coluna: formatar_hms(tmo) for coluna, tmo in tabela.items()}, index=tabela.index)
 
+    tabela_html = ""
+    for analista, linha in zip(nomes_analistas, textos.itertuples(index=False)):
+        celulas = "".join(f"<td>{texto}</td>" for texto in linha)
         tabela_html += f"""
         <tr>
             <td>{analista}</td>
-            <td>{format_tmo(tmo_antes_cadastro)}</td>
-            <td>{format_tmo(tmo_depois_cadastro)}</td>
-            <td>{format_tmo(tmo_antes_atualizacao)}</td>
-            <td>{format_tmo(tmo_depois_atualizacao)}</td>
+            {celulas}
         </tr>
         """
 
-        nomes_analistas.append(analista)
-        tmo_antes_list.append(int(tmo_antes_cadastro.total_seconds() // 60))
-        tmo_depois_list.append(int(tmo_depois_cadastro.total_seconds() // 60))
-        tmo_antes_legenda.append(format_tmo(tmo_antes_cadastro))
-        tmo_depois_legenda.append(format_tmo(tmo_depois_cadastro))
-
-    label_antes = f"TMO ({data_inicio_antes.strftime('%d/%m')} - {data_fim_antes.strftime('%d/%m')})"
-    label_depois = f"TMO ({data_inicio_depois.strftime('%d/%m')} - {data_fim_depois.strftime('%d/%m')})"
+    cabecalho = "".join(
+        f"<th>TMO {nome} ({rotulo_periodo(periodo, posicao)})</th>"
+        for finalizacao, nome in FINALIZACOES_COMPARACAO.items() for posicao, periodo in enumerate(periodos)
+    )
 
-    tmo_antes_legenda_json = json.dumps(tmo_antes_legenda)
-    tmo_depois_legenda_json = json.dumps(tmo_depois_legenda)
+    # Uma série de barras por período com o TMO de cadastro em minutos; os rótulos mostram HH:MM:SS
+    datasets = [
+        {
+            'label': f"TMO ({rotulo_periodo(periodo, posicao)})",
+            'data': (tabela[('CADASTRADO', posicao)].dt.total_seconds() // 60).astype(int).tolist(),
+            'backgroundColor': CORES_PERIODOS[posicao % len(CORES_PERIODOS)],
+            'borderRadius': 10,
+        }
+        for posicao, periodo in enumerate(periodos)
+    ]
+    legendas = [textos[('CADASTRADO', posicao)].tolist() for posicao in range(len(periodos))]
 
     html_content = f"""
     <!DOCTYPE html>
@@ -2369,27 +2042,13 @@ def gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depo
             <canvas id="tmoChart" width="400" height="200"></canvas>
             <script>
                 Chart.register(ChartDataLabels);
-                const tmoAntesLegenda = {tmo_antes_legenda_json};
-                const tmoDepoisLegenda = {tmo_depois_legenda_json};
+                const tmoLegendas = {json.dumps(legendas)};
                 var ctx = document.getElementById('tmoChart').getContext('2d');
                 var tmoChart = new Chart(ctx, {{
                     type: 'bar',
                     data: {{
                         labels: {json.dumps(nomes_analistas)},
-                        datasets: [
-                            {{
-                                label: '{label_antes}',
-                                data: {tmo_antes_list},
-                                backgroundColor: '#FF5500',
-                                borderRadius: 10
-                            }},
-                            {{
-                                label: '{label_depois}',
-                                data: {tmo_depois_list},
-                                backgroundColor: '#330066',
-                                borderRadius: 10
-                            }}
-                        ]
+                        datasets: {json.dumps(datasets)}
                     }},
                     options: {{
                         responsive: true,
@@ -2400,9 +2059,7 @@ def gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depo
                                 color: '#000',
                                 font: {{ size: 10 }},
                                 formatter: function(value, context) {{
-                                    return context.dataset.label === '{label_antes}' 
-                                        ? tmoAntesLegenda[context.dataIndex] 
-                                        : tmoDepoisLegenda[context.dataIndex];
+                                    return tmoLegendas[context.datasetIndex][context.dataIndex];
                                 }}
                             }}
                         }},
@@ -2417,10 +2074,7 @@ def gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depo
             <table>
                 <tr>
                     <th>Analista</th>
-                    <th>TMO Cadastro ({data_inicio_antes.strftime('%d/%m')} - {data_fim_antes.strftime('%d/%m')})</th>
-                    <th>TMO Cadastro ({data_inicio_depois.strftime('%d/%m')} - {data_fim_depois.strftime('%d/%m')})</th>
-                    <th>TMO Atualização ({data_inicio_antes.strftime('%d/%m')} - {data_fim_antes.strftime('%d/%m')})</th>
-                    <th>TMO Atualização ({data_inicio_depois.strftime('%d/%m')} - {data_fim_depois.strftime('%d/%m')})</th>
+                    {cabecalho}
                 </tr>
                 {tabela_html}
             </table>
@@ -2432,8 +2086,8 @@ def gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depo
     return html_content
 
 # **🔹 Função para baixar o HTML**
-def download_html(df, data_inicio_antes, data_fim_antes, data_inicio_depois, data_fim_depois, usuarios_selecionados):
-    html_content = gerar_relatorio_html(df, data_inicio_antes, data_fim_antes, data_inicio_depois, data_fim_depois, usuarios_selecionados)
+def download_html(df, periodos, usuarios_selecionados):
+    html_content = gerar_relatorio_html(df, periodos, usuarios_selecionados)
     buffer = BytesIO()
     buffer.write(html_content.encode("utf-8"))
     buffer.seek(0)
@@ -2455,25 +2109,20 @@ def gerar_relatorio_html_tmo(df, data_inicio, data_fim):
     """
 
     # Filtrar apenas cadastros e o período selecionado
-    df_filtrado = df[
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicio) &
-        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_fim) &
-        (df['FINALIZAÇÃO'] == 'CADASTRADO')
-    ]
+    df_filtrado = recortar_periodo(df, data_inicio, data_fim)
+    df_filtrado = df_filtrado[df_filtrado['FINALIZAÇÃO'] == 'CADASTRADO']
 
     # Calcular TMO médio geral
     tmo_medio_geral = df_filtrado['TEMPO MÉDIO OPERACIONAL'].mean()
     
     # Agrupar dados por analista
-    df_tmo_analista = df_filtrado.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(
+    df_tmo_analista = df_filtrado.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True).agg(
         TMO=('TEMPO MÉDIO OPERACIONAL', lambda x: x.mean() if len(x) > 0 else pd.Timedelta(0)),
         Quantidade=('DATA DE CONCLUSÃO DA TAREFA', 'count')
     ).reset_index()
 
     # Formatar TMO para exibição
-    df_tmo_analista['TMO'] = df_tmo_analista['TMO'].apply(
-        lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}"
-    )
+    df_tmo_analista['TMO'] = formatar_hms(df_tmo_analista['TMO'])
 
     # Organizar os dados para gráfico
     nomes_analistas = df_tmo_analista['USUÁRIO QUE CONCLUIU A TAREFA'].tolist()
@@ -2601,41 +2250,22 @@ def download_html_tmo(df, data_inicio, data_fim):
 
 from datetime import timedelta
 
-def formatar_tempo(tempo):
-    if pd.isnull(tempo):
-        return "N/A"
-    if isinstance(tempo, str):
-        return tempo
-    total_seconds = int(tempo.total_seconds())
-    horas = total_seconds // 3600
-    minutos = (total_seconds % 3600) // 60
-    segundos = total_seconds % 60
-    return f"{horas:02}:{minutos:02}:{segundos:02}"
-
-def gerar_ficha_html_analista(df_analista, nome_analista, data_inicio, data_fim):
-    df_analista = df_analista[
-        (df_analista['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicio) &
-        (df_analista['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_fim)
-    ]
+def gerar_ficha_html_analista(df_analista, nome_analista, data_inicio, data_fim, df_ocioso=None):
+    df_analista = recortar_periodo(df_analista, data_inicio, data_fim)
 
     tmo_cadastro = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO']['TEMPO MÉDIO OPERACIONAL'].mean()
     tmo_atualizado = df_analista[df_analista['FINALIZAÇÃO'] == 'ATUALIZADO']['TEMPO MÉDIO OPERACIONAL'].mean()
 
-    df_ocioso = calcular_tempo_ocioso_por_analista(df_analista)
-    def converter_para_timedelta(valor):
-        try:
-            h, m, s = map(int, valor.split(":"))
-            return timedelta(hours=h, minutes=m, seconds=s)
-        except:
-            return pd.NaT  # caso o valor esteja malformado
-
-    serie_ociosa = df_ocioso[df_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == nome_analista]['Tempo Ocioso Formatado']
-    serie_ociosa = serie_ociosa.dropna().apply(converter_para_timedelta)
-    tempo_ocioso_medio = serie_ociosa.mean()
+    # Média diária do tempo ocioso no período, em segundos (da tabela materializada, se informada)
+    if df_ocioso is None:
+        df_ocioso = calcular_tempo_ocioso_por_analista(df_analista)
+    else:
+        df_ocioso = recortar_periodo(df_ocioso, data_inicio, data_fim, coluna='DIA')
+    tempo_ocioso_medio = df_ocioso.loc[df_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'] == nome_analista, COLUNA_OCIOSO].mean() * 60
 
     df_filas = df_analista[df_analista['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO'])].copy()
-    df_tmo_fila = df_filas.groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
-    df_tmo_fila['TEMPO MÉDIO OPERACIONAL'] = df_tmo_fila['TEMPO MÉDIO OPERACIONAL'].apply(formatar_tempo)
+    df_tmo_fila = df_filas.groupby('FILA', observed=True)['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+    df_tmo_fila['TEMPO MÉDIO OPERACIONAL'] = formatar_hms(df_tmo_fila['TEMPO MÉDIO OPERACIONAL'], nulo='N/A')
 
     tabela_filas = ''.join(
         f"<tr><td>{row['FILA']}</td><td>{row['TEMPO MÉDIO OPERACIONAL']}</td></tr>"
@@ -2713,15 +2343,15 @@ def gerar_ficha_html_analista(df_analista, nome_analista, data_inicio, data_fim)
             <div class="info-cards">
                 <div class="card">
                     <div class="card-title">TMO de Cadastro</div>
-                    <div class="card-value">{formatar_tempo(tmo_cadastro)}</div>
+                    <div class="card-value">{formatar_hms(tmo_cadastro, nulo='N/A')}</div>
                 </div>
                 <div class="card">
                     <div class="card-title">TMO de Atualização</div>
-                    <div class="card-value">{formatar_tempo(tmo_atualizado)}</div>
+                    <div class="card-value">{formatar_hms(tmo_atualizado, nulo='N/A')}</div>
                 </div>
                 <div class="card">
                     <div class="card-title">Tempo Médio Ocioso</div>
-                    <div class="card-value">{formatar_tempo(tempo_ocioso_medio)}</div>
+                    <div class="card-value">{formatar_hms(tempo_ocioso_medio, nulo='N/A')}</div>
                 </div>
             </div>
             <h2 style="margin-top: 40px;">TMO por Fila</h2>
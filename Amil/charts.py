@@ -4,6 +4,7 @@ import pandas as pd
 import streamlit as st
 import plotly.graph_objs as go
 import streamlit as st
+from .formatacao import formatar_hms, formatar_min_s
 
 def plot_produtividade_diaria(df_produtividade, custom_colors):
     if df_produtividade.empty or 'Dia' not in df_produtividade.columns or 'Produtividade' not in df_produtividade.columns:
@@ -128,10 +129,7 @@ def plot_tmo_por_dia(df_tmo, custom_colors):
     df_tmo = df_tmo.dropna(subset=['TMO'])
 
     # Converter TMO para formato HH:MM:SS
-    df_tmo['TMO_Formatado'] = df_tmo['TMO'].apply(
-        lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}" 
-        if pd.notnull(x) else "00:00:00"
-    )
+    df_tmo['TMO_Formatado'] = formatar_hms(df_tmo['TMO'])
 
     # Definir período mínimo e máximo para o slider
     df_tmo = df_tmo.sort_values(by='Dia')
@@ -195,10 +193,7 @@ def plot_tmo_por_dia_cadastro(df_tmo_cadastro, custom_colors):
         df_tmo_cadastro['TMO'] = pd.to_timedelta(df_tmo_cadastro['TMO'])
 
     # Converter TMO para formato HH:MM:SS
-    df_tmo_cadastro['TMO_Formatado'] = df_tmo_cadastro['TMO'].apply(
-        lambda x: f"{int(x.total_seconds() // 3600):02}:{int((x.total_seconds() % 3600) // 60):02}:{int(x.total_seconds() % 60):02}"
-        if pd.notnull(x) else "00:00:00"
-    )
+    df_tmo_cadastro['TMO_Formatado'] = formatar_hms(df_tmo_cadastro['TMO'])
 
     # Definir período mínimo e máximo para o slider
     df_tmo_cadastro = df_tmo_cadastro.sort_values(by='Dia')
@@ -271,14 +266,6 @@ def plot_status_pie(total_parcial, total_nao_tratada, total_completa, custom_col
     )
     return fig_status
 
-def format_timedelta_grafico_tmo(td):
-    if pd.isnull(td):
-        return "00:00:00"
-    total_seconds = int(td.total_seconds())
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
 def grafico_tmo(df_tmo_analista, custom_colors):
     # Verifica se o DataFrame está vazio
     if df_tmo_analista.empty:
@@ -290,7 +277,7 @@ def grafico_tmo(df_tmo_analista, custom_colors):
 
     # Certifique-se de que 'TMO_Formatado' existe para exibição no gráfico
     if 'TMO_Formatado' not in df_tmo_analista:
-        df_tmo_analista['TMO_Formatado'] = df_tmo_analista['TMO'].apply(format_timedelta_grafico_tmo)
+        df_tmo_analista['TMO_Formatado'] = formatar_hms(df_tmo_analista['TMO'])
 
     # Cria o gráfico de barras
     fig_tmo_analista = px.bar(
@@ -395,7 +382,9 @@ def exibir_grafico_filas_realizadas(df_analista, analista_selecionado, custom_co
 
     if 'FILA' in df_analista.columns:
         # Contar a quantidade de tarefas por fila
-        filas_feitas_analista = df_analista['FILA'].dropna().value_counts().reset_index()
+        # FILA é categórica: value_counts lista também as filas sem tarefas, que ficam de fora
+        filas_feitas_analista = df_analista['FILA'].dropna().value_counts()
+        filas_feitas_analista = filas_feitas_analista[filas_feitas_analista > 0].reset_index()
         filas_feitas_analista.columns = ['Tarefa', 'Quantidade']
 
         # Criar o gráfico de pizza
@@ -425,19 +414,6 @@ def exibir_grafico_filas_realizadas(df_analista, analista_selecionado, custom_co
     else:
         st.write("A coluna 'FILA' não foi encontrada no dataframe.")
         
-def format_timedelta_Chart(td):
-    """
-    Formata um objeto Timedelta em uma string no formato 'X min Y s'.
-
-    Parâmetros:
-        - td: Timedelta a ser formatado.
-    """
-    total_seconds = td.total_seconds()
-    minutes = int(total_seconds // 60)
-    seconds = int(total_seconds % 60)
-    return f"{minutes} min {seconds}s"
-
-
 import plotly.express as px
 import pandas as pd
 
@@ -474,7 +450,7 @@ def exibir_grafico_tmo_por_dia(df_analista, analista_selecionado, calcular_tmo_p
     df_tmo_analista['TMO_minutos'] = df_tmo_analista['TMO_segundos'] / 60
 
     # Formatar TMO para exibição como "HH:MM:SS"
-    df_tmo_analista['TMO_formatado'] = df_tmo_analista['TMO'].apply(format_timedelta_Chart)
+    df_tmo_analista['TMO_formatado'] = formatar_min_s(df_tmo_analista['TMO'])
 
     # Verificar se a coluna 'Dia' existe e contém dados válidos
     if 'Dia' not in df_tmo_analista.columns or df_tmo_analista['Dia'].isna().all():
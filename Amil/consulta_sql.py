@@ -0,0 +1,113 @@
+import os
+import tempfile
+from .armazenamento import arquivos_do_dataset, diretorio_dataset
+
+try:
+    import duckdb
+except ImportError:  # motor SQL opcional; sem ele o painel de consultas não aparece
+    duckdb = None
+
+# Consultas SQL ad hoc sobre os arquivos parquet do dataset, executadas pelo DuckDB dentro do
+# processo. As consultas leem os arquivos direto do disco (só as colunas e grupos de linhas que
+# usam), sem montar o histórico em um DataFrame, e podem estourar para disco quando passam do
+# limite de memória.
+
+SQL_DISPONIVEL = duckdb is not None
+TABELA_TAREFAS = 'tarefas'
+LIMITE_LINHAS_CONSULTA = 10_000
+LIMITE_MEMORIA_CONSULTA = '1GB'
+COLUNA_TMO = 'TEMPO MÉDIO OPERACIONAL'
+
+CONSULTAS_EXEMPLO = {
+    'TMO por TP CAUSA e mês': (
+        'SELECT "TP CAUSA (TP COMPLEMENTO)", ANO_MES, COUNT(*) AS QUANTIDADE,\n'
+        '       ROUND(AVG(TMO_SEG) / 60, 2) AS TMO_MINUTOS\n'
+        f'FROM {TABELA_TAREFAS}\n'
+        'GROUP BY ALL\n'
+        'ORDER BY ANO_MES, QUANTIDADE DESC'
+    ),
+    'Filas por MÓDULO LB': (
+        'SELECT "MÓDULO LB", FILA, COUNT(*) AS QUANTIDADE\n'
+        f'FROM {TABELA_TAREFAS}\n'
+        'GROUP BY ALL\n'
+        'ORDER BY "MÓDULO LB", QUANTIDADE DESC'
+    ),
+}
+
+
+class ErroConsulta(Exception):
+    """Consulta recusada ou com erro; a mensagem pode ser exibida ao usuário."""
+
+
+def _literal(texto):
+    return "'" + texto.replace("'", "''") + "'"
+
+
+def _conectar(usuario):
+    """
+    Conexão em memória com a visão `tarefas` sobre os parquets do dataset. A duração do TMO,
+    gravada em nanossegundos, vira INTERVAL, e a visão ganha TMO_SEG (segundos) e ANO_MES
+    (mês da conclusão, 'AAAA-MM'). Retorna None se o dataset estiver vazio.
+
+    A conexão só enxerga a pasta do dataset e tem a configuração travada, então as consultas
+    não leem nem gravam outros arquivos.
+    """
+    arquivos = arquivos_do_dataset(usuario)
+    if not arquivos:
+        return None
+
+    temporario = os.path.join(tempfile.gettempdir(), 'consultas_sql')
+    conexao = duckdb.connect(config={'memory_limit': LIMITE_MEMORIA_CONSULTA, 'temp_directory': temporario})
+    # Só a pasta do dataset (e a de estouro para disco) fica acessível às consultas
+    conexao.execute('SET allowed_directories = ?', [[os.path.abspath(diretorio_dataset(usuario)) + os.sep, temporario + os.sep]])
+    conexao.execute('SET enable_external_access = false')
+    conexao.execute('SET lock_configuration = true')
+    lista = ', '.join(_literal(os.path.abspath(arquivo)) for arquivo in arquivos)
+    conexao.execute(f'CREATE VIEW _parquet AS SELECT * FROM read_parquet([{lista}], union_by_name = true, hive_partitioning = false)')
+
+    tipos = dict(conexao.execute('SELECT column_name, column_type FROM (DESCRIBE _parquet)').fetchall())
+    substituicoes, extras = [], []
+    if tipos.get(COLUNA_TMO) == 'BIGINT':
+        substituicoes.append(f'to_microseconds("{COLUNA_TMO}" // 1000) AS "{COLUNA_TMO}"')
+        extras.append(f'"{COLUNA_TMO}" / 1e9 AS TMO_SEG')
+    elif tipos.get(COLUNA_TMO) == 'INTERVAL':
+        extras.append(f'epoch("{COLUNA_TMO}") AS TMO_SEG')
+    if tipos.get('DATA DE CONCLUSÃO DA TAREFA', '').startswith('TIMESTAMP'):
+        extras.append('strftime("DATA DE CONCLUSÃO DA TAREFA", \'%Y-%m\') AS ANO_MES')
+
+    selecao = '*' + (f' REPLACE ({", ".join(substituicoes)})' if substituicoes else '')
+    conexao.execute(f'CREATE VIEW {TABELA_TAREFAS} AS SELECT {", ".join([selecao] + extras)} FROM _parquet')
+    return conexao
+
+
+def executar_consulta(usuario, sql, limite=LIMITE_LINHAS_CONSULTA):
+    """
+    Executa uma consulta de leitura (um único SELECT/WITH) sobre a visão `tarefas` do dataset.
+
+    Retorna (DataFrame, truncado): no máximo `limite` linhas e se o resultado tinha mais.
+    Comandos que alteram dados ou arquivos (COPY, CREATE, ATTACH, SET...) são recusados com
+    ErroConsulta, assim como erros de sintaxe ou de execução.
+    """
+    if not SQL_DISPONIVEL:
+        raise ErroConsulta('O DuckDB não está instalado.')
+    conexao = _conectar(usuario)
+    if conexao is None:
+        raise ErroConsulta('Nenhum dado carregado.')
+
+    try:
+        comandos = conexao.extract_statements(sql)
+        if len(comandos) != 1:
+            raise ErroConsulta('Envie exatamente um comando por consulta.')
+        if comandos[0].type != duckdb.StatementType.SELECT:
+            raise ErroConsulta('Só consultas de leitura (SELECT ou WITH) são permitidas.')
+        resultado = conexao.sql(comandos[0].query).limit(limite + 1).df()
+    except duckdb.Error as erro:
+        raise ErroConsulta(str(erro)) from erro
+    finally:
+        conexao.close()
+    return resultado.head(limite), len(resultado) > limite
+
+
+def descrever_tarefas(usuario):
+    """Colunas e tipos da visão `tarefas`, para mostrar junto do editor de consultas."""
+    return executar_consulta(usuario, f'SELECT column_name AS COLUNA, column_type AS TIPO FROM (DESCRIBE {TABELA_TAREFAS})')[0]
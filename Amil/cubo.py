@@ -0,0 +1,318 @@
+import numpy as np
+import pandas as pd
+from .ingestao import COLUNA_DIA, COLUNA_TMO, EPOCA, compactar_colunas, data_para_dia
+
+# Dimensões do cubo: dia de conclusão × analista × fila × finalização × módulo, mais a marca de
+# TMO acima de 1h usada nas regras que descartam tarefas da fila DÚVIDA
+COLUNA_ACIMA_1H = 'TMO_ACIMA_1H'
+DIMENSOES_CUBO = [
+    COLUNA_DIA, 'USUÁRIO QUE CONCLUIU A TAREFA', 'FILA', 'FINALIZAÇÃO', 'MÓDULO LB', COLUNA_ACIMA_1H
+]
+
+# Medidas somáveis por célula:
+#   - LINHAS: tarefas na célula (equivale a len() sobre as tarefas)
+#   - CONTAGEM: tarefas com TMO preenchido (equivale a count() do TMO)
+#   - SOMA_NS: soma do TMO em nanossegundos, exata como a soma de timedeltas
+#   - SOMA_QUADRADOS: soma do quadrado do TMO em segundos, para o desvio padrão
+MEDIDAS_CUBO = ['LINHAS', 'CONTAGEM', 'SOMA_NS', 'SOMA_QUADRADOS']
+
+# Colunas das tarefas necessárias para montar o cubo
+COLUNAS_CUBO = [
+    'USUÁRIO QUE CONCLUIU A TAREFA', 'FILA', 'FINALIZAÇÃO', 'MÓDULO LB',
+    COLUNA_TMO, 'DATA DE CONCLUSÃO DA TAREFA'
+]
+
+LIMITE_1H = pd.Timedelta(hours=1)
+
+
+def eh_cubo(df):
+    """Indica se o DataFrame já é um cubo (ou recorte de cubo) em vez de tarefas."""
+    return all(medida in df.columns for medida in MEDIDAS_CUBO)
+
+
+def montar_cubo(df, dimensoes=DIMENSOES_CUBO):
+    """
+    Agrega as tarefas em um cubo com soma, contagem e soma dos quadrados do TMO por
+    (dia, analista, fila, finalização, módulo), em um único groupby sobre códigos inteiros.
+
+    Dimensões ausentes em `df` entram como nulas. O cubo é um DataFrame comum, com uma linha
+    por combinação existente; consultar_cubo soma as células na granularidade pedida.
+    Quem só precisa de parte das dimensões pode pedir um cubo menor com `dimensoes`.
+    """
+    if COLUNA_DIA in dimensoes and COLUNA_DIA not in df.columns and 'DATA DE CONCLUSÃO DA TAREFA' in df.columns:
+        df = compactar_colunas(df)
+    linhas = len(df)
+
+    if COLUNA_TMO in df.columns:
+        tmo = df[COLUNA_TMO]
+    else:
+        tmo = pd.Series(pd.NaT, index=df.index, dtype='timedelta64[ns]')
+    valido = tmo.notna().to_numpy()
+    tmo_ns = np.where(valido, tmo.to_numpy().view('i8'), 0)
+    tmo_seg = tmo_ns / 1e9
+
+    base = {}
+    for coluna in [d for d in dimensoes if d != COLUNA_ACIMA_1H]:
+        if coluna in df.columns:
+            serie = df[coluna]
+        elif coluna == COLUNA_DIA:
+            serie = pd.Series(pd.NA, index=df.index, dtype='Int32')
+        else:
+            serie = pd.Series(np.nan, index=df.index, dtype=object)
+        if coluna != COLUNA_DIA and not isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype('category')
+        # .array mantém os códigos das categóricas e o Int32 anulável, sem alinhar pelo índice
+        base[coluna] = serie.array
+    if COLUNA_ACIMA_1H in dimensoes:
+        base[COLUNA_ACIMA_1H] = valido & (tmo_ns > LIMITE_1H.value)
+    base['LINHAS'] = np.ones(linhas, dtype='int64')
+    base['CONTAGEM'] = valido.astype('int64')
+    base['SOMA_NS'] = tmo_ns
+    base['SOMA_QUADRADOS'] = tmo_seg * tmo_seg
+    base = pd.DataFrame(base, copy=False)
+
+    return base.groupby(list(dimensoes), observed=True, dropna=False, sort=False)[MEDIDAS_CUBO].sum().reset_index()
+
+
+def como_cubo(df, dimensoes=DIMENSOES_CUBO):
+    """Devolve `df` se já for um cubo; caso contrário monta o cubo das tarefas recebidas."""
+    return df if eh_cubo(df) else montar_cubo(df, dimensoes)
+
+
+def filtrar_cubo(cubo, periodo=None, filtros=None, excluir=None):
+    """
+    Recorta o cubo sem reagregar:
+        - periodo: (data_inicial, data_final), inclusivo, sobre o dia de conclusão
+        - filtros: {dimensão: valores} que as células devem ter
+        - excluir: {dimensão: valores} que as células não podem ter (nulos são mantidos)
+    """
+    mascara = np.ones(len(cubo), dtype=bool)
+    if periodo is not None:
+        dias = cubo[COLUNA_DIA]
+        inicio, fim = data_para_dia(periodo[0]), data_para_dia(periodo[1])
+        mascara &= (dias >= inicio).fillna(False).to_numpy() & (dias <= fim).fillna(False).to_numpy()
+    for coluna, valores in (filtros or {}).items():
+        mascara &= cubo[coluna].isin(valores).to_numpy()
+    for coluna, valores in (excluir or {}).items():
+        mascara &= ~cubo[coluna].isin(valores).to_numpy()
+
+    if mascara.all():
+        return cubo
+    return cubo[mascara]
+
+
+def consultar_cubo(cubo, por=(), periodo=None, filtros=None, excluir=None):
+    """
+    Soma as medidas do cubo agrupando pelas dimensões em `por` (depois de aplicar o recorte
+    de filtrar_cubo) e acrescenta:
+        - TMO: média do TMO (Timedelta), nula onde não há TMO preenchido
+        - DESVIO_TMO: desvio padrão populacional do TMO, em segundos
+
+    Sem `por`, devolve uma única linha com os totais do recorte.
+    """
+    recorte = filtrar_cubo(cubo, periodo, filtros, excluir)
+    por = list(por)
+    if por:
+        resultado = recorte.groupby(por, observed=True, dropna=False)[MEDIDAS_CUBO].sum().reset_index()
+    else:
+        # Soma coluna a coluna para a SOMA_NS continuar inteira (exata) ao lado da soma em float
+        resultado = pd.DataFrame({medida: [recorte[medida].sum()] for medida in MEDIDAS_CUBO})
+
+    contagem = resultado['CONTAGEM'].where(resultado['CONTAGEM'] > 0)
+    media_ns = resultado['SOMA_NS'] / contagem
+    resultado['TMO'] = pd.to_timedelta(media_ns, unit='ns')
+    variancia = resultado['SOMA_QUADRADOS'] / contagem - (media_ns / 1e9) ** 2
+    resultado['DESVIO_TMO'] = np.sqrt(variancia.clip(lower=0))
+    return resultado
+
+
+def top_n_por_grupo(df, grupo, ordem, n=1, ascendente=True, minimo=None, coluna_volume=None, desempate=None):
+    """
+    As `n` primeiras linhas de cada `grupo` pela coluna `ordem`, sem laço por grupo:
+        - linhas com `ordem` nula ficam de fora, assim como as com `coluna_volume` abaixo de `minimo`
+        - POSIÇÃO é a classificação dentro do grupo; empatados recebem a mesma posição
+          (1, 1, 3...) e entram todos, mesmo que passem de `n` linhas
+        - `desempate` só ordena os empatados na saída (por exemplo, o nome do analista)
+
+    Retorna as linhas selecionadas com a coluna POSIÇÃO, ordenadas por grupo e posição.
+    """
+    df = df[df[ordem].notna().to_numpy()]
+    if minimo is not None:
+        df = df[(df[coluna_volume] >= minimo).to_numpy()]
+
+    posicao = df.groupby(grupo, observed=True)[ordem].rank(method='min', ascending=ascendente)
+    selecionados = df.assign(**{'POSIÇÃO': posicao.astype('int64')})[(posicao <= n).to_numpy()]
+    chaves = [grupo, 'POSIÇÃO'] + ([desempate] if desempate is not None else [])
+    return selecionados.sort_values(chaves, kind='stable').reset_index(drop=True)
+
+
+def consultar_periodos(df, periodos, por=('USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO'), filtros=None, excluir=None):
+    """
+    Como consultar_cubo, mas somando em cada janela de `periodos` (lista de (data_inicial,
+    data_final), inclusivas) ao mesmo tempo. Cada célula entra em todas as janelas que contêm
+    o seu dia, então as janelas podem se sobrepor, e todas são agregadas em um único groupby.
+    `df` pode ser um cubo ou as tarefas. A coluna 'PERIODO' traz a posição da janela em `periodos`.
+    """
+    por = list(por)
+    cubo = filtrar_cubo(como_cubo(df, dimensoes=[COLUNA_DIA, *por]), filtros=filtros, excluir=excluir)
+    dias = cubo[COLUNA_DIA].to_numpy(dtype='float64', na_value=np.nan)
+    inicio = np.array([data_para_dia(periodo[0]) for periodo in periodos], dtype='float64')
+    fim = np.array([data_para_dia(periodo[1]) for periodo in periodos], dtype='float64')
+
+    # Pares (célula, janela) em que o dia da célula cai dentro da janela
+    celulas, janelas = np.nonzero((dias[:, None] >= inicio) & (dias[:, None] <= fim))
+    base = cubo.iloc[celulas][por + MEDIDAS_CUBO]
+    base.insert(0, 'PERIODO', janelas)
+    return consultar_cubo(base, por=['PERIODO', *por])
+
+
+def tempo_total(soma_ns):
+    """Converte a medida SOMA_NS de volta para Timedelta."""
+    return pd.Timedelta(int(soma_ns))
+
+
+def dias_como_datas(dias):
+    """Converte a dimensão DIA do cubo em objetos date, como os agrupamentos por `.dt.date`."""
+    return (EPOCA + pd.to_timedelta(dias.astype('float64'), unit='D')).dt.date
+
+
+# Rollup mensal: mês de conclusão × analista × finalização, com as medidas somáveis do cubo.
+# Alimenta as visões de TMO por mês, que só precisam de soma e contagem por mês.
+COLUNA_MES = 'ANO_MES'
+DIMENSOES_MES = [COLUNA_MES, 'USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO']
+MEDIDAS_MES = ['LINHAS', 'CONTAGEM', 'SOMA_NS']
+
+
+def eh_rollup_mensal(df):
+    """Indica se o DataFrame já é um rollup mensal em vez de tarefas ou cubo."""
+    return COLUNA_MES in df.columns and all(medida in df.columns for medida in MEDIDAS_MES)
+
+
+def montar_rollup_mensal(df):
+    """
+    Agrega tarefas (ou um cubo, ou um recorte de cubo) por mês de conclusão, analista e
+    finalização, somando LINHAS, CONTAGEM e SOMA_NS. O mês é um Period mensal; células sem
+    dia de conclusão ficam de fora.
+    """
+    cubo = como_cubo(df, dimensoes=[COLUNA_DIA, 'USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO'])
+    cubo = cubo[cubo[COLUNA_DIA].notna()]
+
+    # Cada dia distinto é convertido em mês uma única vez
+    dias, posicoes = np.unique(cubo[COLUNA_DIA].to_numpy(dtype='int64'), return_inverse=True)
+    meses = pd.PeriodIndex(EPOCA + pd.to_timedelta(dias, unit='D'), freq='M')
+
+    base = pd.DataFrame({
+        COLUNA_MES: meses[posicoes.reshape(-1)],
+        'USUÁRIO QUE CONCLUIU A TAREFA': cubo['USUÁRIO QUE CONCLUIU A TAREFA'].array,
+        'FINALIZAÇÃO': cubo['FINALIZAÇÃO'].array,
+        **{medida: cubo[medida].to_numpy() for medida in MEDIDAS_MES},
+    })
+    return base.groupby(DIMENSOES_MES, observed=True, dropna=False)[MEDIDAS_MES].sum().reset_index()
+
+
+def como_rollup_mensal(df):
+    """Devolve `df` se já for um rollup mensal; caso contrário monta o rollup das tarefas ou do cubo."""
+    return df if eh_rollup_mensal(df) else montar_rollup_mensal(df)
+
+
+def tmo_mensal(rollup, tipos):
+    """
+    TMO por mês para cada tipo em `tipos` ({coluna: finalizações somadas nela}), a partir
+    do rollup mensal. Retorna um DataFrame indexado pelo mês com, para cada tipo, o TMO
+    (Timedelta, nulo sem TMO preenchido) e '<coluna>_LINHAS' com as tarefas do tipo.
+    """
+    if rollup.empty:
+        colunas = [c for coluna in tipos for c in (coluna, f'{coluna}_LINHAS')]
+        return pd.DataFrame(columns=colunas, index=pd.PeriodIndex([], freq='M', name=COLUNA_MES))
+    por_finalizacao = (
+        rollup.groupby([COLUNA_MES, 'FINALIZAÇÃO'], observed=True)[MEDIDAS_MES].sum()
+        .unstack('FINALIZAÇÃO', fill_value=0)
+    )
+    resultado = pd.DataFrame(index=por_finalizacao.index)
+    for coluna, finalizacoes in tipos.items():
+        presentes = [f for f in finalizacoes if f in por_finalizacao['LINHAS'].columns]
+        linhas, contagem, soma_ns = (por_finalizacao[medida][presentes].sum(axis=1) for medida in MEDIDAS_MES)
+        resultado[coluna] = pd.to_timedelta((soma_ns / contagem.where(contagem > 0)).to_numpy(), unit='ns')
+        resultado[f'{coluna}_LINHAS'] = linhas.to_numpy()
+    return resultado
+
+
+# Recordes pessoais: uma linha por analista com os melhores resultados de cadastro no recorte.
+# Produção do dia = cadastros + atualizações; dias sem nenhuma tarefa (folgas, fins de
+# semana) não interrompem a sequência de dias na meta.
+FINALIZACOES_PRODUCAO = ['CADASTRADO', 'ATUALIZADO']
+COLUNAS_RECORDES = [
+    'MELHOR_DIA_TMO', 'MELHOR_TMO', 'MELHOR_DIA_CADASTROS', 'CADASTROS_MELHOR_DIA',
+    'SEQUENCIA_META', 'FIM_SEQUENCIA_META', 'MELHOR_MES', 'PRODUCAO_MELHOR_MES',
+]
+
+
+def _primeiro_por_analista(df, ordem, ascendente):
+    """Primeira linha de cada analista pela ordem dada; empates ficam com o dia mais antigo."""
+    ordenado = df.sort_values(['USUÁRIO QUE CONCLUIU A TAREFA'] + ordem, ascending=[True] + ascendente, kind='stable')
+    return ordenado.drop_duplicates('USUÁRIO QUE CONCLUIU A TAREFA').set_index('USUÁRIO QUE CONCLUIU A TAREFA')
+
+
+def montar_recordes(df, meta_diaria):
+    """
+    Recordes pessoais de cada analista, a partir das tarefas ou de um (recorte de) cubo:
+        - MELHOR_DIA_TMO / MELHOR_TMO: dia com o menor TMO de cadastro
+        - MELHOR_DIA_CADASTROS / CADASTROS_MELHOR_DIA: dia com mais cadastros
+        - SEQUENCIA_META / FIM_SEQUENCIA_META: maior sequência de dias trabalhados com produção
+          de pelo menos `meta_diaria`, e o dia em que ela terminou
+        - MELHOR_MES / PRODUCAO_MELHOR_MES: mês (Period) com a maior produção
+
+    Todas as medidas saem de uma única soma por (analista, dia, finalização). Empates ficam com
+    o dia ou mês mais antigo. Retorna um DataFrame indexado pelo analista; analistas sem o dado
+    de um recorde ficam com ele nulo (sequência 0).
+    """
+    cubo = como_cubo(df, dimensoes=[COLUNA_DIA, 'USUÁRIO QUE CONCLUIU A TAREFA', 'FINALIZAÇÃO'])
+    por_dia = consultar_cubo(cubo, por=['USUÁRIO QUE CONCLUIU A TAREFA', COLUNA_DIA, 'FINALIZAÇÃO'])
+    por_dia = por_dia[por_dia[COLUNA_DIA].notna() & por_dia['USUÁRIO QUE CONCLUIU A TAREFA'].notna()]
+    usuario = por_dia['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str)
+    analistas = pd.Index(np.sort(usuario.unique()), name='USUÁRIO QUE CONCLUIU A TAREFA')
+    recordes = pd.DataFrame(index=analistas, columns=COLUNAS_RECORDES)
+    if por_dia.empty:
+        return recordes
+
+    # Medidas por (analista, dia): cadastros (com soma e contagem do TMO) e produção
+    cadastro = por_dia['FINALIZAÇÃO'].eq('CADASTRADO').to_numpy()
+    producao = por_dia['FINALIZAÇÃO'].isin(FINALIZACOES_PRODUCAO).to_numpy()
+    dias = pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': usuario.to_numpy(),
+        COLUNA_DIA: por_dia[COLUNA_DIA].to_numpy(dtype='int64'),
+        'CADASTROS': np.where(cadastro, por_dia['LINHAS'], 0),
+        'CONTAGEM': np.where(cadastro, por_dia['CONTAGEM'], 0),
+        'SOMA_NS': np.where(cadastro, por_dia['SOMA_NS'], 0),
+        'PRODUCAO': np.where(producao, por_dia['LINHAS'], 0),
+    }).groupby(['USUÁRIO QUE CONCLUIU A TAREFA', COLUNA_DIA], sort=True).sum().reset_index()
+    dias['TMO'] = pd.to_timedelta((dias['SOMA_NS'] / dias['CONTAGEM'].where(dias['CONTAGEM'] > 0)).to_numpy(), unit='ns')
+
+    melhor_tmo = _primeiro_por_analista(dias[dias['TMO'].notna()], ['TMO', COLUNA_DIA], [True, True])
+    recordes['MELHOR_DIA_TMO'] = dias_como_datas(melhor_tmo[COLUNA_DIA]).reindex(recordes.index)
+    recordes['MELHOR_TMO'] = melhor_tmo['TMO'].reindex(recordes.index)
+
+    melhor_cadastro = _primeiro_por_analista(dias[dias['CADASTROS'] > 0], ['CADASTROS', COLUNA_DIA], [False, True])
+    recordes['MELHOR_DIA_CADASTROS'] = dias_como_datas(melhor_cadastro[COLUNA_DIA]).reindex(recordes.index)
+    recordes['CADASTROS_MELHOR_DIA'] = melhor_cadastro['CADASTROS'].reindex(recordes.index).astype('Int64')
+
+    # Sequências: cada troca de analista ou de "na meta / fora da meta" abre um novo trecho
+    na_meta = (dias['PRODUCAO'] >= meta_diaria).to_numpy()
+    analista = dias['USUÁRIO QUE CONCLUIU A TAREFA'].to_numpy()
+    inicio_trecho = np.ones(len(dias), dtype=bool)
+    inicio_trecho[1:] = (analista[1:] != analista[:-1]) | (na_meta[1:] != na_meta[:-1])
+    trecho = np.cumsum(inicio_trecho)
+    trechos = dias[na_meta].assign(TRECHO=trecho[na_meta]).groupby('TRECHO').agg(
+        **{'USUÁRIO QUE CONCLUIU A TAREFA': ('USUÁRIO QUE CONCLUIU A TAREFA', 'first'),
+           'DIAS': (COLUNA_DIA, 'size'), 'FIM': (COLUNA_DIA, 'max')}
+    )
+    maior_trecho = _primeiro_por_analista(trechos, ['DIAS', 'FIM'], [False, True])
+    recordes['SEQUENCIA_META'] = maior_trecho['DIAS'].reindex(recordes.index).fillna(0).astype('int64')
+    recordes['FIM_SEQUENCIA_META'] = dias_como_datas(maior_trecho['FIM']).reindex(recordes.index)
+
+    meses = pd.PeriodIndex(EPOCA + pd.to_timedelta(dias[COLUNA_DIA], unit='D'), freq='M')
+    por_mes = dias.groupby(['USUÁRIO QUE CONCLUIU A TAREFA', meses.rename(COLUNA_MES)])['PRODUCAO'].sum().reset_index()
+    melhor_mes = _primeiro_por_analista(por_mes[por_mes['PRODUCAO'] > 0], ['PRODUCAO', COLUNA_MES], [False, True])
+    recordes['MELHOR_MES'] = melhor_mes[COLUNA_MES].reindex(recordes.index)
+    recordes['PRODUCAO_MELHOR_MES'] = melhor_mes['PRODUCAO'].reindex(recordes.index).astype('Int64')
+    return recordes
@@ -2,11 +2,36 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from io import BytesIO
-from .calculations import calcular_tmo_equipe_cadastro, calcular_ranking_atualizacao, calcular_ranking_distribuicao, calcular_ranking_auditoria, calcular_ranking_cadastro_orgaos,calcular_ranking_cadastro_oficios, calcular_ranking_cadastro_pre,calcular_ranking_cadastro_judicial, gerar_ficha_html_analista, contar_desvios, exibir_cadastro_atualizacao_por_modulo, calcular_cadastro_atualizacao_por_modulo, obter_maior_quantidade_por_fila, exibir_grafico_desvios_auditoria, exibir_melhor_analista_por_fila, exibir_maior_quantidade_por_fila, calcular_e_exibir_tmo_cadastro_atualizacao_por_fila, format_timedelta_hms,exibir_grafico_tmo_analista_por_mes, format_timedelta_grafico_tmo_analista, obter_melhor_analista_por_fila, exibir_grafico_tempo_ocioso_por_dia, calcular_producao_email_detalhada, calcular_producao_agrupada, exportar_planilha_com_tmo_completo, gerar_relatorio_html, download_html, download_html_tmo, gerar_relatorio_html_tmo,  calcular_tmo_equipe_atualizado, calcular_produtividade_diaria, calcular_tmo_por_dia_cadastro, calcular_produtividade_diaria_cadastro, calcular_tmo_por_dia, convert_to_timedelta_for_calculations, convert_to_datetime_for_calculations, save_data, load_data, format_timedelta, calcular_ranking, calcular_filas_analista, calcular_metrica_analista, calcular_carteiras_analista,exportar_relatorio_detalhado_por_analista, get_points_of_attention, calcular_tmo_por_carteira, calcular_tmo, calcular_e_exibir_tmo_por_fila, calcular_tmo_por_mes, exibir_tmo_por_mes, exibir_dataframe_tmo_formatado, export_dataframe, calcular_tempo_ocioso_por_analista, calcular_melhor_tmo_por_dia, calcular_melhor_dia_por_cadastro, exibir_tmo_por_mes_analista, exportar_planilha_com_tmo, calcular_tmo_geral, calcular_tmo_cadastro, calcular_tempo_ocioso, gerar_relatorio_tmo_completo
+from .calculations import calcular_tmo_equipe, calcular_ranking_atualizacao, calcular_ranking_distribuicao, calcular_ranking_auditoria, calcular_ranking_cadastro_orgaos,calcular_ranking_cadastro_oficios, calcular_ranking_cadastro_pre,calcular_ranking_cadastro_judicial, gerar_ficha_html_analista, contar_desvios, exibir_cadastro_atualizacao_por_modulo, calcular_cadastro_atualizacao_por_modulo, obter_maior_quantidade_por_fila, exibir_grafico_desvios_auditoria, exibir_melhor_analista_por_fila, exibir_maior_quantidade_por_fila, calcular_e_exibir_tmo_cadastro_atualizacao_por_fila,exibir_grafico_tmo_analista_por_mes, obter_melhor_analista_por_fila, exibir_grafico_tempo_ocioso_por_dia, calcular_producao_email_detalhada, calcular_producao_agrupada, exportar_planilha_com_tmo_completo, gerar_relatorio_html, download_html, exibir_comparacao_periodos, download_html_tmo, gerar_relatorio_html_tmo,  calcular_produtividade_diaria, calcular_tmo_por_dia_cadastro, calcular_produtividade_diaria_cadastro, calcular_tmo_por_dia, save_data, salvar_log_ajustes, load_data, obter_cubo, obter_ocioso, obter_rollup_mensal, obter_visao_analista, calcular_ranking, base_rankings, calcular_filas_analista, calcular_metrica_analista, calcular_carteiras_analista,exportar_relatorio_detalhado_por_analista, get_points_of_attention, calcular_tmo_por_carteira, calcular_tmo, calcular_e_exibir_tmo_por_fila, calcular_tmo_por_mes, exibir_tmo_por_mes, exibir_dataframe_tmo_formatado, export_dataframe, calcular_tempo_ocioso_por_analista, calcular_melhor_tmo_por_dia, calcular_melhor_dia_por_cadastro, exibir_tmo_por_mes_analista, exportar_planilha_com_tmo, calcular_tmo_geral, calcular_tmo_cadastro, calcular_tempo_ocioso, gerar_relatorio_tmo_completo, POSICOES_POR_FILA, VOLUME_MINIMO_POR_FILA, META_DIARIA_PRODUCAO
 from .charts import plot_produtividade_diaria, plot_grafico_desvios, plot_tmo_por_dia_cadastro, plot_tmo_por_dia_cadastro, exibir_grafico_tp_causa, plot_produtividade_diaria_cadastros, plot_tmo_por_dia, plot_status_pie, grafico_tmo, grafico_status_analista, exibir_grafico_filas_realizadas, exibir_grafico_tmo_por_dia, exibir_grafico_quantidade_por_dia
 from datetime import datetime
 import difflib
 from Amil.diario import diario
+from .armazenamento import hash_conteudo, consultar_ingestao, registrar_ingestao, intervalo_datas
+from .ingestao import ler_planilha_em_blocos
+from .cubo import filtrar_cubo, consultar_cubo, tempo_total
+from .formatacao import formatar_hms, formatar_min_s
+from .consulta_sql import SQL_DISPONIVEL, CONSULTAS_EXEMPLO, ErroConsulta, executar_consulta, descrever_tarefas
+
+# Colunas lidas do dataset por visão (as chaves DIA e TMO_SEG vêm junto com a data e o TMO)
+COLUNAS_VISAO_GERAL = [
+    'NÚMERO DO PROTOCOLO', 'TAREFA', 'FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'SITUAÇÃO DA TAREFA',
+    'TEMPO MÉDIO OPERACIONAL', 'DATA DE CONCLUSÃO DA TAREFA', 'FINALIZAÇÃO', 'MÓDULO LB',
+    'DESVIOS CADASTRO', 'TP CAUSA (TP COMPLEMENTO)'
+]
+COLUNAS_METRICAS_INDIVIDUAIS = [
+    'FILA', 'USUÁRIO QUE CONCLUIU A TAREFA', 'SITUAÇÃO DA TAREFA', 'TEMPO MÉDIO OPERACIONAL',
+    'DATA DE INÍCIO DA TAREFA', 'DATA DE CONCLUSÃO DA TAREFA', 'FINALIZAÇÃO', 'TP CAUSA (TP COMPLEMENTO)'
+]
+COLUNAS_DIARIO_DE_BORDO = ['USUÁRIO QUE CONCLUIU A TAREFA', 'TEMPO MÉDIO OPERACIONAL']
+
+def limites_de_data(usuario):
+    # Primeiro e último dia com tarefas concluídas, lidos do manifesto do dataset
+    intervalo = intervalo_datas(usuario)
+    if intervalo is None:
+        hoje = datetime.today().date()
+        return hoje, hoje
+    return intervalo[0].date(), intervalo[1].date()
 
 def dashboard():
     hide_footer_style = """ 
@@ -116,32 +141,50 @@ def dashboard():
                 """
     st.markdown(hide_streamlit_style, unsafe_allow_html=True) 
     
-    # Carregar dados
     usuario_logado = st.session_state.usuario_logado
-    df_total = load_data(usuario_logado)
 
     # Sidebar
     st.sidebar.header("Navegação")
-    opcao_selecionada = st.sidebar.selectbox("Escolha uma visão", ["Visão Geral", "Métricas Individuais", "Diário de Bordo"])
-    
+    visoes = ["Visão Geral", "Métricas Individuais", "Diário de Bordo"]
+    if SQL_DISPONIVEL:
+        # O painel de consultas só aparece quando o DuckDB está instalado
+        visoes.append("Consulta SQL")
+    opcao_selecionada = st.sidebar.selectbox("Escolha uma visão", visoes)
+
     # Carregar nova planilha
     uploaded_file = st.sidebar.file_uploader("Carregar nova planilha", type=["xlsx"])
 
-    if uploaded_file is not None:
-        df_new = pd.read_excel(uploaded_file)
-        df_total = pd.concat([df_total, df_new], ignore_index=True)
-        save_data(df_total, usuario_logado)
-        st.sidebar.success(f'Arquivo "{uploaded_file.name}" carregado com sucesso!')
-        
+    # O uploader mantém o arquivo entre reruns: só processa um upload que esta sessão ainda não viu
+    if uploaded_file is not None and st.session_state.get('ultimo_upload_id') != uploaded_file.file_id:
+        conteudo = uploaded_file.getvalue()
+        hash_arquivo = hash_conteudo(conteudo)
+        ingestao_anterior = consultar_ingestao(usuario_logado, hash_arquivo)
+
+        if ingestao_anterior is None:
+            # Lê a planilha em blocos e grava cada um assim que é lido; o histórico não é reescrito
+            progresso = st.sidebar.progress(0.0, text="Lendo planilha...")
+            blocos_novos = []
+            ajustes = []
+            for bloco, linhas_lidas, total_linhas in ler_planilha_em_blocos(conteudo):
+                blocos_novos.append(save_data(bloco, usuario_logado, ajustes=ajustes))
+                fracao = min(linhas_lidas / total_linhas, 1.0) if total_linhas else 0.0
+                progresso.progress(fracao, text=f"{linhas_lidas:,} linhas processadas".replace(',', '.'))
+            progresso.empty()
+
+            salvar_log_ajustes(pd.concat(ajustes, ignore_index=True) if ajustes else pd.DataFrame(), usuario_logado)
+            linhas_novas = sum(len(bloco) for bloco in blocos_novos)
+            registrar_ingestao(usuario_logado, hash_arquivo, uploaded_file.name, linhas_novas)
+            st.sidebar.success(f'Arquivo "{uploaded_file.name}" carregado com sucesso!')
+        else:
+            st.sidebar.info(f'Arquivo "{uploaded_file.name}" já foi carregado em {ingestao_anterior["carregado_em"]} (como "{ingestao_anterior["arquivo"]}"). Nenhuma linha nova.')
+
+        st.session_state.ultimo_upload_id = uploaded_file.file_id
+
 
     if usuario_logado == "andrew@unimed" and not hasattr(st.session_state, 'bianca_welcomed'):
         st.toast("Bem-vindo, Andrew!", icon=":material/account_circle:")
         st.session_state.bianca_welcomed = True
 
-    # Converte para cálculos temporários
-    df_total = convert_to_timedelta_for_calculations(df_total)
-    df_total = convert_to_datetime_for_calculations(df_total)
-    
     ms = st.session_state
 
     # Verifique se a chave 'themes' existe no session_state
@@ -215,9 +258,8 @@ def dashboard():
         
         st.title("Produtividade Geral")
 
-        # Filtros de data
-        min_date = df_total['DATA DE CONCLUSÃO DA TAREFA'].min().date() if not df_total.empty else datetime.today().date()
-        max_date = df_total['DATA DE CONCLUSÃO DA TAREFA'].max().date() if not df_total.empty else datetime.today().date()
+        # Filtros de data: os limites vêm do manifesto, sem carregar os dados
+        min_date, max_date = limites_de_data(usuario_logado)
         
         st.subheader("Filtro por Data")
         col1, col2 = st.columns(2)
@@ -229,55 +271,37 @@ def dashboard():
         if data_inicial > data_final:
             st.sidebar.error("A data inicial não pode ser posterior à data final!")
 
-        df_total = df_total[(df_total['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) & (df_total['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final)]
+        # Carregar dados: só as colunas da visão e só o período selecionado
+        df_total = load_data(usuario_logado, COLUNAS_VISAO_GERAL, periodo=(data_inicial, data_final))
+
+        # Métricas de produtividade, somadas a partir do cubo do dataset (sem varrer as tarefas)
+        cubo_periodo = filtrar_cubo(obter_cubo(usuario_logado), periodo=(data_inicial, data_final))
+        resumo_finalizacao = consultar_cubo(cubo_periodo, por=['FINALIZAÇÃO']).set_index('FINALIZAÇÃO')
+        totais = resumo_finalizacao['LINHAS']
+        tempos = resumo_finalizacao['SOMA_NS']
 
-        # Métricas de produtividade
-        total_finalizados = len(df_total[df_total['FINALIZAÇÃO'] == 'CADASTRADO'])
-        total_atualizados = len(df_total[df_total['FINALIZAÇÃO'] == 'ATUALIZADO'])
-        total_distribuidos = len(df_total[df_total['FINALIZAÇÃO'] == 'REALIZADO'])
-        total_auditado = len(df_total[df_total['FINALIZAÇÃO'] == 'AUDITADO'])
+        total_finalizados = int(totais.get('CADASTRADO', 0))
+        total_atualizados = int(totais.get('ATUALIZADO', 0))
+        total_distribuidos = int(totais.get('REALIZADO', 0))
+        total_auditado = int(totais.get('AUDITADO', 0))
         total_geral = total_finalizados + total_atualizados + total_distribuidos
 
+        tempo_cadastros = tempo_total(tempos.get('CADASTRADO', 0))
+        tempo_atualizacoes = tempo_total(tempos.get('ATUALIZADO', 0))
+        tempo_distribuicoes = tempo_total(tempos.get('REALIZADO', 0))
+        tempo_auditoria = tempo_total(tempos.get('AUDITADO', 0))
+
         # Calcular tempo médio geral, verificando se o total geral é maior que zero
         if total_geral > 0:
-            tempo_medio = (
-                df_total[df_total['FINALIZAÇÃO'] == 'CADASTRADO']['TEMPO MÉDIO OPERACIONAL'].sum() +
-                df_total[df_total['FINALIZAÇÃO'] == 'ATUALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum() +
-                df_total[df_total['FINALIZAÇÃO'] == 'REALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-            ) / total_geral
+            tempo_medio = (tempo_cadastros + tempo_atualizacoes + tempo_distribuicoes) / total_geral
         else:
             tempo_medio = pd.Timedelta(0)  # Define como 0 se não houver dados
 
-        # Calcular tempo médio de cadastros, verificando se o total de cadastros é maior que zero
-        if total_finalizados > 0:
-            tempo_medio_cadastros = (
-                df_total[df_total['FINALIZAÇÃO'] == 'CADASTRADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-            ) / total_finalizados
-        else:
-            tempo_medio_cadastros = pd.Timedelta(0)
-
-        # Calcular tempo médio de atualizações, verificando se o total de atualizações é maior que zero
-        if total_atualizados > 0:
-            tempo_medio_autalizacoes = (
-                df_total[df_total['FINALIZAÇÃO'] == 'ATUALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-            ) / total_atualizados
-        else:
-            tempo_medio_autalizacoes = pd.Timedelta(0)
-
-        # Calcular tempo médio de distribuições, verificando se o total de distribuições é maior que zero
-        if total_distribuidos > 0:
-            tempo_medio_distribuicoes = (
-                df_total[df_total['FINALIZAÇÃO'] == 'REALIZADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-            ) / total_distribuidos
-        else:
-            tempo_medio_distribuicoes = pd.Timedelta(0)
-            
-        if total_auditado > 0:
-            tempo_medio_auditoria = (
-                df_total[df_total['FINALIZAÇÃO'] == 'AUDITADO']['TEMPO MÉDIO OPERACIONAL'].sum()
-            ) / total_auditado
-        else:
-            tempo_medio_auditoria = pd.Timedelta(0)
+        # Tempos médios por tipo de tarefa (0 quando não há tarefas do tipo)
+        tempo_medio_cadastros = tempo_cadastros / total_finalizados if total_finalizados > 0 else pd.Timedelta(0)
+        tempo_medio_autalizacoes = tempo_atualizacoes / total_atualizados if total_atualizados > 0 else pd.Timedelta(0)
+        tempo_medio_distribuicoes = tempo_distribuicoes / total_distribuidos if total_distribuidos > 0 else pd.Timedelta(0)
+        tempo_medio_auditoria = tempo_auditoria / total_auditado if total_auditado > 0 else pd.Timedelta(0)
             
         st.write(
             """
@@ -293,20 +317,20 @@ def dashboard():
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             with st.container(border=True):
-                st.metric("Total Geral", total_geral, delta=f"Tempo Médio - " + format_timedelta(tempo_medio), delta_color="off", help="Engloba todas as tarefas finalizadas e exibe o tempo médio geral.")
+                st.metric("Total Geral", total_geral, delta=f"Tempo Médio - " + formatar_min_s(tempo_medio), delta_color="off", help="Engloba todas as tarefas finalizadas e exibe o tempo médio geral.")
         with col2:
             with st.container(border=True):
-                st.metric("Total Cadastros", total_finalizados, delta=f"Tempo Médio - " + format_timedelta(tempo_medio_cadastros), delta_color="off", help="Tempo médio das tarefas cadastradas.")
+                st.metric("Total Cadastros", total_finalizados, delta=f"Tempo Médio - " + formatar_min_s(tempo_medio_cadastros), delta_color="off", help="Tempo médio das tarefas cadastradas.")
         with col3:
             with st.container(border=True):
-                st.metric("Total Atualizações", total_atualizados, delta=f"Tempo Médio - " + format_timedelta(tempo_medio_autalizacoes), delta_color="off", help="Tempo médio das tarefas atualizadas.")
+                st.metric("Total Atualizações", total_atualizados, delta=f"Tempo Médio - " + formatar_min_s(tempo_medio_autalizacoes), delta_color="off", help="Tempo médio das tarefas atualizadas.")
         with col4:
             with st.container(border=True):
-                st.metric("Total Auditoria", total_auditado, delta=f"Tempo Médio - " + format_timedelta(tempo_medio_auditoria), delta_color="off", help="Tempo médio das tarefas auditadas.")
+                st.metric("Total Auditoria", total_auditado, delta=f"Tempo Médio - " + formatar_min_s(tempo_medio_auditoria), delta_color="off", help="Tempo médio das tarefas auditadas.")
 
         # Expander com Total Geral --- Sendo a soma de todos os cadastros, reclassificados e andamentos
         with st.expander("Tempo Médio por Fila"):
-            df_tmo_por_carteira = calcular_tmo_por_carteira(df_total)
+            df_tmo_por_carteira = calcular_tmo_por_carteira(df_total, cubo_periodo)
             if isinstance(df_tmo_por_carteira, str):
                 st.write(df_tmo_por_carteira)  # Exibe mensagem de erro se as colunas não existirem
             else:
@@ -314,7 +338,7 @@ def dashboard():
         
         # Exibição na Dashboard
         with st.expander("Produção - Resumo por Grupo"):
-            df_producao_agrupada = calcular_producao_agrupada(df_total)
+            df_producao_agrupada = calcular_producao_agrupada(cubo_periodo)
             if isinstance(df_producao_agrupada, str):
                 st.write(df_producao_agrupada)
             else:
@@ -331,13 +355,13 @@ def dashboard():
                 st.dataframe(df_producao_email, use_container_width=True, hide_index=True)
 
         # Calculando e exibindo gráficos
-        df_produtividade = calcular_produtividade_diaria(df_total)
+        df_produtividade = calcular_produtividade_diaria(cubo_periodo)
         
-        df_produtividade_cadastro = calcular_produtividade_diaria_cadastro(df_total)
+        df_produtividade_cadastro = calcular_produtividade_diaria_cadastro(cubo_periodo)
         
-        df_tmo = calcular_tmo_por_dia(df_total)  # Certifique-se de que essa função retorne os dados necessários para o gráfico
+        df_tmo = calcular_tmo_por_dia(cubo_periodo)  # Certifique-se de que essa função retorne os dados necessários para o gráfico
         
-        df_tmo_cadastro = calcular_tmo_por_dia_cadastro(df_total)  # Certifique-se de que essa função retorne os dados necessários para o gráfico
+        df_tmo_cadastro = calcular_tmo_por_dia_cadastro(cubo_periodo)  # Certifique-se de que essa função retorne os dados necessários para o gráfico
         
         with st.expander("Desvios Auditoria"):
             st.subheader("Desvios Auditados")
@@ -384,7 +408,7 @@ def dashboard():
                             
         with st.expander("Tempo Médio Operacional por Mês"):
                 st.subheader("Tempo Médio Operacional por Mês")
-                exibir_tmo_por_mes(df_total)
+                exibir_tmo_por_mes(obter_rollup_mensal(usuario_logado, periodo=(data_inicial, data_final)))
                 # Exibir o DataFrame formatado na seção correspondente
                 
                 #Grafico de TMO por Analista
@@ -421,14 +445,25 @@ def dashboard():
                 
         with st.expander("Melhor Analista por Fila"):
             st.subheader("Melhor Analista por Fila (TMO e Quantidade)")
+            col_posicoes, col_volume = st.columns(2)
+            with col_posicoes:
+                posicoes_por_fila = st.number_input("Analistas por fila", min_value=1, max_value=10, value=POSICOES_POR_FILA)
+            with col_volume:
+                volume_minimo_fila = st.number_input(
+                    "Mínimo de tarefas na fila (TMO)", min_value=1, value=VOLUME_MINIMO_POR_FILA,
+                    help="Analistas com menos tarefas na fila não entram no ranking de TMO."
+                )
             col1, col2 = st.columns(2)
             with col1:
                 with st.container(border=True):
-                    exibir_melhor_analista_por_fila(df_total)
+                    exibir_melhor_analista_por_fila(cubo_periodo, n=posicoes_por_fila, volume_minimo=volume_minimo_fila)
             with col2:
                 with st.container(border=True):
-                    exibir_maior_quantidade_por_fila(df_total)
+                    exibir_maior_quantidade_por_fila(cubo_periodo, n=posicoes_por_fila)
         
+        # Agregado analista × fila × finalização do período, compartilhado pelas oito abas de ranking
+        base_ranking = base_rankings(cubo_periodo)
+
         tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["Ranking Geral", "Ranking Cadastro", "Ranking Atualizações","Ranking Pré-Cadastro", "Ranking Ofícios", "Ranking Demais Órgãos", "Ranking Auditoria", "Ranking Distribuição"])
         
         with tab1:
@@ -457,7 +492,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking = calcular_ranking(df_total, selected_users)
+                styled_df_ranking = calcular_ranking(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking, width=2000, hide_index=True)
@@ -497,7 +532,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_cadastro = calcular_ranking_cadastro_judicial(df_total, selected_users)
+                styled_df_ranking_cadastro = calcular_ranking_cadastro_judicial(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_cadastro, width=2000, hide_index=True)
@@ -537,7 +572,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_atualizado = calcular_ranking_atualizacao(df_total, selected_users)
+                styled_df_ranking_atualizado = calcular_ranking_atualizacao(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_atualizado, width=2000, hide_index=True)
@@ -577,7 +612,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_pre_cadastro = calcular_ranking_cadastro_pre(df_total, selected_users)
+                styled_df_ranking_pre_cadastro = calcular_ranking_cadastro_pre(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_pre_cadastro, width=2000, hide_index=True)
@@ -608,7 +643,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_cadastro_oficios = calcular_ranking_cadastro_oficios(df_total, selected_users)
+                styled_df_ranking_cadastro_oficios = calcular_ranking_cadastro_oficios(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_cadastro_oficios, width=2000, hide_index=True)
@@ -648,7 +683,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_cadastro_orgaos = calcular_ranking_cadastro_orgaos(df_total, selected_users)
+                styled_df_ranking_cadastro_orgaos = calcular_ranking_cadastro_orgaos(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_cadastro_orgaos, width=2000, hide_index=True)
@@ -688,7 +723,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_auditoria = calcular_ranking_auditoria(df_total, selected_users)
+                styled_df_ranking_auditoria = calcular_ranking_auditoria(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_auditoria, width=2000, hide_index=True)
@@ -728,7 +763,7 @@ def dashboard():
                 )
 
                 # Calcular o ranking
-                styled_df_ranking_distribuicao = calcular_ranking_distribuicao(df_total, selected_users)
+                styled_df_ranking_distribuicao = calcular_ranking_distribuicao(base_ranking, selected_users)
                 
                 # Exibir a tabela de ranking
                 st.dataframe(styled_df_ranking_distribuicao, width=2000, hide_index=True)
@@ -815,17 +850,18 @@ def dashboard():
 
         if not df_total.empty:
             with st.expander("Exportar Relatório de TMO em HTML"):
-                # 🔹 Seleção de períodos antes e depois da mudança
+                # 🔹 Seleção dos períodos para comparação (o primeiro é o "antes" da mudança)
                 st.subheader("Selecione os períodos para comparação")
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    data_inicio_antes = st.date_input("Data Inicial Antes", df_total['DATA DE CONCLUSÃO DA TAREFA'].min().date())
-                    data_fim_antes = st.date_input("Data Final Antes", df_total['DATA DE CONCLUSÃO DA TAREFA'].max().date())
+                quantidade_periodos = st.number_input("Quantidade de períodos", min_value=2, max_value=6, value=2, step=1)
+                data_minima_relatorio = df_total['DATA DE CONCLUSÃO DA TAREFA'].min().date()
+                data_maxima_relatorio = df_total['DATA DE CONCLUSÃO DA TAREFA'].max().date()
 
-                with col2:
-                    data_inicio_depois = st.date_input("Data Inicial Depois", df_total['DATA DE CONCLUSÃO DA TAREFA'].min().date())
-                    data_fim_depois = st.date_input("Data Final Depois", df_total['DATA DE CONCLUSÃO DA TAREFA'].max().date())
+                periodos_comparacao = []
+                for posicao, coluna in enumerate(st.columns(int(quantidade_periodos)), start=1):
+                    with coluna:
+                        inicio_periodo = st.date_input(f"Data Inicial Período {posicao}", data_minima_relatorio, key=f"inicio_periodo_{posicao}")
+                        fim_periodo = st.date_input(f"Data Final Período {posicao}", data_maxima_relatorio, key=f"fim_periodo_{posicao}")
+                    periodos_comparacao.append((inicio_periodo, fim_periodo))
 
                 # 🔹 Seleção de usuários
                 usuarios_disponiveis = df_total['USUÁRIO QUE CONCLUIU A TAREFA'].unique()
@@ -835,17 +871,19 @@ def dashboard():
                     default=usuarios_disponiveis
                 )
 
+                # 🔹 Tabela de comparação na tela, a partir do cubo do período
+                exibir_comparacao_periodos(cubo_periodo, periodos_comparacao, usuarios_selecionados)
+
                 # 🔹 Botão para baixar o HTML
                 if st.button("Gerar e Baixar Relatório HTML"):
-                    download_html(df_total, data_inicio_antes, data_fim_antes, data_inicio_depois, data_fim_depois, usuarios_selecionados)
+                    download_html(cubo_periodo, periodos_comparacao, usuarios_selecionados)
         
     elif opcao_selecionada == "Métricas Individuais":
         st.title("Métricas Individuais")
         
         # Filtro de data
         st.subheader("Filtro por Data")
-        min_date = df_total['DATA DE CONCLUSÃO DA TAREFA'].min().date() if not df_total.empty else datetime.today().date()
-        max_date = df_total['DATA DE CONCLUSÃO DA TAREFA'].max().date() if not df_total.empty else datetime.today().date()
+        min_date, max_date = limites_de_data(usuario_logado)
 
         col1, col2 = st.columns(2)
         with col1:
@@ -856,15 +894,22 @@ def dashboard():
         if data_inicial > data_final:
             st.error("A data inicial não pode ser posterior à data final!")
 
-        df_total = df_total[(df_total['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= data_inicial) & (df_total['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= data_final)]
+        df_total = load_data(usuario_logado, COLUNAS_METRICAS_INDIVIDUAIS, periodo=(data_inicial, data_final))
         analista_selecionado = st.selectbox('Selecione o analista', df_total['USUÁRIO QUE CONCLUIU A TAREFA'].unique())
-        df_analista = df_total[df_total['USUÁRIO QUE CONCLUIU A TAREFA'] == analista_selecionado].copy()
+
+        # Tarefas, cubo, métricas e ocioso do analista, montados no primeiro acesso e reaproveitados
+        visao_analista = obter_visao_analista(usuario_logado, analista_selecionado, COLUNAS_METRICAS_INDIVIDUAIS, (data_inicial, data_final))
+        df_analista = visao_analista['tarefas']
+        cubo_analista = visao_analista['cubo']
+        ocioso_analista = visao_analista['ocioso']
+        ocioso_periodo = visao_analista['ocioso_periodo']
 
         # Chama as funções de cálculo
-        tmo_equipe_cadastro = calcular_tmo_equipe_cadastro(df_total)
-        tmo_equipe_atualizacao = calcular_tmo_equipe_atualizado(df_total)
+        tmo_equipe = calcular_tmo_equipe(df_total)
+        tmo_equipe_cadastro = tmo_equipe.get('CADASTRADO', pd.NaT)
+        tmo_equipe_atualizacao = tmo_equipe.get('ATUALIZADO', pd.NaT)
         
-        total_finalizados_analista, total_atualizado_analista, tempo_medio_analista, tmo_cadastrado_analista, tmo_atualizado_analista, total_realizados_analista, media_cadastros_por_dia, dias_trabalhados = calcular_metrica_analista(df_analista)
+        total_finalizados_analista, total_atualizado_analista, tempo_medio_analista, tmo_cadastrado_analista, tmo_atualizado_analista, total_realizados_analista, media_cadastros_por_dia, dias_trabalhados = visao_analista['metricas']
 
         # Define valores padrão caso as variáveis retornem como None
         if total_finalizados_analista is None:
@@ -888,38 +933,38 @@ def dashboard():
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             with st.container(border=True):
-                st.metric("Total Geral", total_finalizados_analista+total_atualizado_analista+total_realizados_analista, f"Tempo Médio - {format_timedelta(tempo_medio_analista)}", delta_color="off")  
+                st.metric("Total Geral", total_finalizados_analista+total_atualizado_analista+total_realizados_analista, f"Tempo Médio - {formatar_min_s(tempo_medio_analista)}", delta_color="off")  
         with col2:
             with st.container(border=True):
-                st.metric("Total Cadastrados", total_finalizados_analista, f"Tempo Médio - {format_timedelta(tmo_cadastrado_analista)}",  delta_color="off")
+                st.metric("Total Cadastrados", total_finalizados_analista, f"Tempo Médio - {formatar_min_s(tmo_cadastrado_analista)}",  delta_color="off")
         with col3:
             with st.container(border=True):
-                st.metric("Total Atualizado", total_atualizado_analista, f"Tempo Médio - {format_timedelta(tmo_atualizado_analista)}",  delta_color="off")
+                st.metric("Total Atualizado", total_atualizado_analista, f"Tempo Médio - {formatar_min_s(tmo_atualizado_analista)}",  delta_color="off")
         with col4:
             with st.container(border=True):
                 st.metric("Média de Cadastros", media_cadastros_por_dia, f"Dias Trabalhados - {dias_trabalhados}",  delta_color="off")
         
         if tmo_cadastrado_analista is not None and tmo_equipe_cadastro is not None:
             if tmo_cadastrado_analista > tmo_equipe_cadastro:
-                st.toast(f"O TMO de Cadastro de {analista_selecionado} ({format_timedelta(tmo_cadastrado_analista)}) excede o tempo médio da equipe ({format_timedelta(tmo_equipe_cadastro)}).", icon=":material/warning:")
+                st.toast(f"O TMO de Cadastro de {analista_selecionado} ({formatar_min_s(tmo_cadastrado_analista)}) excede o tempo médio da equipe ({formatar_min_s(tmo_equipe_cadastro)}).", icon=":material/warning:")
             else:
                 pass
         
         if tmo_atualizado_analista is not None and tmo_equipe_cadastro is not None:
             if tmo_atualizado_analista > tmo_equipe_atualizacao:
-                st.toast(f"O TMO de Atualização de {analista_selecionado} ({format_timedelta(tmo_atualizado_analista)}) excede o tempo médio da equipe ({format_timedelta(tmo_equipe_atualizacao)}).", icon=":material/warning:")
+                st.toast(f"O TMO de Atualização de {analista_selecionado} ({formatar_min_s(tmo_atualizado_analista)}) excede o tempo médio da equipe ({formatar_min_s(tmo_equipe_atualizacao)}).", icon=":material/warning:")
             else:
                 pass     
 
-        melhor_dia_tmo, melhor_tmo = calcular_melhor_tmo_por_dia(df_analista)
-        melhor_dia_cadastro, quantidade_cadastro = calcular_melhor_dia_por_cadastro(df_analista)
+        melhor_dia_tmo, melhor_tmo = visao_analista['melhor_tmo_por_dia']
+        melhor_dia_cadastro, quantidade_cadastro = visao_analista['melhor_dia_cadastro']
     
         with st.expander("Melhor TMO e Quantidade de Cadastro"):
             col1, col2 = st.columns(2)
             with col1:
                 with st.container(border=True):
                     if melhor_dia_tmo and melhor_tmo:
-                        formatted_tmo = format_timedelta(melhor_tmo)
+                        formatted_tmo = formatar_min_s(melhor_tmo)
                         st.metric("Melhor TMO", formatted_tmo, f"Dia {melhor_dia_tmo.strftime('%d/%m/%Y')}")
                     else:
                         st.metric("Melhor TMO", "Sem dados")
@@ -929,34 +974,51 @@ def dashboard():
                             st.metric("Melhor Dia de Cadastros", quantidade_cadastro, f"Dia {melhor_dia_cadastro.strftime('%d/%m/%Y')}")
                     else:
                         st.metric("Melhor Dia de Cadastros", "Sem dados")
+
+            recorde = visao_analista['recordes']
+            col3, col4 = st.columns(2)
+            with col3:
+                with st.container(border=True):
+                    if recorde['SEQUENCIA_META'] > 0:
+                        st.metric(
+                            f"Maior Sequência na Meta ({META_DIARIA_PRODUCAO}/dia)", f"{recorde['SEQUENCIA_META']} dias",
+                            f"Até {recorde['FIM_SEQUENCIA_META'].strftime('%d/%m/%Y')}", delta_color="off"
+                        )
+                    else:
+                        st.metric(f"Maior Sequência na Meta ({META_DIARIA_PRODUCAO}/dia)", "Sem dados")
+            with col4:
+                with st.container(border=True):
+                    if pd.notna(recorde['MELHOR_MES']):
+                        st.metric("Melhor Mês", int(recorde['PRODUCAO_MELHOR_MES']), f"Mês {recorde['MELHOR_MES'].strftime('%m/%Y')}", delta_color="off")
+                    else:
+                        st.metric("Melhor Mês", "Sem dados")
             
         with st.expander("TMO por Fila - Cadastro e Atualização"):
-            calcular_e_exibir_tmo_cadastro_atualizacao_por_fila(df_analista, format_timedelta_hms, st)
+            calcular_e_exibir_tmo_cadastro_atualizacao_por_fila(df_analista, formatar_hms, st)
             
         with st.expander("Tempo Ocioso"):
                 st.subheader(f"Tempo Ocioso")
-                exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custom_colors, st)
-                df_tempo_ocioso = calcular_tempo_ocioso_por_analista(df_analista)
-                st.dataframe(df_tempo_ocioso, hide_index=True, use_container_width=True)
-                df_tempo_ocioso["Tempo Ocioso Formatado"] = pd.to_timedelta(df_tempo_ocioso["Tempo Ocioso Formatado"])
-                # total de segundos do timedelta
-                media_tempo_ocioso = df_tempo_ocioso["Tempo Ocioso Formatado"].mean()
-                total_segundos = int(media_tempo_ocioso.total_seconds())
-
-                # converte para horas, minutos e segundos
-                horas = total_segundos // 3600
-                minutos = (total_segundos % 3600) // 60
-                segundos = total_segundos % 60
-
-                # formata como 00:06:34
-                tempo_formatado = f"{horas:02}:{minutos:02}:{segundos:02}"
+                exibir_grafico_tempo_ocioso_por_dia(df_analista, analista_selecionado, custom_colors, st, df_ocioso=ocioso_periodo)
+                df_tempo_ocioso = ocioso_periodo
+                # Tempo ocioso diário em segundos, formatado como 00:06:34 só para exibição
+                segundos_ociosos = df_tempo_ocioso['Tempo Ocioso em Minutos'] * 60
+                st.dataframe(
+                    pd.DataFrame({
+                        'USUÁRIO QUE CONCLUIU A TAREFA': df_tempo_ocioso['USUÁRIO QUE CONCLUIU A TAREFA'],
+                        'Data': df_tempo_ocioso['Data'],
+                        'Tempo Ocioso': formatar_hms(segundos_ociosos)
+                    }),
+                    hide_index=True, use_container_width=True
+                )
 
                 with st.container(border=True):
-                    st.metric("Média de Tempo Ocioso", tempo_formatado)
+                    st.metric("Média de Tempo Ocioso", formatar_hms(segundos_ociosos.mean()))
                     
         with st.expander("Evolução TMO"):
             st.subheader(f"Tempo Médio Operacional Mensal")
-            exibir_grafico_tmo_analista_por_mes(df_analista, analista_selecionado)
+            rollup_mensal = obter_rollup_mensal(usuario_logado, periodo=(data_inicial, data_final))
+            rollup_analista = rollup_mensal[rollup_mensal['USUÁRIO QUE CONCLUIU A TAREFA'] == analista_selecionado]
+            exibir_grafico_tmo_analista_por_mes(rollup_analista, analista_selecionado)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -964,7 +1026,7 @@ def dashboard():
             with st.container(border=True):
                 st.subheader(f"Tempo Médio Operacional por Dia")
                 exibir_grafico_tmo_por_dia(
-                df_analista=df_analista,
+                df_analista=cubo_analista,
                 analista_selecionado=analista_selecionado,
                 calcular_tmo_por_dia=calcular_tmo_por_dia,
                 custom_colors=custom_colors,
@@ -997,8 +1059,8 @@ def dashboard():
                 st.subheader(f"Tarefas Cadastradas por TP CAUSA")
                 exibir_grafico_tp_causa(df_analista, analista_selecionado, custom_colors, st)
         
-        def exportar_ficha_html_analista(df, nome_analista, data_inicio, data_fim):
-            html = gerar_ficha_html_analista(df, nome_analista, data_inicio, data_fim)
+        def exportar_ficha_html_analista(df, nome_analista, data_inicio, data_fim, df_ocioso=None):
+            html = gerar_ficha_html_analista(df, nome_analista, data_inicio, data_fim, df_ocioso=df_ocioso)
             buffer = BytesIO()
             buffer.write(html.encode("utf-8"))
             buffer.seek(0)
@@ -1010,11 +1072,12 @@ def dashboard():
                 mime="text/html"
             )
         
-        exportar_ficha_html_analista(df_analista, analista_selecionado, min_date, max_date)
+        exportar_ficha_html_analista(df_analista, analista_selecionado, min_date, max_date, df_ocioso=ocioso_analista)
 
     elif opcao_selecionada == "Diário de Bordo":
         
         st.header("provisório")
+        df_total = load_data(usuario_logado, COLUNAS_DIARIO_DE_BORDO)
 
         def responder_dados(pergunta, df):
             pergunta = pergunta.lower()
@@ -1053,7 +1116,40 @@ def dashboard():
 
             resposta = responder_dados(pergunta_usuario, df_total)
             st.chat_message("assistant").write(resposta)
-            
+
+    elif opcao_selecionada == "Consulta SQL":
+
+        st.header("Consulta SQL")
+        st.caption(
+            "Consultas de leitura sobre a tabela `tarefas`, com todo o histórico carregado. "
+            "Além das colunas da planilha, `TMO_SEG` traz o TMO em segundos e `ANO_MES` o mês da conclusão."
+        )
+
+        with st.expander("Colunas disponíveis"):
+            try:
+                st.dataframe(descrever_tarefas(usuario_logado), hide_index=True, use_container_width=True)
+            except ErroConsulta as erro:
+                st.info(str(erro))
+
+        exemplo = st.selectbox("Exemplo", list(CONSULTAS_EXEMPLO))
+        sql = st.text_area("Consulta", value=CONSULTAS_EXEMPLO[exemplo], height=180)
+
+        if st.button("Executar"):
+            try:
+                resultado, truncado = executar_consulta(usuario_logado, sql)
+            except ErroConsulta as erro:
+                st.error(str(erro))
+            else:
+                if truncado:
+                    st.warning(f"Mostrando as primeiras {len(resultado)} linhas do resultado.")
+                st.dataframe(resultado, hide_index=True, use_container_width=True)
+                st.download_button(
+                    label="Baixar resultado (CSV)",
+                    data=resultado.to_csv(index=False, sep=';').encode('utf-8-sig'),
+                    file_name="consulta.csv",
+                    mime="text/csv"
+                )
+
     if st.sidebar.button("Logout", icon=":material/logout:"):
         st.session_state.logado = False
         st.session_state.usuario_logado = None
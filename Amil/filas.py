@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Taxonomia das filas: cada FILA pertence a um grupo de produção, pode ser de distribuição ou de
+# auditoria e cai em um dos rankings de cadastro. É a única fonte dessas listas no projeto.
+GRUPOS_FILA = {
+    'CAPTURA ANTECIPADA': [' CADASTRO ROBÔ', 'INCIDENTE PROCESSUAL', 'CADASTRO ANS'],
+    'SHAREPOINT': ['CADASTRO SHAREPOINT', 'ATUALIZAÇÃO - SHAREPOINT'],
+    'CITAÇÃO ELETRÔNICA': ['CADASTRO CITAÇÃO ELETRÔNICA', 'ATUALIZAÇÃO CITAÇÃO ELETRÔNICA'],
+    'E-MAIL': ['CADASTRO E-MAIL', 'OFICIOS E-MAIL', 'CADASTRO DE ÓRGÃOS E OFÍCIOS'],
+    'PRE CADASTRO E DIJUR': ['PRE CADASTRO E DIJUR']
+}
+GRUPO_PADRAO = 'OUTROS'
+
+FILAS_DISTRIBUICAO = [
+    'DISTRIBUIÇÃO - AMIL + JV',
+    'DISTRIBUIÇÃO - JV CÍVEL',
+    'DISTRIBUIÇÃO - PRÉ CADASTRO',
+    'DISTRIBUIÇÃO - PRÉ CADASTRO - JV',
+    'DISTRIBUICAO'
+]
+FILAS_AUDITORIA = ['AUDITORIA - CADASTRO']
+
+# Ranking de cadastro de cada fila; as que não aparecem aqui entram no ranking de cadastro judicial
+# e as marcadas com None não entram em nenhum ranking de cadastro
+RANKING_CADASTRO_FILA = {
+    'PRE CADASTRO E DIJUR': 'cadastro_pre',
+    'PRE CADASTRO E DIJUR - JV': 'cadastro_pre',
+    'OFICIOS': 'cadastro_oficios',
+    'CADASTRO DE ÓRGÃOS E OFÍCIOS': 'cadastro_orgaos',
+    'CADASTRO ANS (AUTO DE INFRAÇÃO)': None,
+}
+RANKING_CADASTRO_PADRAO = 'cadastro_judicial'
+
+COLUNAS_TAXONOMIA = ['GRUPO', 'DISTRIBUICAO', 'AUDITORIA', 'RANKING_CADASTRO']
+
+
+def _classificar(fila):
+    grupo = next((nome for nome, filas in GRUPOS_FILA.items() if fila in filas), GRUPO_PADRAO)
+    return (
+        grupo,
+        fila in FILAS_DISTRIBUICAO,
+        fila in FILAS_AUDITORIA,
+        RANKING_CADASTRO_FILA.get(fila, RANKING_CADASTRO_PADRAO),
+    )
+
+
+def taxonomia_filas(filas):
+    """
+    Tabela FILA -> GRUPO, DISTRIBUICAO, AUDITORIA e RANKING_CADASTRO para as filas informadas.
+    Filas desconhecidas (e a fila nula) ficam no grupo OUTROS, fora de distribuição/auditoria
+    e no ranking de cadastro judicial.
+    """
+    filas = list(filas)
+    return pd.DataFrame([_classificar(fila) for fila in filas], index=pd.Index(filas, name='FILA'), columns=COLUNAS_TAXONOMIA)
+
+
+def atributo_fila(fila, atributo):
+    """
+    Valor de uma coluna da taxonomia para cada linha de `fila`. A classificação é feita uma vez
+    por categoria e as linhas só indexam a tabela pelos códigos da categórica.
+    """
+    if not isinstance(fila.dtype, pd.CategoricalDtype):
+        fila = fila.astype('category')
+    tabela = taxonomia_filas(fila.cat.categories)[atributo].to_numpy(dtype=object)
+
+    # O código -1 (fila nula) cai na última posição, que recebe a classificação padrão
+    tabela = np.append(tabela, _classificar(None)[COLUNAS_TAXONOMIA.index(atributo)])
+    valores = tabela[fila.cat.codes.to_numpy()]
+    if atributo in ('DISTRIBUICAO', 'AUDITORIA'):
+        return valores.astype(bool)
+    return valores
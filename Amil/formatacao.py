@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# Formatação de durações para exibição. Cada função recebe uma coluna (Series, Index, array ou
+# lista) de Timedelta ou de segundos, ou um valor isolado, e devolve os textos:
+#   - Series com o mesmo índice quando recebe uma Series
+#   - array de objetos para as demais coleções
+#   - str para um valor isolado
+# As contas são feitas em segundos inteiros (truncados, como int(td.total_seconds())) sobre
+# arrays int64; só os valores distintos de horas/minutos passam pela formatação de texto.
+
+_DOIS_DIGITOS = np.array([f'{valor:02d}' for valor in range(60)], dtype=object)
+# Os segundos arredondados de formatar_minutos podem chegar a 60
+_UM_DIGITO = np.array([str(valor) for valor in range(61)], dtype=object)
+
+
+def _escalar(valores):
+    return np.ndim(valores) == 0
+
+
+def _segundos(valores):
+    """Segundos inteiros (truncados em direção a zero) e máscara de nulos da coluna."""
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    if pd.api.types.is_timedelta64_dtype(serie.dtype):
+        nulos = serie.isna().to_numpy()
+        ns = np.where(nulos, 0, serie.astype('timedelta64[ns]').to_numpy().view('i8'))
+        return np.sign(ns) * (np.abs(ns) // 10**9), nulos
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        numeros = serie.to_numpy(dtype='float64', na_value=np.nan)
+        nulos = np.isnan(numeros)
+        # Arredonda ao microssegundo antes de truncar, para que segundos vindos de contas em
+        # ponto flutuante (minutos * 60 = 599.9999999) não percam um segundo
+        return np.trunc(np.round(np.where(nulos, 0, numeros), 6)).astype('int64'), nulos
+    return _segundos(pd.to_timedelta(serie, errors='coerce'))
+
+
+def _textos(inteiros, formato):
+    """Formata cada valor distinto uma única vez e espalha o texto pelas posições."""
+    distintos, posicoes = np.unique(inteiros, return_inverse=True)
+    tabela = np.array([format(int(valor), formato) for valor in distintos], dtype=object)
+    return tabela[posicoes.reshape(-1)]
+
+
+def _resultado(valores, textos, nulos, nulo):
+    textos[nulos] = nulo
+    if isinstance(valores, pd.Series):
+        return pd.Series(textos, index=valores.index, name=valores.name, dtype=object)
+    return textos
+
+
+def formatar_hms(valores, nulo='00:00:00'):
+    """Durações como 'HH:MM:SS' (horas com pelo menos dois dígitos); nulos viram `nulo`."""
+    if _escalar(valores):
+        return nulo if pd.isna(valores) else formatar_hms([valores])[0]
+    segundos, nulos = _segundos(valores)
+    horas, resto = np.divmod(segundos, 3600)
+    minutos, segundos = np.divmod(resto, 60)
+    textos = _textos(horas, '02d') + ':' + _DOIS_DIGITOS[minutos] + ':' + _DOIS_DIGITOS[segundos]
+    return _resultado(valores, textos, nulos, nulo)
+
+
+def formatar_min_s(valores, nulo='0 min'):
+    """Durações como 'X min Ys'; nulos viram `nulo`."""
+    if _escalar(valores):
+        return nulo if pd.isna(valores) else formatar_min_s([valores])[0]
+    segundos, nulos = _segundos(valores)
+    minutos, segundos = np.divmod(segundos, 60)
+    textos = _textos(minutos, 'd') + ' min ' + _UM_DIGITO[segundos] + 's'
+    return _resultado(valores, textos, nulos, nulo)
+
+
+def formatar_m_ss(valores, nulo='0:00'):
+    """Durações como 'M:SS', com os minutos sem limite; nulos viram `nulo`."""
+    if _escalar(valores):
+        return nulo if pd.isna(valores) else formatar_m_ss([valores])[0]
+    segundos, nulos = _segundos(valores)
+    minutos, segundos = np.divmod(segundos, 60)
+    textos = _textos(minutos, 'd') + ':' + _DOIS_DIGITOS[segundos]
+    return _resultado(valores, textos, nulos, nulo)
+
+
+def formatar_minutos(minutos, nulo='0 min 0s'):
+    """
+    Minutos (float) como 'Xh Ym Zs' a partir de 60 minutos e 'X min Ys' abaixo disso,
+    com os segundos arredondados.
+    """
+    if _escalar(minutos):
+        return nulo if pd.isna(minutos) else formatar_minutos([minutos])[0]
+    valores = pd.Series(minutos).to_numpy(dtype='float64', na_value=np.nan)
+    nulos = np.isnan(valores)
+    valores = np.where(nulos, 0.0, valores)
+
+    textos = np.empty(len(valores), dtype=object)
+    acima = valores >= 60
+
+    longos = valores[acima]
+    horas = np.floor_divide(longos, 60).astype('int64')
+    minutos_resto = np.trunc(np.mod(longos, 60)).astype('int64')
+    segundos = np.round((longos - horas * 60 - minutos_resto) * 60).astype('int64')
+    textos[acima] = _textos(horas, 'd') + 'h ' + _UM_DIGITO[minutos_resto] + 'm ' + _UM_DIGITO[segundos] + 's'
+
+    curtos = valores[~acima]
+    minutos_inteiros = np.trunc(curtos).astype('int64')
+    segundos = np.round((curtos - minutos_inteiros) * 60).astype('int64')
+    textos[~acima] = _textos(minutos_inteiros, 'd') + ' min ' + _textos(segundos, 'd') + 's'
+    return _resultado(minutos, textos, nulos, nulo)
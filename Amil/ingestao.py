@@ -0,0 +1,257 @@
+from io import BytesIO
+from datetime import date
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # leitor rápido opcional; sem ele a leitura usa o openpyxl em modo read-only
+    CalamineWorkbook = None
+
+# Regras de padronização do TMO aplicadas na entrada dos dados
+TMO_MINIMO_CADASTRO = pd.Timedelta(minutes=19)   # abaixo disso o cadastro vira 20 min
+TMO_AJUSTE_CADASTRO = pd.Timedelta(minutes=20)
+TMO_MINIMO_ATUALIZACAO = pd.Timedelta(minutes=3)
+TMO_MAXIMO_ATUALIZACAO = pd.Timedelta(minutes=15)
+TMO_MAXIMO_GERAL = pd.Timedelta(hours=2)
+
+# Formato das datas nas exportações do sistema
+FORMATO_DATA = '%d/%m/%Y %H:%M:%S'
+COLUNAS_DATA = ['DATA DE CONCLUSÃO DA TAREFA', 'DATA DE INÍCIO DA TAREFA']
+COLUNA_TMO = 'TEMPO MÉDIO OPERACIONAL'
+
+# Colunas de baixa cardinalidade mantidas como categóricas em memória (códigos inteiros)
+COLUNAS_CATEGORICAS = ['FILA', 'FINALIZAÇÃO', 'SITUAÇÃO DA TAREFA', 'USUÁRIO QUE CONCLUIU A TAREFA']
+
+# Chaves inteiras derivadas: dia de conclusão (dias desde 1970-01-01) e TMO em segundos
+COLUNA_DIA = 'DIA'
+COLUNA_TMO_SEG = 'TMO_SEG'
+EPOCA = pd.Timestamp('1970-01-01')
+
+# Linhas por bloco na leitura em streaming das planilhas
+TAMANHO_BLOCO_PLANILHA = 50_000
+
+
+def _para_datetime(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    datas = pd.to_datetime(serie, format=FORMATO_DATA, errors='coerce')
+
+    # Valores fora do formato padrão (ex.: datas vindas como texto ISO) ganham uma segunda tentativa
+    falhas = datas.isna() & serie.notna()
+    if falhas.any():
+        datas[falhas] = pd.to_datetime(serie[falhas].astype(str), format='mixed', dayfirst=True, errors='coerce')
+    return datas
+
+
+def _para_timedelta(serie):
+    if pd.api.types.is_timedelta64_dtype(serie):
+        return serie
+    # Durações podem vir como texto 'HH:MM:SS' ou como datetime.time do Excel
+    return pd.to_timedelta(serie.astype(str), errors='coerce')
+
+
+def tipar_colunas(df):
+    """
+    Converte as colunas de data para datetime64 e o TMO para timedelta64.
+    É o único ponto de conversão de tipos: os dados são gravados já tipados e
+    colunas que já têm o tipo certo não são reprocessadas.
+    """
+    conversoes = {}
+    for coluna in COLUNAS_DATA:
+        if coluna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            conversoes[coluna] = _para_datetime(df[coluna])
+    if COLUNA_TMO in df.columns and not pd.api.types.is_timedelta64_dtype(df[COLUNA_TMO]):
+        conversoes[COLUNA_TMO] = _para_timedelta(df[COLUNA_TMO])
+
+    if not conversoes:
+        return df
+    return df.assign(**conversoes)
+
+
+def data_para_dia(data):
+    """Converte uma data (date, datetime ou Timestamp) na chave inteira de dia."""
+    return (pd.Timestamp(data).normalize() - EPOCA).days
+
+
+def dia_para_data(dias):
+    """Converte chaves inteiras de dia de volta para datas (datetime64, à meia-noite)."""
+    return EPOCA + pd.to_timedelta(dias, unit='D')
+
+
+def ordem_por_conclusao(df):
+    """
+    Permutação (estável) que ordena as linhas pelo instante de conclusão. Datas nulas (NaT,
+    o menor int64) ficam no início, então os instantes em int64 ficam em ordem crescente.
+    """
+    if 'DATA DE CONCLUSÃO DA TAREFA' not in df.columns:
+        return np.arange(len(df))
+    instantes = df['DATA DE CONCLUSÃO DA TAREFA'].to_numpy(dtype='datetime64[ns]').view('i8')
+    return np.argsort(instantes, kind='stable')
+
+
+def posicoes_periodo(serie, data_inicial, data_final):
+    """
+    Posições das linhas de `serie` entre `data_inicial` e `data_final` (datas, inclusivas), o
+    mesmo que comparar `.dt.date` com as duas datas, sem criar objetos date.
+
+    `serie` pode ser um datetime64 ou uma chave inteira de dia sem nulos (como a DIA da tabela
+    de ocioso). Se ela estiver em ordem crescente (o load_data entrega as tarefas ordenadas
+    pela conclusão), o período é localizado por busca binária e o resultado é um `slice`, que
+    recorta sem cópia; senão é uma máscara booleana de uma comparação de inteiros.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        valores = serie.to_numpy(dtype='datetime64[ns]').view('i8')
+        inicio = pd.Timestamp(data_inicial).normalize().value
+        fim = (pd.Timestamp(data_final).normalize() + pd.Timedelta(days=1)).value
+    else:
+        valores = serie.to_numpy()
+        inicio, fim = data_para_dia(data_inicial), data_para_dia(data_final) + 1
+
+    if len(valores) < 2 or (valores[1:] >= valores[:-1]).all():
+        primeira, ultima = np.searchsorted(valores, [inicio, fim], side='left')
+        return slice(int(primeira), int(ultima))
+    return (valores >= inicio) & (valores < fim)
+
+
+def recortar_periodo(df, data_inicial, data_final, coluna='DATA DE CONCLUSÃO DA TAREFA'):
+    """Linhas de `df` com `coluna` no período (ver posicoes_periodo); uma fatia sem cópia se `coluna` estiver ordenada."""
+    return df.iloc[posicoes_periodo(df[coluna], data_inicial, data_final)]
+
+
+def compactar_colunas(df):
+    """
+    Deixa o DataFrame tipado na representação compacta usada em memória:
+        - FILA, FINALIZAÇÃO, SITUAÇÃO DA TAREFA e USUÁRIO como categóricas
+        - DIA: int32 com o dia de conclusão, em vez de objetos date
+        - TMO_SEG: int32 com o TMO em segundos
+
+    As chaves inteiras são anuláveis (Int32) porque datas e TMOs inválidos viram nulos na tipagem.
+    """
+    conversoes = {
+        coluna: df[coluna].astype('category')
+        for coluna in COLUNAS_CATEGORICAS
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype)
+    }
+
+    if 'DATA DE CONCLUSÃO DA TAREFA' in df.columns:
+        conclusao = df['DATA DE CONCLUSÃO DA TAREFA']
+        conversoes[COLUNA_DIA] = (conclusao.dt.floor('D') - EPOCA).dt.days.astype('Int32')
+    if COLUNA_TMO in df.columns:
+        conversoes[COLUNA_TMO_SEG] = (df[COLUNA_TMO].dt.total_seconds()).round().astype('Int32')
+
+    if not conversoes:
+        return df
+    return df.assign(**conversoes)
+
+
+def normalizar_tmo(df):
+    """
+    Aplica as regras de TMO (CADASTRADO, ATUALIZADO e teto de 2h) com máscaras booleanas,
+    em uma única passada sobre as colunas.
+
+    Retorna:
+        - df com 'TEMPO MÉDIO OPERACIONAL' ajustado
+        - DataFrame de ajustes com ['NÚMERO DO PROTOCOLO', 'FINALIZAÇÃO', 'TMO ORIGINAL', 'TMO AJUSTADO'],
+          indexado pelos rótulos das linhas ajustadas de df
+    """
+    tmo = _para_timedelta(df['TEMPO MÉDIO OPERACIONAL'])
+    finalizacao = df['FINALIZAÇÃO']
+
+    cadastrado = finalizacao == 'CADASTRADO'
+    atualizado = finalizacao == 'ATUALIZADO'
+
+    # As comparações com NaT resultam em False, então valores nulos nunca são ajustados
+    novo_tmo = tmo.mask(cadastrado & (tmo < TMO_MINIMO_CADASTRO), TMO_AJUSTE_CADASTRO)
+    novo_tmo = novo_tmo.mask(atualizado & (tmo < TMO_MINIMO_ATUALIZACAO), TMO_MINIMO_ATUALIZACAO)
+    novo_tmo = novo_tmo.mask(atualizado & (tmo > TMO_MAXIMO_ATUALIZACAO), TMO_MAXIMO_ATUALIZACAO)
+    novo_tmo = novo_tmo.mask(tmo > TMO_MAXIMO_GERAL, TMO_MAXIMO_GERAL)
+
+    ajustado = tmo.notna() & (novo_tmo != tmo)
+
+    if 'NÚMERO DO PROTOCOLO' in df.columns:
+        protocolos = df.loc[ajustado, 'NÚMERO DO PROTOCOLO']
+    else:
+        protocolos = 'N/A'
+
+    df_ajustes = pd.DataFrame({
+        'NÚMERO DO PROTOCOLO': protocolos,
+        'FINALIZAÇÃO': finalizacao[ajustado],
+        'TMO ORIGINAL': tmo[ajustado],
+        'TMO AJUSTADO': novo_tmo[ajustado]
+    })
+
+    df = df.copy()
+    df['TEMPO MÉDIO OPERACIONAL'] = novo_tmo
+    return df, df_ajustes
+
+
+def _linhas_calamine(conteudo):
+    planilha = CalamineWorkbook.from_filelike(BytesIO(conteudo)).get_sheet_by_index(0)
+    return planilha.height, planilha.iter_rows()
+
+
+def _linhas_openpyxl(conteudo):
+    from openpyxl import load_workbook
+
+    planilha = load_workbook(BytesIO(conteudo), read_only=True, data_only=True).worksheets[0]
+    return planilha.max_row, planilha.iter_rows(values_only=True)
+
+
+def _montar_bloco(linhas, cabecalho):
+    # Mesmo parser de texto usado pelo pd.read_excel: células vazias viram nulas e
+    # colunas numéricas escritas como texto são convertidas
+    bloco = TextParser([cabecalho] + linhas, header=0).read().infer_objects()
+
+    # Como no pd.read_excel, números inteiros lidos como float (ex.: protocolos) voltam a ser inteiros
+    for coluna in bloco.columns[bloco.dtypes == 'float64']:
+        valores = bloco[coluna]
+        if valores.notna().all() and (valores % 1 == 0).all():
+            bloco[coluna] = valores.astype('int64')
+
+    # O calamine entrega datas à meia-noite como `date`, o que impede a inferência de datetime
+    for coluna in bloco.columns[bloco.dtypes == 'object']:
+        valores = bloco[coluna].dropna()
+        if not valores.empty and isinstance(valores.iloc[0], date) and valores.map(lambda v: isinstance(v, date)).all():
+            bloco[coluna] = pd.to_datetime(bloco[coluna])
+    return bloco
+
+
+def ler_planilha_em_blocos(conteudo, tamanho_bloco=TAMANHO_BLOCO_PLANILHA):
+    """
+    Lê a primeira aba de um .xlsx linha a linha e entrega DataFrames de até
+    `tamanho_bloco` linhas, sem montar a planilha inteira em memória.
+
+    Usa o python-calamine quando instalado e o openpyxl em modo read-only caso contrário.
+
+    Gera tuplas (bloco, linhas_lidas, total_linhas); total_linhas é uma estimativa
+    vinda das dimensões da planilha e pode ser None.
+    """
+    if CalamineWorkbook is not None:
+        total, linhas = _linhas_calamine(conteudo)
+    else:
+        total, linhas = _linhas_openpyxl(conteudo)
+
+    linhas = iter(linhas)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    cabecalho = [str(c).strip() if c not in (None, '') else f'Unnamed: {i}' for i, c in enumerate(cabecalho)]
+    total = total - 1 if total else None
+
+    lidas = 0
+    buffer = []
+    for linha in linhas:
+        # Linhas totalmente vazias no fim da planilha são comuns nas exportações
+        if all(valor is None or valor == '' for valor in linha):
+            continue
+        buffer.append(list(linha))
+        if len(buffer) == tamanho_bloco:
+            lidas += len(buffer)
+            yield _montar_bloco(buffer, cabecalho), lidas, total
+            buffer = []
+
+    if buffer:
+        lidas += len(buffer)
+        yield _montar_bloco(buffer, cabecalho), lidas, total
@@ -0,0 +1,208 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .armazenamento import diretorio_dataset, intervalo_datas, ler_manifesto, ler_particoes
+from .ingestao import COLUNA_DIA, EPOCA, dia_para_data, tipar_colunas
+
+# Tempo ocioso: intervalo entre o fim de um bloco de trabalho do analista e o início do bloco
+# seguinte. Tarefas que se sobrepõem formam um único bloco, e intervalos acima de 1h (almoço,
+# fim de expediente) não contam como ocioso.
+LIMITE_OCIOSO = pd.Timedelta(hours=1)
+COLUNA_OCIOSO = 'Tempo Ocioso em Minutos'
+COLUNAS_OCIOSO = ['USUÁRIO QUE CONCLUIU A TAREFA', 'DATA DE INÍCIO DA TAREFA', 'DATA DE CONCLUSÃO DA TAREFA']
+
+NS_POR_DIA = 86_400 * 10**9
+NS_POR_MINUTO = 60 * 10**9
+
+# Tabela derivada gravada junto do dataset: ocioso por (analista, dia), com a versão do
+# manifesto que ela reflete nos metadados do parquet
+ARQUIVO_OCIOSO = 'ocioso_por_dia.parquet'
+COLUNAS_TABELA_OCIOSO = ['USUÁRIO QUE CONCLUIU A TAREFA', COLUNA_DIA, COLUNA_OCIOSO]
+
+
+def _instantes(serie):
+    """Instantes em int64 (ns) e máscara dos preenchidos."""
+    valores = serie.to_numpy(dtype='datetime64[ns]').view('i8')
+    return valores, serie.notna().to_numpy()
+
+
+def ocioso_por_dia(df):
+    """
+    Tempo ocioso, em minutos, por (analista, dia de conclusão).
+
+    As tarefas de cada analista são ordenadas pelo início e fundidas em blocos enquanto se
+    sobrepõem (o fim do bloco é o maior fim visto até ali). O intervalo até o início do bloco
+    seguinte conta como ocioso quando está entre 0 e 1h e vai para o dia em que o bloco terminou.
+    Todo dia com tarefa concluída aparece no resultado, com 0 quando não houve ocioso.
+
+    Retorna um DataFrame com 'USUÁRIO QUE CONCLUIU A TAREFA', 'DIA', 'Data' e COLUNA_OCIOSO.
+    """
+    usuario = df['USUÁRIO QUE CONCLUIU A TAREFA']
+    if not isinstance(usuario.dtype, pd.CategoricalDtype):
+        usuario = usuario.astype('category')
+    codigos = usuario.cat.codes.to_numpy()
+    inicio, com_inicio = _instantes(df['DATA DE INÍCIO DA TAREFA'])
+    fim, com_fim = _instantes(df['DATA DE CONCLUSÃO DA TAREFA'])
+
+    validas = com_inicio & com_fim & (codigos >= 0)
+    codigos, inicio, fim = codigos[validas].astype('int64'), inicio[validas], fim[validas]
+    if len(codigos) == 0:
+        return pd.DataFrame({
+            'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([], categories=usuario.cat.categories),
+            COLUNA_DIA: np.array([], dtype='int32'),
+            'Data': np.array([], dtype=object),
+            COLUNA_OCIOSO: np.array([], dtype='float64'),
+        })
+
+    ordem = np.lexsort((inicio, codigos))
+    codigos, inicio, fim = codigos[ordem], inicio[ordem], fim[ordem]
+
+    # Fim do bloco corrente: máximo acumulado dos fins dentro de cada analista
+    fim_bloco = pd.Series(fim).groupby(codigos, sort=False).cummax().to_numpy()
+
+    # Intervalo entre o fim do bloco e o início da próxima tarefa do mesmo analista; sobreposições
+    # (intervalo <= 0) continuam o bloco e intervalos acima do limite são descartados
+    intervalo = inicio[1:] - fim_bloco[:-1]
+    conta = (codigos[1:] == codigos[:-1]) & (intervalo > 0) & (intervalo <= LIMITE_OCIOSO.value)
+
+    # Uma célula por (analista, dia de conclusão), em chaves inteiras analista * dias + dia
+    dia = fim // NS_POR_DIA
+    primeiro_dia = dia.min()
+    dias = dia.max() - primeiro_dia + 1
+    chaves = codigos * dias + (dia - primeiro_dia)
+    celulas = np.unique(chaves)
+
+    # O fim do bloco é sempre o fim de alguma tarefa do analista, então sua célula existe
+    chave_bloco = (codigos[:-1] * dias + (fim_bloco[:-1] // NS_POR_DIA - primeiro_dia))[conta]
+    soma_ns = np.bincount(
+        np.searchsorted(celulas, chave_bloco), weights=intervalo[conta].astype('float64'), minlength=len(celulas)
+    )
+
+    dia_celula = (celulas % dias + primeiro_dia).astype('int32')
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical.from_codes(celulas // dias, categories=usuario.cat.categories),
+        COLUNA_DIA: dia_celula,
+        'Data': dia_para_data(dia_celula).date,
+        COLUNA_OCIOSO: soma_ns / NS_POR_MINUTO,
+    })
+
+
+# Tabela materializada: o save_data recalcula só os dias tocados por cada upload e as telas
+# leem a tabela pronta em vez de refazer o cálculo sobre todo o histórico.
+
+def _caminho_tabela(usuario):
+    return os.path.join(diretorio_dataset(usuario), ARQUIVO_OCIOSO)
+
+
+def _ler_tabela(usuario):
+    """Tabela gravada e a versão do dataset que ela reflete, ou (None, None) se não existir."""
+    caminho = _caminho_tabela(usuario)
+    if not os.path.exists(caminho):
+        return None, None
+    tabela = pq.read_table(caminho)
+    versao = int((tabela.schema.metadata or {}).get(b'versao', b'-1'))
+    return tabela.to_pandas(), versao
+
+
+def _gravar_tabela(usuario, tabela, versao):
+    tabela = tabela[COLUNAS_TABELA_OCIOSO].astype({'USUÁRIO QUE CONCLUIU A TAREFA': str, COLUNA_DIA: 'int32'})
+    tabela = pa.Table.from_pandas(tabela.reset_index(drop=True), preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b'versao': str(versao).encode()})
+    caminho = _caminho_tabela(usuario)
+    temporario = f'{caminho}.tmp'
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, caminho)
+
+
+def _tarefas(usuario, manifesto, periodo=None):
+    tarefas = ler_particoes(usuario, colunas=COLUNAS_OCIOSO, manifesto=manifesto, periodo=periodo)
+    if tarefas is None or not set(COLUNAS_OCIOSO).issubset(tarefas.columns):
+        return None
+    return tipar_colunas(tarefas)
+
+
+def reconstruir_ocioso(usuario, manifesto=None):
+    """Recalcula a tabela de ocioso sobre todo o histórico e a grava com a versão do manifesto."""
+    manifesto = manifesto if manifesto is not None else ler_manifesto(usuario)
+    tarefas = _tarefas(usuario, manifesto)
+    if tarefas is None:
+        return ocioso_por_dia(pd.DataFrame(columns=COLUNAS_OCIOSO))[COLUNAS_TABELA_OCIOSO]
+    tabela = ocioso_por_dia(tarefas)[COLUNAS_TABELA_OCIOSO]
+    _gravar_tabela(usuario, tabela, manifesto['versao'])
+    return tabela
+
+
+def _faixas_tocadas(df_novas):
+    """
+    Dias de cada analista cujo ocioso pode mudar com as tarefas novas: do dia anterior ao
+    primeiro início (o bloco que antecede a tarefa pode ter terminado na véspera) até o
+    último dia de conclusão. Retorna um DataFrame indexado pelo analista com 'inicial' e 'final'.
+    """
+    validas = df_novas[COLUNAS_OCIOSO].notna().all(axis=1)
+    df_novas = df_novas[validas]
+    inicio = (df_novas['DATA DE INÍCIO DA TAREFA'].dt.floor('D') - EPOCA).dt.days.to_numpy()
+    fim = (df_novas['DATA DE CONCLUSÃO DA TAREFA'].dt.floor('D') - EPOCA).dt.days.to_numpy()
+    dias = pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': df_novas['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str).to_numpy(),
+        'inicial': np.minimum(inicio, fim) - 1,
+        'final': np.maximum(inicio, fim),
+    })
+    return dias.groupby('USUÁRIO QUE CONCLUIU A TAREFA').agg(inicial=('inicial', 'min'), final=('final', 'max'))
+
+
+def _dentro_das_faixas(tabela, faixas):
+    usuario = tabela['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str)
+    inicial = usuario.map(faixas['inicial'])
+    final = usuario.map(faixas['final'])
+    return (tabela[COLUNA_DIA] >= inicial) & (tabela[COLUNA_DIA] <= final)
+
+
+def atualizar_ocioso(usuario, df_novas):
+    """
+    Atualiza a tabela de ocioso depois que `df_novas` (as linhas gravadas por anexar_particoes)
+    entrou no dataset. Só os dias tocados dos analistas do upload são recalculados, a partir das
+    tarefas desses analistas concluídas desde o primeiro dia tocado; o resto da tabela é mantido.
+    Se a tabela não existir ou não estiver na versão anterior do dataset, é reconstruída.
+    """
+    manifesto = ler_manifesto(usuario)
+    tabela, versao = _ler_tabela(usuario)
+    if tabela is None or versao != manifesto['versao'] - 1:
+        reconstruir_ocioso(usuario, manifesto)
+        return
+
+    faixas = _faixas_tocadas(df_novas)
+    if not faixas.empty:
+        # Tarefas concluídas antes do primeiro dia tocado não definem o fim de nenhum bloco
+        # que termina nele ou depois, então basta ler a partir desse dia
+        limites = intervalo_datas(usuario, manifesto)
+        primeiro_dia = dia_para_data(int(faixas['inicial'].min()))
+        tarefas = _tarefas(usuario, manifesto, periodo=(primeiro_dia, limites[1])) if limites is not None else None
+        if tarefas is not None:
+            tarefas = tarefas[tarefas['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str).isin(faixas.index)]
+            recalculado = ocioso_por_dia(tarefas)[COLUNAS_TABELA_OCIOSO]
+            tabela = pd.concat([
+                tabela[~_dentro_das_faixas(tabela, faixas)],
+                recalculado[_dentro_das_faixas(recalculado, faixas)].astype({'USUÁRIO QUE CONCLUIU A TAREFA': str}),
+            ], ignore_index=True)
+            tabela = tabela.sort_values(['USUÁRIO QUE CONCLUIU A TAREFA', COLUNA_DIA], kind='stable')
+    _gravar_tabela(usuario, tabela, manifesto['versao'])
+
+
+def ler_ocioso(usuario):
+    """
+    Tabela de ocioso por (analista, dia) do dataset, com a coluna 'Data'. Se estiver
+    desatualizada em relação ao manifesto (ou ainda não existir), é reconstruída antes.
+    """
+    manifesto = ler_manifesto(usuario)
+    tabela, versao = _ler_tabela(usuario)
+    if tabela is None or versao != manifesto['versao']:
+        tabela = reconstruir_ocioso(usuario, manifesto)
+    tabela = tabela.reset_index(drop=True)
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': tabela['USUÁRIO QUE CONCLUIU A TAREFA'].astype('category'),
+        COLUNA_DIA: tabela[COLUNA_DIA].astype('int32'),
+        'Data': dia_para_data(tabela[COLUNA_DIA].astype('int64')).dt.date,
+        COLUNA_OCIOSO: tabela[COLUNA_OCIOSO].astype('float64'),
+    })
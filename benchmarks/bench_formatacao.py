@@ -0,0 +1,85 @@
+"""
+Benchmark da formatação de durações (Amil/formatacao.py).
+
+Compara os formatadores antigos, aplicados linha a linha com .apply, com as versões vetorizadas
+sobre a mesma coluna de TMO, conferindo que os textos gerados são idênticos.
+
+Uso:
+    python benchmarks/bench_formatacao.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.formatacao import formatar_hms, formatar_min_s, formatar_minutos
+
+
+def gerar_tmo(n, seed=42):
+    rng = np.random.default_rng(seed)
+    tmo = pd.Series(pd.to_timedelta(rng.integers(0, 3 * 3600 * 10**9, n), unit='ns'))
+    tmo[rng.random(n) < 0.01] = pd.NaT
+    return tmo
+
+
+# Implementações anteriores, mantidas aqui só para comparação
+def format_timedelta(td):
+    if pd.isnull(td):
+        return "0 min"
+    total_seconds = int(td.total_seconds())
+    minutes, seconds = divmod(total_seconds, 60)
+    return f"{minutes} min {seconds}s"
+
+
+def format_timedelta_grafico_tmo(td):
+    if pd.isnull(td):
+        return "00:00:00"
+    total_seconds = int(td.total_seconds())
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def format_timedelta_mes(minutes):
+    if minutes >= 60:
+        hours = int(minutes // 60)
+        minutes_remainder = int(minutes % 60)
+        seconds = (minutes - hours * 60 - minutes_remainder) * 60
+        seconds_int = round(seconds)
+        return f"{hours}h {minutes_remainder}m {seconds_int}s"
+    else:
+        minutes_int = int(minutes)
+        seconds = (minutes - minutes_int) * 60
+        seconds_int = round(seconds)
+        return f"{minutes_int} min {seconds_int}s"
+
+
+def medir(funcao, serie, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(serie)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tmo = gerar_tmo(n)
+    minutos = tmo.dropna().dt.total_seconds() / 60
+
+    casos = [
+        ('HH:MM:SS', tmo, lambda s: s.apply(format_timedelta_grafico_tmo), formatar_hms),
+        ('X min Ys', tmo, lambda s: s.apply(format_timedelta), formatar_min_s),
+        ('Xh Ym Zs (minutos)', minutos, lambda s: s.apply(format_timedelta_mes), formatar_minutos),
+    ]
+
+    print(f'linhas: {n:,}')
+    for nome, serie, antigo, novo in casos:
+        tempo_antigo, textos_antigos = medir(antigo, serie)
+        tempo_novo, textos_novos = medir(novo, serie)
+        pd.testing.assert_series_equal(textos_novos, textos_antigos, check_dtype=False)
+        print(f'{nome:<20}: apply {tempo_antigo * 1000:8.1f} ms  vetorizado {tempo_novo * 1000:7.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
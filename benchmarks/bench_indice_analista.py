@@ -0,0 +1,62 @@
+"""
+Benchmark da troca de analista nas Métricas Individuais (obter_visao_analista em Amil/calculations.py).
+
+Compara o filtro antigo, uma comparação sobre a coluna inteira de analistas a cada troca, com
+a leitura pelas posições de groupby().indices, calculadas uma vez para o recorte. Confere que
+as duas formas devolvem as mesmas linhas para todos os analistas.
+
+Uso:
+    python benchmarks/bench_indice_analista.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def gerar_linhas(n, analistas=300, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([f'analista{i}' for i in rng.integers(0, analistas, n)]),
+        'FINALIZAÇÃO': pd.Categorical(rng.choice(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'], n)),
+        'DATA DE CONCLUSÃO DA TAREFA': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 180 * 86_400, n), unit='s'),
+        'TEMPO MÉDIO OPERACIONAL': pd.to_timedelta(rng.integers(60, 3600, n), unit='s'),
+    })
+
+
+def filtrar_antigo(df, analistas):
+    # Implementação anterior, mantida aqui só para comparação
+    return [df[df['USUÁRIO QUE CONCLUIU A TAREFA'] == analista].copy() for analista in analistas]
+
+
+def filtrar_por_indice(df, analistas):
+    indices = df.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True).indices
+    return [df.take(indices[analista]) for analista in analistas]
+
+
+def medir(funcao, df, analistas, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df, analistas)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = gerar_linhas(n)
+    analistas = list(df['USUÁRIO QUE CONCLUIU A TAREFA'].cat.categories)
+
+    tempo_antigo, antigos = medir(filtrar_antigo, df, analistas)
+    tempo_novo, novos = medir(filtrar_por_indice, df, analistas)
+
+    for antigo, novo in zip(antigos, novos):
+        pd.testing.assert_frame_equal(novo, antigo)
+
+    print(f'linhas: {n:,}  analistas: {len(analistas):,}')
+    print(f'filtro por comparação (todas as trocas) : {tempo_antigo * 1000:9.1f} ms')
+    print(f'groupby().indices + take               : {tempo_novo * 1000:9.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
@@ -0,0 +1,80 @@
+"""
+Benchmark da padronização de TMO feita em save_data.
+
+Compara o laço antigo com df.iterrows() contra a versão com máscaras
+(Amil.ingestao.normalizar_tmo) sobre linhas sintéticas.
+
+Uso:
+    python benchmarks/bench_normalizacao_tmo.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.ingestao import normalizar_tmo
+
+
+def gerar_linhas(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'NÚMERO DO PROTOCOLO': np.char.add('2025-', rng.integers(0, 10**7, n).astype(str)),
+        'FINALIZAÇÃO': rng.choice(['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'AUDITADO'], n),
+        'TEMPO MÉDIO OPERACIONAL': pd.to_timedelta(rng.integers(0, 3 * 3600, n), unit='s'),
+    })
+
+
+def normalizar_tmo_iterrows(df):
+    # Implementação anterior de save_data, mantida aqui só para comparação
+    ajustes = []
+    for i, row in df.iterrows():
+        tmo = row['TEMPO MÉDIO OPERACIONAL']
+        finalizacao = row['FINALIZAÇÃO']
+        protocolo = row.get('NÚMERO DO PROTOCOLO', 'N/A')
+        novo_tmo = tmo
+
+        if finalizacao == 'CADASTRADO' and pd.notnull(tmo) and tmo < pd.Timedelta(minutes=19):
+            novo_tmo = pd.Timedelta(minutes=20)
+        elif finalizacao == 'ATUALIZADO':
+            if pd.notnull(tmo) and tmo < pd.Timedelta(minutes=3):
+                novo_tmo = pd.Timedelta(minutes=3)
+            elif pd.notnull(tmo) and tmo > pd.Timedelta(minutes=15):
+                novo_tmo = pd.Timedelta(minutes=15)
+
+        if pd.notnull(tmo) and tmo > pd.Timedelta(hours=2):
+            novo_tmo = pd.Timedelta(hours=2)
+
+        if pd.notnull(tmo) and novo_tmo != tmo:
+            ajustes.append({
+                'NÚMERO DO PROTOCOLO': protocolo,
+                'FINALIZAÇÃO': finalizacao,
+                'TMO ORIGINAL': tmo,
+                'TMO AJUSTADO': novo_tmo
+            })
+            df.at[i, 'TEMPO MÉDIO OPERACIONAL'] = novo_tmo
+    return df, pd.DataFrame(ajustes)
+
+
+def medir(funcao, df):
+    inicio = time.perf_counter()
+    resultado = funcao(df)
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = gerar_linhas(n)
+
+    tempo_novo, (df_novo, ajustes_novo) = medir(normalizar_tmo, df.copy())
+    tempo_antigo, (df_antigo, ajustes_antigo) = medir(normalizar_tmo_iterrows, df.copy())
+
+    assert df_novo['TEMPO MÉDIO OPERACIONAL'].equals(df_antigo['TEMPO MÉDIO OPERACIONAL'])
+    assert len(ajustes_novo) == len(ajustes_antigo)
+
+    print(f'linhas: {n:,}  ajustes: {len(ajustes_novo):,}')
+    print(f'iterrows : {tempo_antigo:8.2f}s  {n / tempo_antigo:>14,.0f} linhas/s')
+    print(f'máscaras : {tempo_novo:8.2f}s  {n / tempo_novo:>14,.0f} linhas/s')
+    print(f'ganho    : {tempo_antigo / tempo_novo:8.1f}x')
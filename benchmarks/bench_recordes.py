@@ -0,0 +1,71 @@
+"""
+Benchmark dos recordes pessoais (montar_recordes em Amil/cubo.py).
+
+Compara o cálculo antigo dos destaques, feito analista por analista sobre as tarefas (filtro
+do analista + melhor TMO de cadastro por dia + dia com mais cadastros), com a tabela de
+recordes de todos os analistas montada em uma passada sobre o cubo, conferindo os valores.
+
+Uso:
+    python benchmarks/bench_recordes.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.cubo import montar_cubo, montar_recordes
+
+
+def gerar_linhas(n, analistas=200, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([f'analista{i}' for i in rng.integers(0, analistas, n)]),
+        'FILA': pd.Categorical(rng.choice(['CADASTRO', 'ATUALIZAÇÃO', 'DISTRIBUIÇÃO'], n)),
+        'FINALIZAÇÃO': pd.Categorical(rng.choice(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'], n)),
+        'MÓDULO LB': pd.Categorical(rng.choice(['CÍVEL', 'TRABALHISTA'], n)),
+        'DATA DE CONCLUSÃO DA TAREFA': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365 * 86_400, n), unit='s'),
+        'TEMPO MÉDIO OPERACIONAL': pd.to_timedelta(rng.integers(60, 3600, n), unit='s'),
+    })
+
+
+def destaques_antigos(df):
+    # Implementação anterior, por analista, mantida aqui só para comparação
+    destaques = {}
+    for analista in df['USUÁRIO QUE CONCLUIU A TAREFA'].cat.categories:
+        df_analista = df[df['USUÁRIO QUE CONCLUIU A TAREFA'] == analista]
+        cadastros = df_analista[df_analista['FINALIZAÇÃO'] == 'CADASTRADO']
+        dia = cadastros['DATA DE CONCLUSÃO DA TAREFA'].dt.date
+        tmo_por_dia = cadastros.groupby(dia)['TEMPO MÉDIO OPERACIONAL'].mean()
+        quantidade_por_dia = cadastros.groupby(dia).size()
+        destaques[analista] = (tmo_por_dia.idxmin(), tmo_por_dia.min(), quantidade_por_dia.idxmax(), quantidade_por_dia.max())
+    return destaques
+
+
+def medir(funcao, df, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = gerar_linhas(n)
+    cubo = montar_cubo(df)
+
+    tempo_antigo, antigos = medir(destaques_antigos, df)
+    tempo_novo, recordes = medir(lambda cubo: montar_recordes(cubo, 20), cubo)
+
+    for analista, (dia_tmo, tmo, dia_cadastros, cadastros) in antigos.items():
+        recorde = recordes.loc[analista]
+        assert recorde['MELHOR_DIA_TMO'] == dia_tmo and recorde['MELHOR_TMO'] == tmo
+        assert recorde['MELHOR_DIA_CADASTROS'] == dia_cadastros and recorde['CADASTROS_MELHOR_DIA'] == cadastros
+
+    print(f'linhas: {n:,}  analistas: {len(recordes):,}')
+    print(f'por analista sobre as tarefas : {tempo_antigo * 1000:9.1f} ms')
+    print(f'montar_recordes sobre o cubo  : {tempo_novo * 1000:9.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
@@ -0,0 +1,63 @@
+"""
+Benchmark do recorte de tarefas por período (recortar_periodo em Amil/ingestao.py).
+
+Compara o filtro antigo, que compara `.dt.date` (objetos date de todo o histórico) com as
+datas do período, com a busca binária sobre as tarefas ordenadas pela conclusão, como o
+load_data as entrega, conferindo que as linhas recortadas são as mesmas.
+
+Uso:
+    python benchmarks/bench_recorte_periodo.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+from datetime import date
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.ingestao import ordem_por_conclusao, recortar_periodo
+
+PERIODO = (date(2025, 3, 5), date(2025, 4, 17))
+
+
+def gerar_linhas(n, seed=42):
+    rng = np.random.default_rng(seed)
+    conclusao = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 540 * 86_400, n), unit='s')
+    df = pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([f'analista{i}' for i in rng.integers(0, 40, n)]),
+        'DATA DE CONCLUSÃO DA TAREFA': conclusao,
+        'TEMPO MÉDIO OPERACIONAL': pd.to_timedelta(rng.integers(10, 3600, n), unit='s'),
+    })
+    return df.take(ordem_por_conclusao(df)).reset_index(drop=True)
+
+
+def recortar_periodo_antigo(df):
+    # Implementação anterior, mantida aqui só para comparação
+    return df[
+        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date >= PERIODO[0]) &
+        (df['DATA DE CONCLUSÃO DA TAREFA'].dt.date <= PERIODO[1])
+    ]
+
+
+def medir(funcao, df, repeticoes=5):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = gerar_linhas(n)
+
+    tempo_antigo, antigo = medir(recortar_periodo_antigo, df)
+    tempo_novo, novo = medir(lambda d: recortar_periodo(d, *PERIODO), df)
+    pd.testing.assert_frame_equal(novo, antigo)
+
+    print(f'linhas: {n:,}  no período: {len(novo):,}')
+    print(f'.dt.date contra datas      : {tempo_antigo * 1000:9.1f} ms')
+    print(f'busca binária (fatia)      : {tempo_novo * 1000:9.2f} ms  ({tempo_antigo / tempo_novo:.0f}x)')
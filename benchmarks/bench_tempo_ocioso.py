@@ -0,0 +1,82 @@
+"""
+Benchmark do tempo ocioso por analista e dia (Amil/ocioso.py).
+
+Compara a versão antiga (shift por analista, .apply linha a linha para limitar os intervalos e
+texto formatado) com o cálculo em int64 com fusão de tarefas sobrepostas. As tarefas geradas
+são sequenciais por analista, sem sobreposição, para que as duas versões tenham de dar os
+mesmos minutos e o resultado possa ser conferido.
+
+Uso:
+    python benchmarks/bench_tempo_ocioso.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.ocioso import COLUNA_OCIOSO, ocioso_por_dia
+
+
+def gerar_linhas(n, analistas=40, seed=42):
+    rng = np.random.default_rng(seed)
+    usuario = rng.integers(0, analistas, n)
+
+    # Duração e intervalo até a próxima tarefa, acumulados por analista a partir de 2025-01-01
+    duracao = rng.integers(60, 3600, n)
+    intervalo = rng.choice([rng.integers(1, 3600, n), rng.integers(3600, 6 * 3600, n)], p=[0.9, 0.1], axis=0)
+    passo = duracao + intervalo
+    inicio_seg = pd.Series(passo).groupby(usuario).cumsum().to_numpy() - passo
+
+    inicio = pd.Timestamp('2025-01-01') + pd.to_timedelta(inicio_seg, unit='s')
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([f'analista{i}' for i in usuario]),
+        'DATA DE INÍCIO DA TAREFA': inicio,
+        'DATA DE CONCLUSÃO DA TAREFA': inicio + pd.to_timedelta(duracao, unit='s'),
+    })
+
+
+def calcular_tempo_ocioso_antigo(df):
+    # Implementação anterior, mantida aqui só para comparação
+    df = df.dropna(subset=['DATA DE INÍCIO DA TAREFA', 'DATA DE CONCLUSÃO DA TAREFA']).reset_index(drop=True)
+    df = df.sort_values(by=['USUÁRIO QUE CONCLUIU A TAREFA', 'DATA DE INÍCIO DA TAREFA']).reset_index(drop=True)
+    df['PRÓXIMA_TAREFA'] = df.groupby(['USUÁRIO QUE CONCLUIU A TAREFA'], observed=True)['DATA DE INÍCIO DA TAREFA'].shift(-1)
+    df['TEMPO OCIOSO'] = df['PRÓXIMA_TAREFA'] - df['DATA DE CONCLUSÃO DA TAREFA']
+    df['TEMPO OCIOSO'] = df['TEMPO OCIOSO'].apply(
+        lambda x: x if pd.notnull(x) and pd.Timedelta(0) < x <= pd.Timedelta(hours=1) else pd.Timedelta(0)
+    )
+
+    df_soma_ocioso = df.groupby(['USUÁRIO QUE CONCLUIU A TAREFA', df['DATA DE CONCLUSÃO DA TAREFA'].dt.date], observed=True)['TEMPO OCIOSO'].sum().reset_index()
+    df_soma_ocioso = df_soma_ocioso.rename(columns={
+        'DATA DE CONCLUSÃO DA TAREFA': 'Data',
+        'TEMPO OCIOSO': 'Tempo Ocioso'
+    })
+    df_soma_ocioso['Tempo Ocioso Formatado'] = df_soma_ocioso['Tempo Ocioso'].astype(str).str.split("days").str[-1].str.strip()
+    return df_soma_ocioso
+
+
+def medir(funcao, df, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = gerar_linhas(n)
+
+    tempo_antigo, antigo = medir(calcular_tempo_ocioso_antigo, df)
+    tempo_novo, novo = medir(ocioso_por_dia, df)
+
+    minutos_antigos = antigo['Tempo Ocioso'].dt.total_seconds().to_numpy() / 60
+    np.testing.assert_allclose(novo[COLUNA_OCIOSO].to_numpy(), minutos_antigos)
+    assert (novo['Data'].to_numpy() == antigo['Data'].to_numpy()).all()
+
+    print(f'linhas: {n:,}  dias de analista: {len(novo):,}')
+    print(f'antigo (shift + apply + texto) : {tempo_antigo * 1000:9.1f} ms')
+    print(f'int64 com fusão de blocos      : {tempo_novo * 1000:9.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
@@ -0,0 +1,68 @@
+"""
+Benchmark do TMO por analista (calcular_tmo em Amil/calculations.py).
+
+Compara a agregação antiga, em que cada grupo de analista reavaliava a máscara de CADASTRADO
+sobre o DataFrame inteiro (custo analistas × linhas), com o kernel calcular_tmo_por_analista,
+que agrega todas as finalizações em um único groupby. O número de linhas fica fixo e o de
+analistas cresce: o tempo antigo cresce junto com os analistas, o novo fica praticamente estável.
+
+Uso:
+    python benchmarks/bench_tmo_analista.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.calculations import calcular_tmo
+
+
+def gerar_linhas(n, analistas, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'USUÁRIO QUE CONCLUIU A TAREFA': pd.Categorical([f'analista{i}' for i in rng.integers(0, analistas, n)]),
+        'SITUAÇÃO DA TAREFA': pd.Categorical(rng.choice(['Finalizada', 'Cancelada', 'Pendente'], n, p=[0.8, 0.1, 0.1])),
+        'FINALIZAÇÃO': pd.Categorical(rng.choice(['CADASTRADO', 'ATUALIZADO', 'REALIZADO'], n)),
+        'FILA': pd.Categorical(rng.choice(['DÚVIDA', 'CADASTRO', 'ATUALIZAÇÃO'], n)),
+        'TEMPO MÉDIO OPERACIONAL': pd.to_timedelta(rng.integers(10, 2 * 3600, n), unit='s'),
+    })
+
+
+def calcular_tmo_antigo(df):
+    # Implementação anterior, mantida aqui só para comparação
+    df_finalizados = df[df['SITUAÇÃO DA TAREFA'].isin(['Finalizada', 'Cancelada'])].copy()
+    df_finalizados['TEMPO_MÉDIO_MINUTOS'] = df_finalizados['TEMPO MÉDIO OPERACIONAL'].dt.total_seconds() / 60
+    df_finalizados = df_finalizados[~((df_finalizados['FILA'] == 'DÚVIDA') & (df_finalizados['TEMPO_MÉDIO_MINUTOS'] > 60))]
+    df_tmo_analista = df_finalizados.groupby('USUÁRIO QUE CONCLUIU A TAREFA', observed=True).agg(
+        Tempo_Total=('TEMPO MÉDIO OPERACIONAL', lambda x: x[df_finalizados['FINALIZAÇÃO'] == 'CADASTRADO'].sum()),
+        Total_Tarefas=('FINALIZAÇÃO', lambda x: x[x == 'CADASTRADO'].count())
+    ).reset_index()
+    df_tmo_analista['TMO'] = df_tmo_analista['Tempo_Total'] / df_tmo_analista['Total_Tarefas']
+    return df_tmo_analista[['USUÁRIO QUE CONCLUIU A TAREFA', 'TMO']]
+
+
+def medir(funcao, df, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    print(f'linhas: {n:,}')
+    for analistas in [10, 50, 200, 800]:
+        df = gerar_linhas(n, analistas)
+        tempo_antigo, antigo = medir(calcular_tmo_antigo, df)
+        tempo_novo, novo = medir(calcular_tmo, df)
+
+        pd.testing.assert_series_equal(novo['TMO'], antigo['TMO'], check_names=False)
+        assert (novo['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str) == antigo['USUÁRIO QUE CONCLUIU A TAREFA'].astype(str)).all()
+
+        print(f'{analistas:>4} analistas: antigo {tempo_antigo * 1000:8.1f} ms  kernel {tempo_novo * 1000:6.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
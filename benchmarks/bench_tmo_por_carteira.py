@@ -0,0 +1,171 @@
+"""
+Benchmark do resumo de TMO por fila (calcular_tmo_por_carteira) da Visão Geral.
+
+Compara a versão antiga (groupby com lambdas, apply por fila, merges e concat) com o pivô
+(FILA, FINALIZAÇÃO) sobre o cubo, partindo das tarefas e partindo de um cubo já montado,
+como acontece no dashboard (a contagem de protocolos Fora do Escopo sai sempre das tarefas).
+
+Uso:
+    python benchmarks/bench_tmo_por_carteira.py [quantidade_de_linhas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.calculations import calcular_tmo_por_carteira
+from Amil.cubo import montar_cubo
+from Amil.ingestao import compactar_colunas
+
+FILAS = [
+    'CADASTRO E-MAIL', 'OFICIOS', 'CADASTRO DE ÓRGÃOS E OFÍCIOS', 'PRE CADASTRO E DIJUR',
+    'DISTRIBUIÇÃO - AMIL + JV', 'DISTRIBUICAO', 'AUDITORIA - CADASTRO', 'DÚVIDA',
+    'CADASTRO SHAREPOINT', 'INCIDENTE PROCESSUAL', 'CADASTRO ANS (AUTO DE INFRAÇÃO)'
+]
+FINALIZACOES = ['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'AUDITADO', 'BAIXA EM LOTE', 'DUPLICADO', None]
+
+
+def gerar_linhas(n, seed=42):
+    rng = np.random.default_rng(seed)
+    conclusao = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 180 * 86400, n), unit='s')
+    tmo = pd.Series(pd.to_timedelta(rng.integers(30, 3 * 3600, n), unit='s'))
+    tmo[rng.random(n) < 0.01] = pd.NaT
+    df = pd.DataFrame({
+        # Cerca de três tarefas por protocolo, para que a contagem de protocolos Fora do Escopo importe
+        'NÚMERO DO PROTOCOLO': np.char.add('2025-', rng.integers(0, max(n // 3, 1), n).astype(str)),
+        'FILA': rng.choice(FILAS, n),
+        'USUÁRIO QUE CONCLUIU A TAREFA': rng.choice([f'analista{i}' for i in range(40)], n),
+        'FINALIZAÇÃO': rng.choice(np.array(FINALIZACOES, dtype=object), n),
+        'MÓDULO LB': rng.choice(['CÍVEL', 'TRABALHISTA'], n),
+        'TEMPO MÉDIO OPERACIONAL': tmo,
+        'DATA DE CONCLUSÃO DA TAREFA': conclusao,
+    })
+    # Mesma representação compacta (categóricas + chaves inteiras) que o load_data entrega
+    return compactar_colunas(df)
+
+
+def calcular_tmo_por_carteira_antigo(df):
+    # Implementação anterior à série, copiada sem alterações (só para comparação); recebe as
+    # colunas como o load_data daquela versão entregava, sem categóricas
+    required_columns = {'FILA', 'TEMPO MÉDIO OPERACIONAL', 'FINALIZAÇÃO', 'NÚMERO DO PROTOCOLO'}
+    if not required_columns.issubset(df.columns):
+        return "As colunas necessárias não foram encontradas no DataFrame."
+
+    df = df.dropna(subset=['TEMPO MÉDIO OPERACIONAL'])
+
+    if not pd.api.types.is_timedelta64_dtype(df['TEMPO MÉDIO OPERACIONAL']):
+        return "A coluna 'TEMPO MÉDIO OPERACIONAL' contém valores que não são do tipo timedelta."
+
+    df_unique = df.drop_duplicates(subset=['NÚMERO DO PROTOCOLO'])
+
+    df_tmo = df[df['FINALIZAÇÃO'].isin(['CADASTRADO', 'ATUALIZADO']) & (df['FILA'] != 'Distribuição')]
+
+    tmo_por_carteira = df_tmo.groupby('FILA').agg(
+        Quantidade=('FILA', 'size'),
+        Cadastrado=('FINALIZAÇÃO', lambda x: (x == 'CADASTRADO').sum()),
+        Atualizado=('FINALIZAÇÃO', lambda x: (x == 'ATUALIZADO').sum()),
+    ).reset_index()
+
+    df_cadastro = df[df['FINALIZAÇÃO'] == 'CADASTRADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+    df_cadastro.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Cadastro'}, inplace=True)
+
+    df_atualizacao = df[df['FINALIZAÇÃO'] == 'ATUALIZADO'].groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+    df_atualizacao.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Atualização'}, inplace=True)
+
+    filas_distribuicao = [
+        'DISTRIBUIÇÃO - AMIL + JV', 
+        'DISTRIBUIÇÃO - JV CÍVEL', 
+        'DISTRIBUIÇÃO - PRÉ CADASTRO', 
+        'DISTRIBUIÇÃO - PRÉ CADASTRO - JV', 
+        'DISTRIBUICAO'
+    ]
+    
+    df_distribuicao = df[df['FILA'].isin(filas_distribuicao) & (df['FINALIZAÇÃO'] == 'REALIZADO')]
+
+    if not df_distribuicao.empty:
+        tmo_distribuicao = df_distribuicao.groupby('FILA').agg(
+            Quantidade=('FILA', 'size'),
+            TMO_Distribuicao=('TEMPO MÉDIO OPERACIONAL', 'mean')
+        ).reset_index()
+        tmo_distribuicao.rename(columns={'TMO_Distribuicao': 'TMO Cadastro'}, inplace=True)
+        tmo_distribuicao['TMO Atualização'] = None
+    else:
+        tmo_distribuicao = pd.DataFrame(columns=['FILA', 'Quantidade', 'TMO Cadastro', 'TMO Atualização'])
+
+    tmo_por_carteira = tmo_por_carteira.merge(df_cadastro, on='FILA', how='left')
+    tmo_por_carteira = tmo_por_carteira.merge(df_atualizacao, on='FILA', how='left')
+    tmo_por_carteira = pd.concat([tmo_por_carteira, tmo_distribuicao], ignore_index=True)
+
+    # --- NOVO BLOCO: AUDITORIA - CADASTRO ---
+    df_auditoria = df[(df['FILA'] == 'AUDITORIA - CADASTRO') & (df['FINALIZAÇÃO'] == 'AUDITADO')]
+
+    if not df_auditoria.empty:
+        tmo_auditoria = df_auditoria.groupby('FILA').agg(
+            Quantidade=('FILA', 'size'),
+            TMO_Cadastro=('TEMPO MÉDIO OPERACIONAL', 'mean')
+        ).reset_index()
+        tmo_auditoria.rename(columns={'TMO_Cadastro': 'TMO Cadastro'}, inplace=True)
+        tmo_auditoria['TMO Atualização'] = None
+        tmo_por_carteira = pd.concat([tmo_por_carteira, tmo_auditoria], ignore_index=True)
+
+    # Calcular 'Fora do Escopo'
+    fora_do_escopo_contagem = df_unique.groupby('FILA').apply(
+        lambda x: x.shape[0] - (x['FINALIZAÇÃO'] == 'CADASTRADO').sum() - (x['FINALIZAÇÃO'] == 'ATUALIZADO').sum()
+    ).reset_index(name='Fora do Escopo')
+    tmo_por_carteira = tmo_por_carteira.merge(fora_do_escopo_contagem, on='FILA', how='left')
+
+    # Calcular TMO Fora do Escopo
+    finais_excluidas = ['CADASTRADO', 'ATUALIZADO', 'REALIZADO', 'BAIXA EM LOTE']
+    df_fora_escopo = df[~df['FINALIZAÇÃO'].isin(finais_excluidas)]
+    tmo_fora_escopo = df_fora_escopo.groupby('FILA')['TEMPO MÉDIO OPERACIONAL'].mean().reset_index()
+    tmo_fora_escopo.rename(columns={'TEMPO MÉDIO OPERACIONAL': 'TMO Fora do Escopo'}, inplace=True)
+    tmo_por_carteira = tmo_por_carteira.merge(tmo_fora_escopo, on='FILA', how='left')
+
+    def format_timedelta(td):
+        if pd.isna(td):
+            return "00:00:00"
+        total_seconds = int(td.total_seconds())
+        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+
+    tmo_por_carteira['TMO Cadastro'] = tmo_por_carteira['TMO Cadastro'].apply(format_timedelta)
+    tmo_por_carteira['TMO Atualização'] = tmo_por_carteira['TMO Atualização'].apply(format_timedelta)
+    tmo_por_carteira['TMO Fora do Escopo'] = tmo_por_carteira['TMO Fora do Escopo'].apply(format_timedelta)
+
+    tmo_por_carteira = tmo_por_carteira[['FILA', 'Quantidade', 'Cadastrado', 'Atualizado', 'Fora do Escopo', 'TMO Cadastro', 'TMO Atualização', 'TMO Fora do Escopo']]
+
+    return tmo_por_carteira
+
+
+def medir(funcao, df, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    df = gerar_linhas(n)
+
+    # A versão antiga recebe as categóricas como texto, como o load_data daquela época entregava
+    df_antigo = df.astype({coluna: object for coluna in df.select_dtypes('category').columns})
+    tempo_antigo, antigo = medir(calcular_tmo_por_carteira_antigo, df_antigo)
+    tempo_novo, novo = medir(calcular_tmo_por_carteira, df)
+    tempo_cubo_montagem, cubo = medir(montar_cubo, df)
+    tempo_cubo, do_cubo = medir(lambda tarefas: calcular_tmo_por_carteira(tarefas, cubo), df)
+
+    # O merge antigo deixa Fora do Escopo nulo nas filas sem protocolos; a versão nova dá 0
+    antigo['Fora do Escopo'] = antigo['Fora do Escopo'].fillna(0)
+    pd.testing.assert_frame_equal(novo, antigo, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(do_cubo, antigo, check_dtype=False, check_categorical=False)
+
+    print(f'linhas: {n:,}  filas no resumo: {len(novo)}  células do cubo: {len(cubo):,}')
+    print(f'antigo (lambdas/apply/merges) : {tempo_antigo * 1000:9.1f} ms')
+    print(f'pivô a partir das tarefas     : {tempo_novo * 1000:9.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')
+    print(f'montagem do cubo (1x/versão)  : {tempo_cubo_montagem * 1000:9.1f} ms')
+    print(f'pivô a partir do cubo         : {tempo_cubo * 1000:9.1f} ms  ({tempo_antigo / tempo_cubo:.1f}x)')
@@ -0,0 +1,65 @@
+"""
+Benchmark do top-N por fila (top_n_por_grupo em Amil/cubo.py).
+
+Compara a seleção por grupo com groupby().apply(nsmallest), a forma direta de estender o
+antigo idxmin para mais de um analista, com a classificação vetorizada de top_n_por_grupo
+sobre a mesma tabela fila × analista, conferindo que os dois escolhem os mesmos analistas.
+Os TMOs gerados são distintos, para que não haja empates.
+
+Uso:
+    python benchmarks/bench_top_n_fila.py [quantidade_de_filas] [analistas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Amil.cubo import top_n_por_grupo
+
+
+def gerar_tabela(filas, analistas, seed=42):
+    rng = np.random.default_rng(seed)
+    n = filas * analistas
+    return pd.DataFrame({
+        'FILA': np.repeat([f'fila{i}' for i in range(filas)], analistas),
+        'USUÁRIO QUE CONCLUIU A TAREFA': np.tile([f'analista{i}' for i in range(analistas)], filas),
+        'TMO': pd.to_timedelta(rng.permutation(n) + 60_000, unit='ms'),
+        'Quantidade': rng.integers(1, 200, n),
+    })
+
+
+def top_n_antigo(tabela, n, minimo):
+    # Implementação por grupo, mantida aqui só para comparação
+    tabela = tabela[tabela['Quantidade'] >= minimo]
+    return tabela.groupby('FILA', group_keys=False).apply(lambda grupo: grupo.nsmallest(n, 'TMO')).reset_index(drop=True)
+
+
+def top_n_novo(tabela, n, minimo):
+    return top_n_por_grupo(tabela, 'FILA', 'TMO', n=n, minimo=minimo, coluna_volume='Quantidade')
+
+
+def medir(funcao, tabela, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(tabela, 3, 10)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+if __name__ == '__main__':
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    analistas = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tabela = gerar_tabela(filas, analistas)
+
+    tempo_antigo, antigo = medir(top_n_antigo, tabela)
+    tempo_novo, novo = medir(top_n_novo, tabela)
+
+    pd.testing.assert_frame_equal(novo.drop(columns='POSIÇÃO'), antigo)
+
+    print(f'filas: {filas:,}  analistas: {analistas:,}  linhas: {len(tabela):,}')
+    print(f'groupby().apply(nsmallest) : {tempo_antigo * 1000:9.1f} ms')
+    print(f'top_n_por_grupo            : {tempo_novo * 1000:9.1f} ms  ({tempo_antigo / tempo_novo:.1f}x)')